@@ -1,7 +1,9 @@
+import asyncio
 import logging
 import os
 import json
-from datetime import datetime
+import time
+from typing import Optional
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
@@ -20,6 +22,10 @@ from livekit.agents import (
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from case_cache import CaseCache
+from case_store import CaseStore
+from security_answers import check_answer
+
 logger = logging.getLogger("fraud-agent")
 load_dotenv(".env.local")
 
@@ -130,33 +136,36 @@ def load_fraud_cases():
         logger.error(f"Error loading fraud database: {e}")
         return {"fraud_cases": []}
 
-def update_fraud_case(user_name, updates):
-    """Update a specific fraud case in the database"""
+def open_case_store():
+    """Open the shared case store, importing fraud_cases.json the first time"""
+    case_store = CaseStore()
+    if not case_store.count():
+        imported = case_store.seed(load_fraud_cases()["fraud_cases"])
+        logger.info(f"Imported {imported} fraud cases into {case_store.db_file}")
+    return case_store
+
+def case_id_from_metadata(metadata):
+    """Target case id from job metadata such as '{"case_id": 42}', if any"""
+    if not metadata:
+        return None
     try:
-        database_file = "fraud_database/fraud_cases.json"
-        with open(database_file, 'r') as f:
-            data = json.load(f)
-        
-        # Find and update the case
-        for case in data["fraud_cases"]:
-            if case["userName"].lower() == user_name.lower():
-                case.update(updates)
-                case["callTimestamp"] = datetime.now().isoformat()
-                break
-        
-        # Save updated data
-        with open(database_file, 'w') as f:
-            json.dump(data, f, indent=2)
-        
-        logger.info(f"Updated fraud case for {user_name}: {updates}")
-        return True
-    except Exception as e:
-        logger.error(f"Error updating fraud case: {e}")
-        return False
+        return int(json.loads(metadata)["case_id"])
+    except (ValueError, TypeError, KeyError) as e:
+        logger.warning(f"Ignoring job metadata without a valid case_id: {e}")
+        return None
 
 class FraudAlertAgent(Agent):
-    def __init__(self):
-        self.fraud_cases = load_fraud_cases()
+    def __init__(self, case_cache: Optional[CaseCache] = None, target_case=None):
+        # Shared per worker process when created in prewarm; lookups are
+        # served from memory and updates go to the shared case store
+        # A cache with no cases is falsy, so test for None
+        if case_cache is None:
+            case_cache = CaseCache(open_case_store())
+        self.case_cache = case_cache
+        self.case_store = self.case_cache.case_store
+        # Set for outbound calls dispatched about one case; the call then
+        # only ever loads and updates that case
+        self.target_case = target_case
         self.current_case = None
         self.verification_passed = False
         self.conversation_state = "greeting"
@@ -166,7 +175,7 @@ class FraudAlertAgent(Agent):
 1. GREETING: Start with: "Namaste! This is State Bank of India Fraud Prevention Department calling regarding a suspicious transaction on your account. To verify your identity, could you please tell me your full name?"
 
 2. IDENTITY VERIFICATION: 
-   - When user provides name, search for their fraud case
+   - When user provides name, search for their fraud case with find_fraud_case
    - If found, ask the security question from their record
    - If correct answer, proceed to transaction review
    - If incorrect, end call politely
@@ -185,29 +194,62 @@ IMPORTANT RULES:
 - Never ask for full card numbers, PINs, or passwords
 - Speak clearly and patiently
 - End calls politely regardless of outcome
-- Only use data from the provided fraud cases
+- Only use case data returned by your tools
 - For State Bank of India, use customer service number: 1800-1234
-
-FRAUD CASES DATA:
-{fraud_cases_data}
-"""
+{call_context}"""
         
-        # Format fraud cases for instructions
-        cases_text = ""
-        for case in self.fraud_cases["fraud_cases"]:
-            cases_text += f"User: {case['userName']}, Security ID: {case['securityIdentifier']}, Card: ****{case['cardEnding']}, Question: {case['securityQuestion']}, Answer: {case['securityAnswer']}\n"
+        # Case details reach the model only through tool results, so the
+        # prompt stays the same size however many cases the bank has
+        call_context = ""
+        if target_case:
+            call_context = f"""
+THIS CALL:
+- This is an outbound call to {target_case['userName']} about their card ending {target_case['cardEnding']}
+- Only discuss this customer's case; if the person is someone else, end the call politely
+"""
         
-        formatted_instructions = instructions.format(fraud_cases_data=cases_text)
+        formatted_instructions = instructions.format(call_context=call_context)
         super().__init__(instructions=formatted_instructions)
 
+    async def update_case(self, updates):
+        """Record a call outcome on the current case
+
+        The write may queue behind other workers' writes, so it runs in a
+        worker thread and the call's audio keeps flowing meanwhile.
+        """
+        if await asyncio.to_thread(self.case_store.update, self.current_case["id"], updates):
+            self.current_case.update(updates)
+            logger.info(f"Updated fraud case for {self.current_case['userName']}: {updates}")
+            return True
+        logger.error(f"Error updating fraud case {self.current_case['id']}: case not found")
+        return False
+
+    async def _accept_answer(self, case):
+        """Accept a right answer, writing to the store only to clear earlier wrong ones"""
+        if not case.get("failedAnswers"):
+            # The cache already showed the case unlocked, and there is no count to reset
+            return True
+        return await asyncio.to_thread(self.case_store.accept_answer, case["id"])
+
+    def _record_wrong_answer(self, case_id):
+        locked_until = self.case_store.record_wrong_answer(case_id)
+        # Sessions in this worker see the new count and any lock right away;
+        # other workers pick them up on their next cache refresh
+        self.case_cache.refresh()
+        return locked_until
+
     @function_tool
     async def find_fraud_case(self, context: RunContext, user_name: str) -> str:
         """Find fraud case by user name"""
-        for case in self.fraud_cases["fraud_cases"]:
-            if case["userName"].lower() == user_name.lower():
-                self.current_case = case
-                self.conversation_state = "verification"
-                return f"Found case for {user_name}. Security question: {case['securityQuestion']}"
+        if self.target_case:
+            # Outbound calls already know their case; the name must match it
+            case = self.target_case if self.target_case["userName"].lower() == user_name.strip().lower() else None
+        else:
+            case = self.case_cache.find_by_name(user_name)
+        if case:
+            self.current_case = case
+            self.conversation_state = "verification"
+            return f"Found case for {user_name}. Security question: {case['securityQuestion']}"
         
         return f"No pending fraud cases found for {user_name}. Please contact State Bank of India customer service at 1800-1234 for assistance."
 
@@ -217,14 +259,20 @@ FRAUD CASES DATA:
         if not self.current_case:
             return "No case loaded. Please provide your name first."
         
-        expected_answer = self.current_case["securityAnswer"].lower()
-        user_answer_clean = user_answer.lower().strip()
+        # The shared cache carries lockouts set by calls in any worker, so a
+        # locked case is turned away without touching the database
+        case = self.case_cache.get(self.current_case["id"]) or self.current_case
+        if case.get("verificationLockedUntil", 0) > time.time():
+            self.conversation_state = "verification_failed"
+            return "For your security, verification for this account is temporarily locked after too many incorrect answers. Please contact State Bank of India customer service at 1800-1234. Dhanyavaad."
         
-        if user_answer_clean == expected_answer:
+        if check_answer(case, user_answer) and await self._accept_answer(case):
             self.verification_passed = True
             self.conversation_state = "transaction_review"
             return "Verification successful. Dhanyavaad. Now let me tell you about the suspicious transaction we detected on your State Bank of India account."
         else:
+            if await asyncio.to_thread(self._record_wrong_answer, case["id"]):
+                logger.warning(f"Verification locked for fraud case {case['id']} after repeated wrong answers")
             self.conversation_state = "verification_failed"
             return "I'm sorry, but we cannot verify your identity at this time. Please contact State Bank of India customer service directly at 1800-1234 for assistance. Dhanyavaad."
 
@@ -263,7 +311,7 @@ Did you authorize this transaction?
                 "case": "confirmed_safe",
                 "outcome": "Customer confirmed transaction as legitimate"
             }
-            update_fraud_case(case["userName"], updates)
+            await self.update_case(updates)
             
             return "Dhanyavaad for confirming. We've noted this transaction as authorized. Your State Bank of India card remains active. Thank you for helping us keep your account secure."
         
@@ -273,7 +321,7 @@ Did you authorize this transaction?
                 "case": "confirmed_fraud",
                 "outcome": "Customer denied transaction - marked as fraudulent"
             }
-            update_fraud_case(case["userName"], updates)
+            await self.update_case(updates)
             
             return f"Dhanyavaad for confirming this was fraudulent. We are immediately blocking your State Bank of India card to prevent further unauthorized transactions. A new card will be dispatched to your registered address within 3-5 business days. We have initiated a dispute for the fraudulent charge of {case['amount']}. Please check your email and SMS for further instructions. Thank you for your cooperation."
         
@@ -288,7 +336,7 @@ Did you authorize this transaction?
                 "case": "verification_failed",
                 "outcome": "Security verification failed during call"
             }
-            update_fraud_case(self.current_case["userName"], updates)
+            await self.update_case(updates)
         
         return "For security reasons, we are ending this call. Please contact State Bank of India customer service directly at 1800-1234 for assistance. Dhanyavaad."
 
@@ -296,12 +344,12 @@ def prewarm(proc: JobProcess):
     """Preload models and fraud database"""
     logger.info("Prewarming State Bank of India fraud agent...")
     proc.userdata["vad"] = silero.VAD.load()
-    # Preload fraud database
-    fraud_cases = load_fraud_cases()
-    if fraud_cases:
-        logger.info(f"Loaded {len(fraud_cases['fraud_cases'])} fraud cases during prewarm")
-    else:
-        logger.error("Failed to load fraud cases during prewarm")
+    # Load the fraud cases once for every session in this process and keep
+    # them current from the store's change feed
+    case_cache = CaseCache(open_case_store())
+    case_cache.start()
+    logger.info(f"Cached {len(case_cache)} fraud cases during prewarm")
+    proc.userdata["case_cache"] = case_cache
 
 async def entrypoint(ctx: JobContext):
     ctx.log_context_fields = {
@@ -311,9 +359,22 @@ async def entrypoint(ctx: JobContext):
     
     logger.info("Starting State Bank of India Fraud Alert agent session...")
     
+    case_cache = ctx.proc.userdata.get("case_cache")
+    if case_cache is None:
+        case_cache = CaseCache(open_case_store())
+    # Outbound calls are dispatched with the case to discuss in the job metadata
+    target_case = None
+    case_id = case_id_from_metadata(ctx.job.metadata)
+    if case_id is not None:
+        target_case = case_cache.get(case_id)
+        if not target_case:
+            logger.error(f"Fraud case {case_id} from job metadata not found")
+            return
+        logger.info(f"Calling about fraud case {case_id}")
+
     try:
         # Initialize Fraud Alert agent
-        fraud_agent = FraudAlertAgent()
+        fraud_agent = FraudAlertAgent(case_cache=case_cache, target_case=target_case)
         logger.info("State Bank of India Fraud Alert agent initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize agent: {e}")
@@ -377,4 +438,7 @@ async def entrypoint(ctx: JobContext):
         raise
 
 if __name__ == "__main__":
-    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
\ No newline at end of file
+    # Setting FRAUD_AGENT_NAME switches the worker to explicit dispatch, which
+    # src/campaign.py uses to place outbound calls
+    cli.run_app(WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm,
+                              agent_name=os.getenv("FRAUD_AGENT_NAME", "")))
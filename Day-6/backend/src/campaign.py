@@ -0,0 +1,258 @@
+"""Outbound call campaign for pending fraud cases
+
+Claims pending_review cases from the shared case store, largest amount
+first, and dispatches one fraud agent job per case to the LiveKit worker
+pool, with the case id in the job metadata. Dispatches run with bounded
+concurrency and a rate limit; failed ones are retried with exponential
+backoff. Claims live in the case store, so several campaign processes can
+run at once and each case is still called once.
+
+    uv run python src/campaign.py
+    uv run python src/campaign.py --concurrency 8 --rate 2 --watch 30
+
+The worker must be registered under the same agent name (FRAUD_AGENT_NAME)
+to receive these dispatches.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from collections.abc import Awaitable
+from typing import Any, Callable
+
+from dotenv import load_dotenv
+
+from case_store import CaseStore
+
+logger = logging.getLogger("fraud-campaign")
+
+# Agent name the fraud worker registers under for explicit dispatch
+AGENT_NAME = "sbi-fraud-alert"
+
+# Seconds before retrying a failed dispatch, doubled per attempt up to the cap
+RETRY_DELAY = 5.0
+MAX_RETRY_DELAY = 300.0
+
+# Seconds a claimed case stays reserved for its dispatcher; a dispatcher that
+# dies mid-dispatch gives its cases back after this long
+LEASE_SECONDS = 300.0
+
+# Takes a case, starts a call about it and returns the dispatch id; tests
+# pass a fake instead of LiveKitDispatcher
+Dispatch = Callable[[dict[str, Any]], Awaitable[str]]
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` acquisitions per second, in bursts of `burst`"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        # The lock hands out tokens to waiters in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class LiveKitDispatcher:
+    """Dispatches a fraud agent job into a room of its own per case
+
+    Credentials come from LIVEKIT_URL, LIVEKIT_API_KEY and
+    LIVEKIT_API_SECRET.
+    """
+
+    def __init__(self, agent_name: str = AGENT_NAME, room_prefix: str = "fraud-case-"):
+        self.agent_name = agent_name
+        self.room_prefix = room_prefix
+        self._api = None
+
+    async def __call__(self, case: dict[str, Any]) -> str:
+        from livekit import api
+
+        if self._api is None:
+            self._api = api.LiveKitAPI()
+        dispatch = await self._api.agent_dispatch.create_dispatch(
+            api.CreateAgentDispatchRequest(
+                agent_name=self.agent_name,
+                room=f"{self.room_prefix}{case['id']}",
+                metadata=json.dumps({"case_id": case["id"]}),
+            )
+        )
+        return dispatch.id
+
+    async def aclose(self) -> None:
+        if self._api is not None:
+            await self._api.aclose()
+            self._api = None
+
+
+class CampaignDispatcher:
+    """Calls every pending_review case once, in priority order
+
+    At most `concurrency` dispatches are in progress at a time and no more
+    than `rate` start per second. A failed dispatch is retried after
+    `retry_delay` seconds, doubling each time, until `max_attempts`; the
+    case is then marked failed and left for a human.
+
+    A case whose dispatch went out is never claimed again, even if the
+    call ends without an outcome. If this process dies between LiveKit
+    accepting a dispatch and recording it, the case is dispatched again
+    once its lease runs out, into the same per-case room.
+    """
+
+    def __init__(
+        self,
+        case_store: CaseStore,
+        dispatch: Dispatch,
+        concurrency: int = 4,
+        rate: float = 2.0,
+        max_attempts: int = 3,
+        retry_delay: float = RETRY_DELAY,
+        max_retry_delay: float = MAX_RETRY_DELAY,
+        dispatch_timeout: float = 30.0,
+        lease_seconds: float = LEASE_SECONDS,
+    ):
+        self.case_store = case_store
+        self.dispatch = dispatch
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate, burst=concurrency)
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.dispatch_timeout = dispatch_timeout
+        self.lease_seconds = lease_seconds
+
+    async def _dispatch(self, case: dict[str, Any], attempt: int) -> str:
+        """Dispatch one claimed case; returns its new dispatch state"""
+        await self.limiter.acquire()
+        try:
+            dispatch_id = await asyncio.wait_for(
+                self.dispatch(case), self.dispatch_timeout
+            )
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if attempt >= self.max_attempts:
+                logger.error(
+                    f"Giving up on fraud case {case['id']} after {attempt} attempts: {error}"
+                )
+                self.case_store.fail_call(case["id"], error)
+                return "failed"
+            delay = min(self.retry_delay * 2 ** (attempt - 1), self.max_retry_delay)
+            logger.warning(
+                f"Dispatch {attempt} for fraud case {case['id']} failed, retrying in {delay}s: {error}"
+            )
+            self.case_store.fail_call(case["id"], error, time.time() + delay)
+            return "retry"
+
+        self.case_store.complete_call(case["id"], dispatch_id)
+        logger.info(
+            f"Dispatched call for fraud case {case['id']} ({case['amount']}): {dispatch_id}"
+        )
+        return "dispatched"
+
+    async def run_once(self) -> dict[str, int]:
+        """Dispatch every case claimable now; returns how many ended in each state
+
+        Retries that are not due yet are left for a later run.
+        """
+        results = {"dispatched": 0, "retry": 0, "failed": 0}
+        running = set()
+        while True:
+            free = self.concurrency - len(running)
+            if free:
+                for case, attempt in self.case_store.claim_calls(
+                    free, self.lease_seconds
+                ):
+                    running.add(asyncio.create_task(self._dispatch(case, attempt)))
+            if not running:
+                return results
+            done, running = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                results[task.result()] += 1
+
+    async def run(self, poll_interval: float) -> None:
+        """Keep dispatching new and retried cases until cancelled"""
+        while True:
+            results = await self.run_once()
+            if any(results.values()):
+                logger.info(f"Campaign pass finished: {results}")
+            await asyncio.sleep(poll_interval)
+
+
+async def run_campaign(args: argparse.Namespace) -> None:
+    case_store = CaseStore(args.db)
+    if not case_store.count():
+        logger.warning(
+            f"No fraud cases in {args.db}; start the agent once to import fraud_cases.json"
+        )
+        return
+
+    dispatch = LiveKitDispatcher(args.agent_name)
+    campaign = CampaignDispatcher(
+        case_store,
+        dispatch,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        max_attempts=args.max_attempts,
+    )
+    try:
+        if args.watch:
+            await campaign.run(args.watch)
+        else:
+            logger.info(f"Campaign finished: {await campaign.run_once()}")
+    finally:
+        await dispatch.aclose()
+
+
+def main() -> None:
+    load_dotenv(".env.local")
+    parser = argparse.ArgumentParser(description="Call every pending fraud case once")
+    parser.add_argument(
+        "--db", default="fraud_database/fraud_cases.db", help="case store database"
+    )
+    parser.add_argument(
+        "--agent-name",
+        default=os.getenv("FRAUD_AGENT_NAME", AGENT_NAME),
+        help="agent name the fraud worker is registered under",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="dispatches in progress at once"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=2.0, help="most dispatches started per second"
+    )
+    parser.add_argument(
+        "--max-attempts", type=int, default=3, help="dispatch attempts per case"
+    )
+    parser.add_argument(
+        "--watch",
+        type=float,
+        default=0.0,
+        help="keep running, checking for new cases every this many seconds",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_campaign(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import logging
+import threading
+from collections.abc import Iterable
+from typing import Any, Optional
+
+from case_store import CaseStore
+
+logger = logging.getLogger("fraud-agent")
+
+# Seconds between checks for case changes made by other sessions and processes
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class CaseCache:
+    """Per-process copy of every fraud case, shared by all sessions in a worker
+
+    Cases are loaded once, then kept current by tailing the case store's
+    change feed: only cases changed since the last refresh are read again.
+    Whether anything changed at all is a PRAGMA data_version check on a
+    connection of the cache's own, which reads no data and counts commits
+    from every connection, this process's included. A background thread
+    refreshes every `poll_interval` seconds, and a lookup that misses
+    refreshes once before giving up, so a just-created case is found.
+
+    Lookups are dictionary lookups and return copies, so sessions can't
+    change each other's cases. Changes go through `case_store`.
+    """
+
+    def __init__(
+        self, case_store: CaseStore, poll_interval: float = DEFAULT_POLL_INTERVAL
+    ):
+        self.case_store = case_store
+        self.poll_interval = poll_interval
+        self._db = case_store.connect(check_same_thread=False)
+        self._refresh_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self._cases: dict[int, dict[str, Any]] = {}
+        # Lowercased user name -> ids of that user's cases, oldest first. The
+        # tuples are replaced, never changed, so readers in other threads
+        # always see a whole one
+        self._names: dict[str, tuple[int, ...]] = {}
+        self._seq = 0
+        self._data_version = None
+        self.refresh()
+
+    def __len__(self) -> int:
+        return len(self._cases)
+
+    @staticmethod
+    def _index(
+        cases: Iterable[dict[str, Any]],
+    ) -> tuple[dict[int, dict[str, Any]], dict[str, tuple[int, ...]]]:
+        by_id = {case["id"]: case for case in cases}
+        names: dict[str, tuple[int, ...]] = {}
+        for case_id in sorted(by_id):
+            key = by_id[case_id]["userName"].strip().lower()
+            names[key] = (*names.get(key, ()), case_id)
+        return by_id, names
+
+    def _apply(self, cases: Iterable[dict[str, Any]]) -> None:
+        for case in cases:
+            old = self._cases.get(case["id"])
+            # The case goes in before its id, so an id found by name always has a case
+            self._cases[case["id"]] = case
+            key = case["userName"].strip().lower()
+            if old is not None:
+                old_key = old["userName"].strip().lower()
+                if old_key != key:
+                    ids = tuple(i for i in self._names[old_key] if i != case["id"])
+                    if ids:
+                        self._names[old_key] = ids
+                    else:
+                        del self._names[old_key]
+            ids = self._names.get(key, ())
+            if case["id"] not in ids:
+                self._names[key] = tuple(sorted((*ids, case["id"])))
+
+    def refresh(self) -> None:
+        """Pick up cases changed since the last refresh"""
+        with self._refresh_lock:
+            data_version = self._db.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+
+            # Read the feed after data_version, so no commit slips between them
+            changes = (
+                self.case_store.changes_since(self._seq)
+                if self._data_version is not None
+                else None
+            )
+            if changes is None:
+                self._seq, cases = self.case_store.snapshot()
+                # Built off to the side; lookups keep using the old maps meanwhile
+                self._cases, self._names = self._index(cases)
+                logger.info(f"Loaded {len(cases)} fraud cases into the case cache")
+            else:
+                self._seq, cases = changes
+                self._apply(cases)
+            self._data_version = data_version
+
+    def get(self, case_id: int) -> Optional[dict[str, Any]]:
+        case = self._cases.get(case_id)
+        if case is None:
+            self.refresh()
+            case = self._cases.get(case_id)
+        return dict(case) if case is not None else None
+
+    def find_by_name(self, user_name: str) -> Optional[dict[str, Any]]:
+        """Oldest case for this user name, ignoring case"""
+        key = user_name.strip().lower()
+        ids = self._names.get(key)
+        if ids is None:
+            self.refresh()
+            ids = self._names.get(key)
+        case = self._cases.get(ids[0]) if ids else None
+        return dict(case) if case is not None else None
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing fraud case cache: {e}")
+
+    def start(self) -> None:
+        """Start following the change feed in a background thread"""
+        if self._watcher is None:
+            self._stopped.clear()
+            self._watcher = threading.Thread(
+                target=self._watch, name="case-cache-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,434 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Optional
+
+from security_answers import LOCKOUT_SECONDS, MAX_FAILED_ANSWERS, protect_case
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cases (
+    id INTEGER PRIMARY KEY,
+    user_name_key TEXT NOT NULL,
+    security_identifier TEXT NOT NULL,
+    card_ending TEXT NOT NULL,
+    status TEXT NOT NULL,
+    amount REAL NOT NULL DEFAULT 0,
+    transaction_time TEXT NOT NULL DEFAULT '',
+    next_call_at REAL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cases_user_name ON cases (user_name_key);
+CREATE INDEX IF NOT EXISTS cases_security_identifier ON cases (security_identifier);
+CREATE INDEX IF NOT EXISTS cases_card_ending ON cases (card_ending);
+CREATE TABLE IF NOT EXISTS dispatches (
+    case_id INTEGER PRIMARY KEY,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    not_before REAL NOT NULL,
+    dispatch_id TEXT,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS case_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    case_id INTEGER NOT NULL
+);
+"""
+
+# Seconds a connection waits on another process's write before giving up.
+# Case writes touch a row or two, so waiting longer only stalls the caller
+BUSY_TIMEOUT = 5.0
+
+# PRAGMA user_version of a database `_migrate` has brought up to date
+SCHEMA_VERSION = 1
+
+# Most recent case changes kept in the journal; a cache further behind
+# than this reloads every case instead
+JOURNAL_LENGTH = 10_000
+
+# Pending cases that may still need a call, in the order outbound calls are
+# made: largest amount first, then the oldest transaction. Cases already
+# called, or given up on, have no next_call_at and drop out of the index, so
+# claiming reads only cases that can be claimed or are in flight
+CALL_QUEUE_INDEX = """
+CREATE INDEX IF NOT EXISTS cases_call_queue ON cases (amount DESC, transaction_time)
+WHERE status = 'pending_review' AND next_call_at IS NOT NULL
+"""
+
+
+def parse_amount(amount: Any) -> float:
+    """Numeric value of an amount such as "₹18,245", 0 if there is none"""
+    digits = re.sub(r"[^\d.]", "", str(amount))
+    try:
+        return float(digits)
+    except ValueError:
+        return 0.0
+
+
+def _columns(case: dict[str, Any]) -> tuple:
+    """Values of the indexed columns for a case"""
+    return (
+        case["userName"].strip().lower(),
+        case["securityIdentifier"],
+        case["cardEnding"],
+        case["case"],
+        parse_amount(case.get("amount")),
+        case.get("transactionTime", ""),
+    )
+
+
+class CaseStore:
+    """Fraud cases in SQLite, shared by every worker process
+
+    Each case is one row holding the case as JSON, plus indexed copies of
+    the fields calls look cases up by: the lowercased user name, the
+    security identifier and the card ending. An update rewrites one row in
+    its own transaction, so two calls finishing together both land and no
+    call ever rewrites the whole database. The database runs in WAL mode,
+    so lookups never wait on writers.
+
+    Cases returned carry their row id as "id"; pass it back to `update`.
+
+    Every import and update also appends the case id to the case_changes
+    journal, a change feed that `CaseCache` tails to stay current without
+    reloading every case.
+
+    Security answers are never stored: importing or updating a case
+    replaces securityAnswer with a salted hash (see security_answers).
+    Wrong answers are counted per case in "failedAnswers", and too many
+    lock verification until "verificationLockedUntil".
+
+    The dispatches table tracks outbound calls per case: a claimed case is
+    "in_flight" until its lease runs out, then "dispatched" once a call
+    went out, "retry" after a failed attempt, or "failed" for good. The
+    case's own next_call_at column says when it can next be claimed, and is
+    NULL once it needs no more calls.
+    """
+
+    def __init__(self, db_file: str = "fraud_database/fraud_cases.db"):
+        self.db_file = db_file
+        self._local = threading.local()
+        # Queues this process's writers on a lock instead of SQLite's
+        # sleep-and-retry busy handler
+        self._write_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+        self._migrate()
+
+    def connect(self, **kwargs: Any) -> sqlite3.Connection:
+        """A new connection to the store's database"""
+        db = sqlite3.connect(
+            self.db_file, timeout=BUSY_TIMEOUT, isolation_level=None, **kwargs
+        )
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections stay in the thread that opened them
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = self.connect()
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction, rolled back on error
+
+        BEGIN IMMEDIATE takes the write lock before reading, so concurrent
+        updates to one case apply one after the other.
+        """
+        db = self._connection()
+        with self._write_lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def _migrate(self) -> None:
+        """Bring databases created by earlier versions up to date
+
+        Adds the call priority and call queue columns and hashes plaintext
+        security answers. Runs once per database: PRAGMA user_version records
+        that it is done, so later opens only read the version.
+        """
+        if (
+            self._connection().execute("PRAGMA user_version").fetchone()[0]
+            >= SCHEMA_VERSION
+        ):
+            return
+        with self._transaction() as db:
+            # Another process may have migrated while this one waited for the lock
+            if db.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                return
+            columns = {row[1] for row in db.execute("PRAGMA table_info(cases)")}
+            if "amount" not in columns:
+                db.execute(
+                    "ALTER TABLE cases ADD COLUMN amount REAL NOT NULL DEFAULT 0"
+                )
+                db.execute(
+                    "ALTER TABLE cases ADD COLUMN transaction_time TEXT NOT NULL DEFAULT ''"
+                )
+                rows = db.execute("SELECT id, data FROM cases").fetchall()
+                db.executemany(
+                    "UPDATE cases SET amount = ?, transaction_time = ? WHERE id = ?",
+                    [
+                        (*_columns(json.loads(data))[4:], case_id)
+                        for case_id, data in rows
+                    ],
+                )
+            if "next_call_at" not in columns:
+                db.execute("ALTER TABLE cases ADD COLUMN next_call_at REAL DEFAULT 0")
+                db.execute(
+                    "UPDATE cases SET next_call_at = (SELECT CASE WHEN d.state IN ('dispatched', 'failed') "
+                    "THEN NULL ELSE d.not_before END FROM dispatches d WHERE d.case_id = cases.id) "
+                    "WHERE id IN (SELECT case_id FROM dispatches)"
+                )
+            db.execute("DROP INDEX IF EXISTS cases_call_priority")
+            db.execute(CALL_QUEUE_INDEX)
+            rows = db.execute(
+                "SELECT id, data FROM cases WHERE json_extract(data, '$.securityAnswer') IS NOT NULL"
+            ).fetchall()
+            for case_id, data in rows:
+                self._write(db, case_id, protect_case(json.loads(data)))
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM cases").fetchone()[0]
+
+    def seed(self, cases: Iterable[dict[str, Any]]) -> int:
+        """Import cases (e.g. fraud_cases.json) into an empty store
+
+        Returns how many were imported; 0 if another process got there first.
+        """
+        with self._transaction() as db:
+            if db.execute("SELECT COUNT(*) FROM cases").fetchone()[0]:
+                return 0
+            rows = [
+                (*_columns(case), json.dumps(case, ensure_ascii=False))
+                for case in (protect_case(dict(case)) for case in cases)
+            ]
+            db.executemany(
+                "INSERT INTO cases (user_name_key, security_identifier, card_ending, status, amount, "
+                "transaction_time, data) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            db.execute(
+                "INSERT INTO case_changes (case_id) SELECT id FROM cases ORDER BY id"
+            )
+        return len(rows)
+
+    @staticmethod
+    def _case(row: Any) -> dict[str, Any]:
+        case = json.loads(row[1])
+        case["id"] = row[0]
+        return case
+
+    def _select(self, where: str, args: tuple) -> list[dict[str, Any]]:
+        rows = self._connection().execute(
+            f"SELECT id, data FROM cases WHERE {where} ORDER BY id", args
+        )
+        return [self._case(row) for row in rows]
+
+    def get(self, case_id: int) -> Optional[dict[str, Any]]:
+        cases = self._select("id = ?", (case_id,))
+        return cases[0] if cases else None
+
+    def find_by_name(self, user_name: str) -> Optional[dict[str, Any]]:
+        """Oldest case for this user name, ignoring case"""
+        cases = self._select("user_name_key = ?", (user_name.strip().lower(),))
+        return cases[0] if cases else None
+
+    def find_by_security_identifier(
+        self, security_identifier: str
+    ) -> list[dict[str, Any]]:
+        return self._select("security_identifier = ?", (security_identifier.strip(),))
+
+    def find_by_card_ending(self, card_ending: str) -> list[dict[str, Any]]:
+        return self._select("card_ending = ?", (card_ending.strip(),))
+
+    def all_cases(self) -> list[dict[str, Any]]:
+        return self._select("1", ())
+
+    @contextmanager
+    def _read(self) -> Iterator[sqlite3.Connection]:
+        """Read transaction, so several queries see the same database state"""
+        db = self._connection()
+        db.execute("BEGIN")
+        try:
+            yield db
+        finally:
+            db.execute("COMMIT")
+
+    def _latest_change(self, db: sqlite3.Connection) -> int:
+        return db.execute("SELECT COALESCE(MAX(seq), 0) FROM case_changes").fetchone()[
+            0
+        ]
+
+    def snapshot(self) -> tuple[int, list[dict[str, Any]]]:
+        """Every case, with the change feed position they are current as of"""
+        with self._read() as db:
+            return self._latest_change(db), self._select("1", ())
+
+    def changes_since(self, seq: int) -> Optional[tuple[int, list[dict[str, Any]]]]:
+        """Cases changed after change feed position `seq`, and the new position
+
+        None if the journal no longer reaches back that far; take a new
+        `snapshot` instead.
+        """
+        with self._read() as db:
+            latest = self._latest_change(db)
+            if latest == seq:
+                return seq, []
+            oldest = db.execute("SELECT MIN(seq) FROM case_changes").fetchone()[0]
+            if oldest is None or oldest > seq + 1:
+                return None
+            return latest, self._select(
+                "id IN (SELECT case_id FROM case_changes WHERE seq > ? AND seq <= ?)",
+                (seq, latest),
+            )
+
+    @staticmethod
+    def _write(db: sqlite3.Connection, case_id: int, case: dict[str, Any]) -> None:
+        """Store a changed case inside an open transaction and journal it"""
+        db.execute(
+            "UPDATE cases SET user_name_key = ?, security_identifier = ?, card_ending = ?, status = ?, "
+            "amount = ?, transaction_time = ?, data = ? WHERE id = ?",
+            (*_columns(case), json.dumps(case, ensure_ascii=False), case_id),
+        )
+        seq = db.execute(
+            "INSERT INTO case_changes (case_id) VALUES (?)", (case_id,)
+        ).lastrowid
+        db.execute("DELETE FROM case_changes WHERE seq <= ?", (seq - JOURNAL_LENGTH,))
+
+    def _load(self, db: sqlite3.Connection, case_id: int) -> Optional[dict[str, Any]]:
+        row = db.execute("SELECT data FROM cases WHERE id = ?", (case_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, case_id: int, updates: dict[str, Any]) -> bool:
+        """Apply updates to one case and stamp callTimestamp; False if it is missing"""
+        with self._transaction() as db:
+            case = self._load(db, case_id)
+            if case is None:
+                return False
+            case.update(updates)
+            case["callTimestamp"] = datetime.now().isoformat()
+            self._write(db, case_id, protect_case(case))
+        return True
+
+    def record_wrong_answer(
+        self,
+        case_id: int,
+        max_failures: int = MAX_FAILED_ANSWERS,
+        lockout_seconds: float = LOCKOUT_SECONDS,
+    ) -> float:
+        """Count a wrong security answer, locking the case after `max_failures`
+
+        Returns when verification unlocks, or 0 if it is not locked. The count
+        is shared by every call about the case, in every worker.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            case = self._load(db, case_id)
+            if case is None:
+                return 0.0
+            locked_until = case.get("verificationLockedUntil", 0.0)
+            if locked_until <= now:
+                failures = case.get("failedAnswers", 0) + 1
+                if failures >= max_failures:
+                    failures, locked_until = 0, now + lockout_seconds
+                case["failedAnswers"] = failures
+                case["verificationLockedUntil"] = locked_until
+                self._write(db, case_id, case)
+            return locked_until if locked_until > now else 0.0
+
+    def accept_answer(self, case_id: int) -> bool:
+        """Confirm a right answer against the shared lockout and reset the count
+
+        False if the case was locked by another call in the meantime.
+        """
+        with self._transaction() as db:
+            case = self._load(db, case_id)
+            if case is None or case.get("verificationLockedUntil", 0.0) > time.time():
+                return False
+            if case.get("failedAnswers"):
+                case["failedAnswers"] = 0
+                self._write(db, case_id, case)
+            return True
+
+    def claim_calls(
+        self, limit: int, lease_seconds: float
+    ) -> list[tuple[dict[str, Any], int]]:
+        """Claim up to `limit` pending_review cases to call, highest priority first
+
+        Skips cases already called or claimed by another dispatcher, so each
+        case goes to one caller at a time. A claim that is neither completed
+        nor failed within `lease_seconds` (its dispatcher died) can be claimed
+        again. Returns each case with its attempt number, starting at 1.
+        """
+        now = time.time()
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT c.id, c.data, COALESCE(d.attempts, 0) FROM cases c "
+                "LEFT JOIN dispatches d ON d.case_id = c.id "
+                "WHERE c.status = 'pending_review' AND c.next_call_at IS NOT NULL AND c.next_call_at <= ? "
+                "ORDER BY c.amount DESC, c.transaction_time LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            not_before = now + lease_seconds
+            db.executemany(
+                "UPDATE cases SET next_call_at = ? WHERE id = ?",
+                [(not_before, row[0]) for row in rows],
+            )
+            db.executemany(
+                "INSERT INTO dispatches (case_id, state, attempts, not_before) VALUES (?, 'in_flight', 1, ?) "
+                "ON CONFLICT (case_id) DO UPDATE SET state = 'in_flight', attempts = attempts + 1, "
+                "not_before = excluded.not_before",
+                [(row[0], not_before) for row in rows],
+            )
+        return [(self._case(row), row[2] + 1) for row in rows]
+
+    def complete_call(self, case_id: int, dispatch_id: str) -> None:
+        """Record that the call for a claimed case went out"""
+        with self._transaction() as db:
+            db.execute("UPDATE cases SET next_call_at = NULL WHERE id = ?", (case_id,))
+            db.execute(
+                "UPDATE dispatches SET state = 'dispatched', dispatch_id = ?, error = NULL "
+                "WHERE case_id = ?",
+                (dispatch_id, case_id),
+            )
+
+    def fail_call(
+        self, case_id: int, error: str, retry_at: Optional[float] = None
+    ) -> None:
+        """Release a claimed case after a failed attempt
+
+        It becomes claimable again at `retry_at`, or never if that is None.
+        """
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE cases SET next_call_at = ? WHERE id = ?", (retry_at, case_id)
+            )
+            db.execute(
+                "UPDATE dispatches SET state = ?, not_before = ?, error = ? WHERE case_id = ?",
+                (
+                    "retry" if retry_at is not None else "failed",
+                    retry_at or 0,
+                    error,
+                    case_id,
+                ),
+            )
+
+    def call_states(self) -> dict[int, str]:
+        """Dispatch state of every case an outbound call was attempted for"""
+        return dict(
+            self._connection()
+            .execute("SELECT case_id, state FROM dispatches")
+            .fetchall()
+        )
@@ -0,0 +1,57 @@
+import functools
+import hashlib
+import hmac
+import os
+from typing import Any
+
+# Wrong answers allowed per case before verification locks, across all calls
+MAX_FAILED_ANSWERS = 3
+
+# Seconds a case stays locked after too many wrong answers
+LOCKOUT_SECONDS = 15 * 60
+
+
+@functools.lru_cache(maxsize=4)
+def _key(secret: str) -> bytes:
+    if not secret:
+        # An unkeyed hash of a city or pet name is guessed offline in seconds
+        raise RuntimeError("FRAUD_ANSWER_KEY must be set to hash security answers")
+    # blake2b keys are at most 64 bytes
+    return hashlib.blake2b(secret.encode("utf-8"), digest_size=32).digest()
+
+
+def normalize_answer(answer: str) -> str:
+    return " ".join(answer.lower().split())
+
+
+def hash_answer(answer: str, salt: bytes) -> str:
+    """Keyed, salted BLAKE2b hash of a normalized security answer
+
+    The key comes from FRAUD_ANSWER_KEY, so a copy of the case database
+    alone is not enough to test guesses offline. Every worker must use the
+    same key as the process that imported the cases; RuntimeError if it is
+    not set.
+    """
+    key = _key(os.getenv("FRAUD_ANSWER_KEY", ""))
+    return hashlib.blake2b(
+        normalize_answer(answer).encode("utf-8"), key=key, salt=salt
+    ).hexdigest()
+
+
+def protect_case(case: dict[str, Any]) -> dict[str, Any]:
+    """Replace a plaintext securityAnswer with a salt and hash, in place"""
+    if "securityAnswer" in case:
+        salt = os.urandom(hashlib.blake2b.SALT_SIZE)
+        case["securityAnswerSalt"] = salt.hex()
+        case["securityAnswerHash"] = hash_answer(str(case.pop("securityAnswer")), salt)
+    return case
+
+
+def check_answer(case: dict[str, Any], answer: str) -> bool:
+    """Whether the answer matches the case's hash, in constant time"""
+    expected = case.get("securityAnswerHash")
+    if not expected:
+        return False
+    return hmac.compare_digest(
+        hash_answer(answer, bytes.fromhex(case["securityAnswerSalt"])), expected
+    )
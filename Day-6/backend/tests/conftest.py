@@ -0,0 +1,34 @@
+from typing import Any, Callable
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def answer_key(monkeypatch) -> None:
+    monkeypatch.setenv("FRAUD_ANSWER_KEY", "test-answer-key")
+
+
+@pytest.fixture
+def make_case() -> Callable[..., dict]:
+    """Builds a case as in fraud_cases.json for "Customer i", with fields overridden
+
+    Identifiers and the security answer ("city<i>") differ per `i`.
+    """
+
+    def make(i: int = 1, **fields: Any) -> dict:
+        case = {
+            "userName": f"Customer {i}",
+            "securityIdentifier": str(10000 + i),
+            "cardEnding": f"{i:04d}",
+            "case": "pending_review",
+            "amount": "₹18,245",
+            "transactionTime": "2024-01-15 14:30:00",
+            "securityQuestion": "What is your birth city?",
+            "securityAnswer": f"city{i}",
+            "outcome": "",
+            "callTimestamp": "",
+        }
+        case.update(fields)
+        return case
+
+    return make
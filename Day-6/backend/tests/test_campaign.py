@@ -0,0 +1,191 @@
+import asyncio
+import json
+import sqlite3
+from typing import Optional
+
+from campaign import CampaignDispatcher
+from case_store import CaseStore
+
+
+class FakeDispatcher:
+    """Records dispatches instead of calling LiveKit
+
+    `failures` maps a case id to how many of its dispatches fail before
+    one succeeds.
+    """
+
+    def __init__(self, failures: Optional[dict[int, int]] = None, delay: float = 0.0):
+        self.failures = dict(failures or {})
+        self.delay = delay
+        self.dispatched: list[int] = []
+        self.active = 0
+        self.max_active = 0
+
+    async def __call__(self, case: dict) -> str:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.failures.get(case["id"], 0) > 0:
+                self.failures[case["id"]] -= 1
+                raise ConnectionError("LiveKit unavailable")
+            self.dispatched.append(case["id"])
+            return f"dispatch-{case['id']}"
+        finally:
+            self.active -= 1
+
+
+def _store(tmp_path, make_case) -> CaseStore:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    store.seed(
+        [
+            make_case(
+                1,
+                userName="Small",
+                amount="₹1,200",
+                transactionTime="2024-01-15 09:00:00",
+            ),
+            make_case(
+                2,
+                userName="Large",
+                amount="₹92,500",
+                transactionTime="2024-01-15 16:45:00",
+            ),
+            make_case(3, userName="Safe", amount="₹99,999", case="confirmed_safe"),
+            make_case(
+                4,
+                userName="Large Older",
+                amount="₹92,500",
+                transactionTime="2024-01-14 08:00:00",
+            ),
+            make_case(5, userName="Medium"),
+        ]
+    )
+    return store
+
+
+async def test_calls_pending_cases_once_in_priority_order(tmp_path, make_case) -> None:
+    store = _store(tmp_path, make_case)
+    fake = FakeDispatcher()
+    campaign = CampaignDispatcher(store, fake, concurrency=1, rate=1000)
+
+    assert await campaign.run_once() == {"dispatched": 4, "retry": 0, "failed": 0}
+    assert [store.get(case_id)["userName"] for case_id in fake.dispatched] == [
+        "Large Older",
+        "Large",
+        "Medium",
+        "Small",
+    ]
+
+    # A second pass, or a second campaign on the same store, calls nobody again
+    assert await CampaignDispatcher(store, fake).run_once() == {
+        "dispatched": 0,
+        "retry": 0,
+        "failed": 0,
+    }
+    assert len(fake.dispatched) == 4
+
+
+async def test_parallel_campaigns_never_share_a_case(tmp_path, make_case) -> None:
+    _store(tmp_path, make_case)
+    fake = FakeDispatcher(delay=0.01)
+    db_file = str(tmp_path / "cases.db")
+    campaigns = [
+        CampaignDispatcher(CaseStore(db_file), fake, concurrency=2, rate=1000)
+        for _ in range(3)
+    ]
+
+    await asyncio.gather(*(campaign.run_once() for campaign in campaigns))
+    assert sorted(fake.dispatched) == [1, 2, 4, 5]
+
+
+async def test_concurrency_and_retry_with_backoff(tmp_path, make_case) -> None:
+    store = _store(tmp_path, make_case)
+    fake = FakeDispatcher(failures={1: 1, 2: 5}, delay=0.01)
+    campaign = CampaignDispatcher(
+        store, fake, concurrency=2, rate=1000, max_attempts=2, retry_delay=0.05
+    )
+
+    assert await campaign.run_once() == {"dispatched": 2, "retry": 2, "failed": 0}
+    assert fake.max_active == 2
+    # Retries only come back once their backoff has passed
+    assert await campaign.run_once() == {"dispatched": 0, "retry": 0, "failed": 0}
+
+    await asyncio.sleep(0.06)
+    assert await campaign.run_once() == {"dispatched": 1, "retry": 0, "failed": 1}
+    assert store.call_states() == {
+        1: "dispatched",
+        2: "failed",
+        4: "dispatched",
+        5: "dispatched",
+    }
+
+
+async def test_called_cases_leave_the_call_queue(tmp_path, make_case) -> None:
+    store = _store(tmp_path, make_case)
+    await CampaignDispatcher(
+        store, FakeDispatcher(failures={2: 5}), max_attempts=1
+    ).run_once()
+
+    db = store.connect()
+    plan = db.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM cases WHERE status = 'pending_review' AND next_call_at IS NOT NULL "
+        "AND next_call_at <= 0 ORDER BY amount DESC, transaction_time"
+    ).fetchall()
+    assert "cases_call_queue" in plan[0][3]
+    # Claiming reads nothing once every pending case was called or given up on
+    assert (
+        db.execute(
+            "SELECT COUNT(*) FROM cases INDEXED BY cases_call_queue "
+            "WHERE status = 'pending_review' AND next_call_at IS NOT NULL"
+        ).fetchone()[0]
+        == 0
+    )
+
+
+async def test_rate_limit(tmp_path, make_case) -> None:
+    store = _store(tmp_path, make_case)
+    campaign = CampaignDispatcher(store, FakeDispatcher(), concurrency=1, rate=50)
+
+    started = asyncio.get_running_loop().time()
+    await campaign.run_once()
+    # The first dispatch uses the burst, the other three wait 20ms each
+    assert asyncio.get_running_loop().time() - started >= 0.055
+
+
+def test_existing_databases_gain_priority_columns(tmp_path, make_case) -> None:
+    db_file = str(tmp_path / "cases.db")
+    db = sqlite3.connect(db_file)
+    db.execute(
+        "CREATE TABLE cases (id INTEGER PRIMARY KEY, user_name_key TEXT NOT NULL, "
+        "security_identifier TEXT NOT NULL, card_ending TEXT NOT NULL, status TEXT NOT NULL, "
+        "data TEXT NOT NULL)"
+    )
+    for case in [
+        make_case(1, userName="Small", amount="₹1,200"),
+        make_case(2, userName="Large", amount="₹92,500"),
+    ]:
+        db.execute(
+            "INSERT INTO cases (user_name_key, security_identifier, card_ending, status, data) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                case["userName"].lower(),
+                case["securityIdentifier"],
+                case["cardEnding"],
+                case["case"],
+                json.dumps(case),
+            ),
+        )
+    db.commit()
+    db.close()
+
+    claimed = CaseStore(db_file).claim_calls(2, 60)
+    assert [(case["userName"], attempt) for case, attempt in claimed] == [
+        ("Large", 1),
+        ("Small", 1),
+    ]
+    # Plaintext security answers were hashed on the way
+    assert all(
+        "securityAnswer" not in case and case["securityAnswerHash"]
+        for case, _ in claimed
+    )
@@ -0,0 +1,64 @@
+import case_store as case_store_module
+from case_cache import CaseCache
+from case_store import CaseStore
+
+
+def test_follows_changes_from_other_connections(tmp_path, make_case) -> None:
+    db_file = str(tmp_path / "cases.db")
+    CaseStore(db_file).seed([make_case(i) for i in range(1, 101)])
+    cache = CaseCache(CaseStore(db_file))
+    assert len(cache) == 100
+    assert cache.find_by_name(" customer 42 ")["id"] == 42
+
+    # Another worker process finishes a call and renames a customer
+    other = CaseStore(db_file)
+    other.update(42, {"case": "confirmed_fraud"})
+    other.update(7, {"userName": "Customer Seven"})
+
+    reads = []
+    changes_since = cache.case_store.changes_since
+    cache.case_store.changes_since = lambda seq: reads.append(seq) or changes_since(seq)
+    cache.refresh()
+    assert cache.get(42)["case"] == "confirmed_fraud"
+    assert cache.find_by_name("customer seven")["id"] == 7
+    assert cache.find_by_name("customer 7") is None
+
+    # Nothing changed since, so refreshing reads nothing
+    cache.refresh()
+    cache.refresh()
+    assert len(reads) == 1
+
+
+def test_lookups_return_copies(tmp_path, make_case) -> None:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    store.seed([make_case(1)])
+    cache = CaseCache(store)
+
+    cache.get(1)["case"] = "confirmed_safe"
+    assert cache.find_by_name("Customer 1")["case"] == "pending_review"
+
+
+def test_reloads_when_the_journal_was_trimmed(tmp_path, monkeypatch, make_case) -> None:
+    monkeypatch.setattr(case_store_module, "JOURNAL_LENGTH", 3)
+    db_file = str(tmp_path / "cases.db")
+    CaseStore(db_file).seed([make_case(i) for i in range(1, 11)])
+    cache = CaseCache(CaseStore(db_file))
+
+    other = CaseStore(db_file)
+    for i in range(1, 11):
+        other.update(i, {"outcome": f"call {i}"})
+
+    assert cache.case_store.changes_since(cache._seq) is None
+    cache.refresh()
+    assert [cache.get(i)["outcome"] for i in range(1, 11)] == [
+        f"call {i}" for i in range(1, 11)
+    ]
+
+
+def test_missing_case_refreshes_before_giving_up(tmp_path, make_case) -> None:
+    db_file = str(tmp_path / "cases.db")
+    cache = CaseCache(CaseStore(db_file))
+    assert cache.get(1) is None
+
+    CaseStore(db_file).seed([make_case(1)])
+    assert cache.get(1)["userName"] == "Customer 1"
@@ -0,0 +1,110 @@
+import threading
+import time
+
+import pytest
+
+from case_store import SCHEMA_VERSION, CaseStore
+from security_answers import check_answer
+
+
+def test_indexed_lookups(tmp_path, make_case) -> None:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    assert store.seed([make_case(1), make_case(2, cardEnding="0001")]) == 2
+    assert store.seed([make_case(3)]) == 0
+
+    first = store.find_by_name(" CUSTOMER 1 ")
+    assert first["securityIdentifier"] == "10001"
+    assert store.get(first["id"])["amount"] == "₹18,245"
+    assert [c["userName"] for c in store.find_by_security_identifier("10002")] == [
+        "Customer 2"
+    ]
+    assert [c["userName"] for c in store.find_by_card_ending("0001")] == [
+        "Customer 1",
+        "Customer 2",
+    ]
+    assert store.find_by_name("nobody") is None
+
+
+def test_concurrent_updates_to_different_cases_all_land(tmp_path, make_case) -> None:
+    db_file = str(tmp_path / "cases.db")
+    CaseStore(db_file).seed([make_case(i) for i in range(20)])
+
+    def finish_call(case_id: int) -> None:
+        # A separate store per thread, like separate worker processes
+        CaseStore(db_file).update(
+            case_id, {"case": "confirmed_safe", "outcome": f"call {case_id}"}
+        )
+
+    threads = [
+        threading.Thread(target=finish_call, args=(case_id,))
+        for case_id in range(1, 21)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cases = CaseStore(db_file).all_cases()
+    assert [c["outcome"] for c in cases] == [f"call {i}" for i in range(1, 21)]
+    assert all(c["case"] == "confirmed_safe" and c["callTimestamp"] for c in cases)
+    assert not CaseStore(db_file).update(99, {"case": "confirmed_safe"})
+
+
+def test_security_answers_are_stored_hashed(tmp_path, make_case) -> None:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    store.seed([make_case(1), make_case(2)])
+    store.update(1, {"securityAnswer": "Mumbai"})
+
+    first, second = store.all_cases()
+    assert "securityAnswer" not in first and "securityAnswer" not in second
+    assert check_answer(second, " CITY2 ") and not check_answer(second, "mumbai")
+    assert check_answer(first, "mumbai")
+    # Same answer, different salts
+    store.update(2, {"securityAnswer": "Mumbai"})
+    assert store.get(2)["securityAnswerHash"] != store.get(1)["securityAnswerHash"]
+    for suffix in ["", "-wal"]:
+        with open(store.db_file + suffix, "rb") as f:
+            data = f.read()
+            assert b"city1" not in data and b"city2" not in data
+
+
+def test_security_answers_need_a_key(tmp_path, monkeypatch, make_case) -> None:
+    monkeypatch.setenv("FRAUD_ANSWER_KEY", "")
+    store = CaseStore(str(tmp_path / "cases.db"))
+    with pytest.raises(RuntimeError):
+        store.seed([make_case(1)])
+    assert store.count() == 0
+
+
+def test_migrated_databases_open_without_writing(tmp_path) -> None:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    db = store.connect()
+    assert db.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+
+    # Another process is writing; opening the store again doesn't wait for it
+    db.execute("BEGIN IMMEDIATE")
+    started = time.monotonic()
+    CaseStore(store.db_file)
+    assert time.monotonic() - started < 1
+    db.execute("ROLLBACK")
+
+
+def test_wrong_answers_lock_the_case_for_every_caller(tmp_path, make_case) -> None:
+    db_file = str(tmp_path / "cases.db")
+    CaseStore(db_file).seed([make_case(1)])
+    calls = [CaseStore(db_file) for _ in range(3)]
+
+    assert calls[0].record_wrong_answer(1, max_failures=3) == 0
+    assert calls[1].record_wrong_answer(1, max_failures=3) == 0
+    assert calls[2].accept_answer(1)
+    assert calls[2].get(1)["failedAnswers"] == 0
+
+    for call in calls:
+        locked_until = call.record_wrong_answer(1, max_failures=3, lockout_seconds=60)
+    assert locked_until > time.time() + 59
+    assert not calls[0].accept_answer(1)
+    # Further guesses while locked don't extend the lock
+    assert (
+        calls[1].record_wrong_answer(1, max_failures=3, lockout_seconds=600)
+        == locked_until
+    )
@@ -0,0 +1,114 @@
+import asyncio
+import time
+
+from agent import FraudAlertAgent, case_id_from_metadata
+from case_cache import CaseCache
+from case_store import CaseStore
+
+
+def test_prompt_size_does_not_grow_with_cases(tmp_path, make_case) -> None:
+    small = CaseStore(str(tmp_path / "small.db"))
+    small.seed([make_case(i) for i in range(1, 3)])
+    large = CaseStore(str(tmp_path / "large.db"))
+    large.seed([make_case(i) for i in range(1, 2001)])
+
+    small_agent = FraudAlertAgent(case_cache=CaseCache(small))
+    assert len(small_agent.instructions) == len(
+        FraudAlertAgent(case_cache=CaseCache(large)).instructions
+    )
+
+    scoped = FraudAlertAgent(case_cache=CaseCache(large), target_case=large.get(1234))
+    assert "Customer 1234" in scoped.instructions
+    assert "city1234" not in scoped.instructions
+    assert len(scoped.instructions) < 3000
+
+
+async def test_scoped_call_only_finds_its_own_case(tmp_path, make_case) -> None:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    store.seed([make_case(1), make_case(2)])
+    agent = FraudAlertAgent(case_cache=CaseCache(store), target_case=store.get(2))
+
+    assert "No pending fraud cases" in await agent.find_fraud_case(None, "Customer 1")
+    assert "Security question" in await agent.find_fraud_case(None, "customer 2")
+    assert agent.current_case["id"] == 2
+
+
+def test_case_id_from_metadata() -> None:
+    assert case_id_from_metadata('{"case_id": 42}') == 42
+    assert case_id_from_metadata('{"case_id": "7"}') == 7
+    assert case_id_from_metadata("") is None
+    assert case_id_from_metadata("not json") is None
+    assert case_id_from_metadata('{"room": "x"}') is None
+
+
+async def test_verification_locks_after_repeated_wrong_answers(
+    tmp_path, make_case
+) -> None:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    store.seed([make_case(1)])
+    cache = CaseCache(store)
+
+    async def answer(text: str) -> str:
+        # A new call each time, as a brute-force caller would make
+        agent = FraudAlertAgent(case_cache=cache)
+        await agent.find_fraud_case(None, "Customer 1")
+        return await agent.verify_security_answer(None, text)
+
+    assert "Verification successful" in await answer("City1 ")
+    assert "cannot verify" in await answer("paris")
+    # A right answer after a wrong one resets the count
+    assert "Verification successful" in await answer("city1")
+    assert store.get(1)["failedAnswers"] == 0
+    for guess in ["paris", "london", "tokyo"]:
+        assert "cannot verify" in await answer(guess)
+
+    # Even the right answer is refused while the case is locked
+    assert "temporarily locked" in await answer("city1")
+    assert "temporarily locked" in await answer("rome")
+    assert store.get(1)["failedAnswers"] == 0
+
+
+async def test_right_answers_do_not_wait_for_writers(tmp_path, make_case) -> None:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    store.seed([make_case(1)])
+    agent = FraudAlertAgent(case_cache=CaseCache(store))
+    await agent.find_fraud_case(None, "Customer 1")
+
+    # Another worker is writing; a right answer needs nothing from the writer
+    db = store.connect()
+    db.execute("BEGIN IMMEDIATE")
+    started = time.monotonic()
+    assert "Verification successful" in await agent.verify_security_answer(
+        None, "city1"
+    )
+    assert time.monotonic() - started < 1
+    db.execute("ROLLBACK")
+
+
+def test_keeps_the_shared_cache_while_it_is_empty(tmp_path) -> None:
+    cache = CaseCache(CaseStore(str(tmp_path / "cases.db")))
+    assert len(cache) == 0
+    assert FraudAlertAgent(case_cache=cache).case_cache is cache
+
+
+async def test_call_outcome_is_saved_off_the_event_loop(tmp_path, make_case) -> None:
+    store = CaseStore(str(tmp_path / "cases.db"))
+    store.seed([make_case(1)])
+    agent = FraudAlertAgent(case_cache=CaseCache(store))
+    await agent.find_fraud_case(None, "Customer 1")
+    await agent.verify_security_answer(None, "city1")
+
+    # Another worker holds the write lock for a moment
+    db = store.connect()
+    db.execute("BEGIN IMMEDIATE")
+    saving = asyncio.create_task(
+        agent.handle_transaction_response(None, "No, that was not me")
+    )
+    started = time.monotonic()
+    await asyncio.sleep(0.2)
+    assert time.monotonic() - started < 0.5
+    assert not saving.done()
+
+    db.execute("COMMIT")
+    assert "fraudulent" in await saving
+    assert store.get(1)["case"] == "confirmed_fraud"
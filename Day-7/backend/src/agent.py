@@ -1,7 +1,9 @@
+import asyncio
 import logging
 import os
-import json
+import uuid
 from datetime import datetime
+from typing import Optional, List
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
@@ -20,49 +22,41 @@ from livekit.agents import (
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from cart import Cart
+from catalog_service import CatalogService
+from inventory import InventoryStore
+from order_ids import OrderIdGenerator
+from order_sink import OrderSink
+from recipes import find_recipe
+
 logger = logging.getLogger("food-ordering-agent")
 load_dotenv(".env.local")
 
 # Create necessary directories
 os.makedirs("orders", exist_ok=True)
 
-def load_catalog():
-    """Load food catalog from existing catalog.json file"""
-    catalog_file = "catalog.json"
-    
-    try:
-        with open(catalog_file, 'r') as f:
-            data = json.load(f)
-        logger.info("Loaded food catalog successfully")
-        return data
-    except Exception as e:
-        logger.error(f"Error loading catalog: {e}")
-        # Return empty catalog if file doesn't exist
-        return {"categories": [], "recipes": {}}
+# Items read out per page of search results
+SEARCH_PAGE_SIZE = 6
 
-def save_order(order_data):
-    """Save order to JSON file in orders folder"""
-    try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"orders/order_{timestamp}.json"
-        
-        with open(filename, 'w') as f:
-            json.dump(order_data, f, indent=2)
-        
-        logger.info(f"Order saved to: {filename}")
-        return filename
-    except Exception as e:
-        logger.error(f"Error saving order: {e}")
-        return None
-
-def get_cart_total(cart):
-    """Calculate total amount from cart"""
-    return sum(item["price"] * item["quantity"] for item in cart)
+# One generator per worker process, shared by all of its sessions
+order_ids = OrderIdGenerator()
 
 class FoodOrderingAgent(Agent):
-    def __init__(self):
-        self.catalog = load_catalog()
-        self.cart = []
+    def __init__(self, catalog_service: Optional[CatalogService] = None,
+                 order_sink: Optional[OrderSink] = None,
+                 inventory: Optional[InventoryStore] = None):
+        # Shared per worker process when created in prewarm
+        self.catalog_service = catalog_service or CatalogService()
+        self.order_sink = order_sink or OrderSink()
+        if inventory is None:
+            inventory = InventoryStore()
+            inventory.seed(self.catalog_service.snapshot.catalog)
+        self.inventory = inventory
+        self.cart = Cart()
+        # Stock for everything in the cart is held under this id until checkout
+        self.cart_id = uuid.uuid4().hex
+        # (catalog snapshot, query, next offset) of the last search with more results
+        self.search_cursor = None
         self.conversation_state = "greeting"
         
         instructions = """You are Priya, a friendly and enthusiastic food ordering assistant for QuickBasket. You help customers order groceries and food items with a warm, personalized touch.
@@ -80,12 +74,14 @@ CONVERSATION FLOW:
    - Listen carefully to what customer wants
    - Suggest related items: "Would you like some cheese with that bread?"
    - Offer alternatives if items are unavailable
+   - Search results come a few at a time; use show_more_items when the customer wants to hear more
    - Help with meal planning: "That sounds delicious! Do you need anything else for your meal?"
 
 3. RECIPE ASSISTANCE:
    - For recipe requests, enthusiastically explain what you're adding
    - "Wonderful choice! For a perfect sandwich, I'll add fresh bread, eggs, and tomatoes"
    - Suggest additional items that might complement the recipe
+   - Scale recipes to the number of people ("pasta for 6") and leave out ingredients the customer already has at home
 
 4. CART MANAGEMENT:
    - Always confirm additions with price and quantity
@@ -113,27 +109,33 @@ IMPORTANT:
 
         super().__init__(instructions=instructions)
 
-    def find_item(self, item_name):
-        """Find item in catalog by name with fuzzy matching"""
-        item_name_lower = item_name.lower()
-        
-        # Exact match first
-        for category in self.catalog["categories"]:
-            for item in category["items"]:
-                if item_name_lower == item["name"].lower():
-                    return item
-        
-        # Partial match
-        for category in self.catalog["categories"]:
-            for item in category["items"]:
-                if (item_name_lower in item["name"].lower() or 
-                    any(item_name_lower in tag for tag in item.get("tags", []))):
-                    return item
-        return None
-
-    def get_recipe_items(self, recipe_name):
-        """Get items for a recipe with enthusiastic descriptions"""
-        recipe_name_lower = recipe_name.lower()
+    @property
+    def catalog(self):
+        """The latest catalog.json, swapped in whenever the file changes"""
+        return self.catalog_service.snapshot.catalog
+
+    @property
+    def catalog_index(self):
+        return self.catalog_service.snapshot.index
+
+    def find_item(self, item_name, fuzzy=True):
+        """Find item in catalog by name, with typo-tolerant matching if `fuzzy`"""
+        return self.catalog_index.find_item(item_name, fuzzy)
+
+    async def hold_stock(self, quantities):
+        """Hold stock for these cart quantities; returns shortfalls, {} if all held
+
+        Inventory writes wait on other processes for SQLite's write lock, so
+        they run in a worker thread rather than on the event loop serving audio.
+        """
+        return await asyncio.to_thread(self.inventory.hold, self.cart_id, quantities)
+
+    async def release_stock(self):
+        """Give back all stock held by this cart"""
+        await asyncio.to_thread(self.inventory.release, self.cart_id)
+
+    def get_recipe(self, recipe_name):
+        """Get the precompiled recipe bundle with an enthusiastic description"""
         recipe_descriptions = {
             "sandwich": "a delicious sandwich",
             "pasta": "a tasty pasta meal", 
@@ -141,36 +143,41 @@ IMPORTANT:
             "breakfast": "a complete breakfast"
         }
         
-        for recipe, items in self.catalog["recipes"].items():
-            if recipe_name_lower in recipe:
-                return items, recipe_descriptions.get(recipe, "this recipe")
-        return [], ""
+        bundle = find_recipe(self.catalog_service.snapshot.recipes, recipe_name)
+        if bundle:
+            return bundle, recipe_descriptions.get(bundle.name, "this recipe")
+        return None, ""
 
     @function_tool
     async def add_item_to_cart(self, context: RunContext, item_name: str, quantity: int = 1) -> str:
         """Add an item to the shopping cart with enthusiastic confirmation"""
-        item = self.find_item(item_name)
+        if quantity <= 0:
+            return "How many would you like? I can add one or more. To take something out of your cart, just ask me to remove it!"
+
+        item = self.find_item(item_name, fuzzy=False)
         if not item:
+            # Never swap in a different item without the customer agreeing
+            close_match = self.find_item(item_name)
+            if close_match:
+                return f"Hmm, I couldn't find '{item_name}' exactly. Did you mean {close_match['name']} (₹{close_match['price']} per {close_match['unit']})? Just say yes and I'll add it!"
             return f"Oh dear! I couldn't find '{item_name}' in our store. Maybe try a different name? Or I can help you search for similar items!"
         
+        existing = self.cart.get(item["id"])
+        in_cart = existing["quantity"] if existing else 0
+        shortfalls = await self.hold_stock({item["id"]: in_cart + quantity})
+        if shortfalls:
+            can_add = shortfalls[item["id"]] - in_cart
+            if can_add <= 0:
+                return f"Oh no! {item['name']} is sold out right now. Shall I find you something similar?"
+            return f"Sorry, we only have {can_add} more {item['unit']} of {item['name']} right now. Shall I add {can_add} instead?"
+        
         # Check if item already in cart
-        for cart_item in self.cart:
-            if cart_item["id"] == item["id"]:
-                cart_item["quantity"] += quantity
-                total_price = cart_item["quantity"] * item["price"]
-                return f"Achha! Updated your {item['name']} to {cart_item['quantity']} {item['unit']}(s). Perfect! Total for this item: ₹{total_price}"
+        if existing:
+            cart_item = self.cart.add(item, quantity)
+            return f"Achha! Updated your {item['name']} to {cart_item['quantity']} {item['unit']}(s). Perfect! Total for this item: ₹{cart_item['total']}"
 
         # Add new item to cart
-        cart_item = {
-            "id": item["id"],
-            "name": item["name"],
-            "price": item["price"],
-            "quantity": quantity,
-            "unit": item["unit"],
-            "brand": item.get("brand", ""),
-            "total": item["price"] * quantity
-        }
-        self.cart.append(cart_item)
+        self.cart.add(item, quantity)
         
         # Enthusiastic confirmation with suggestions
         suggestions = {
@@ -184,36 +191,51 @@ IMPORTANT:
         return f"Wonderful! Added {quantity} {item['unit']} of {item['name']} to your cart. ₹{item['price']} each. {suggestion}"
 
     @function_tool
-    async def add_recipe_to_cart(self, context: RunContext, recipe_name: str) -> str:
-        """Add all ingredients for a recipe to the cart with excited explanation"""
-        recipe_items, recipe_desc = self.get_recipe_items(recipe_name)
-        if not recipe_items:
-            return f"Oh! I don't have a specific recipe for '{recipe_name}' yet. But I can help you add items individually! Available recipes: sandwich, pasta, salad, breakfast."
+    async def add_recipe_to_cart(self, context: RunContext, recipe_name: str, servings: int = 0,
+                                 pantry_items: Optional[List[str]] = None) -> str:
+        """Add all ingredients for a recipe to the cart with excited explanation
+
+        Args:
+            recipe_name: The recipe, e.g. "pasta"
+            servings: How many people to cook for, e.g. 6 for "pasta for 6"; 0 for the recipe's usual amount
+            pantry_items: Ingredients the customer already has at home and wants left out
+        """
+        if servings < 0:
+            return "How many people are you cooking for? Just tell me a number and I'll scale the recipe!"
+
+        bundle, recipe_desc = self.get_recipe(recipe_name)
+        if not bundle:
+            available = ", ".join(self.catalog_service.snapshot.recipes)
+            return f"Oh! I don't have a specific recipe for '{recipe_name}' yet. But I can help you add items individually! Available recipes: {available}."
+        
+        lines = bundle.scaled(servings, pantry_items or [])
+        
+        def cart_quantities(lines):
+            return {item["id"]: quantity + (self.cart.get(item["id"]) or {}).get("quantity", 0)
+                    for item, quantity in lines}
         
-        added_items = []
-        for item_name in recipe_items:
-            item = self.find_item(item_name)
-            if item:
-                # Check if already in cart
-                existing_item = next((ci for ci in self.cart if ci["id"] == item["id"]), None)
-                if existing_item:
-                    existing_item["quantity"] += 1
-                    existing_item["total"] = existing_item["price"] * existing_item["quantity"]
-                else:
-                    cart_item = {
-                        "id": item["id"],
-                        "name": item["name"],
-                        "price": item["price"],
-                        "quantity": 1,
-                        "unit": item["unit"],
-                        "brand": item.get("brand", ""),
-                        "total": item["price"]
-                    }
-                    self.cart.append(cart_item)
-                added_items.append(item["name"])
+        # Hold stock for the whole recipe at once; leave out what has run short
+        sold_out = []
+        shortfalls = await self.hold_stock(cart_quantities(lines))
+        if shortfalls:
+            sold_out = [item["name"] for item, _ in lines if item["id"] in shortfalls]
+            lines = [(item, quantity) for item, quantity in lines if item["id"] not in shortfalls]
+            if await self.hold_stock(cart_quantities(lines)):
+                return "Oh no! Some of those ingredients just sold out. Could you try the recipe again in a moment?"
+        
+        self.cart.add_lines(lines)
+        added_items = [f"{quantity} {item['unit']} {item['name']}" for item, quantity in lines]
         
         if added_items:
-            return f"Yay! I've added everything you need for {recipe_desc}: {', '.join(added_items)}. Your cart is looking great with {len(self.cart)} items now! 🎉"
+            serving_note = f" for {servings} people" if servings else ""
+            response = f"Yay! I've added everything you need for {recipe_desc}{serving_note}: {', '.join(added_items)}. Your cart is looking great with {len(self.cart)} items now! 🎉"
+            if sold_out:
+                response += f" Just so you know, {', '.join(sold_out)} is out of stock, so I left it out."
+            return response
+        elif sold_out:
+            return f"Oh no! The ingredients for {recipe_desc} are out of stock right now: {', '.join(sold_out)}. Shall we try another recipe?"
+        elif pantry_items:
+            return f"Looks like you already have everything for {recipe_desc} at home! Anything else you'd like? 😊"
         else:
             return "Hmm, I couldn't find the ingredients for that recipe. Let me help you add them one by one!"
 
@@ -224,13 +246,10 @@ IMPORTANT:
             return "Your cart is looking a bit empty! What delicious items would you like to add today? I'm here to help! 😊"
         
         cart_summary = "Let me show you your amazing cart! 🛒\n\n"
-        total_amount = get_cart_total(self.cart)
-        
         for i, item in enumerate(self.cart, 1):
-            item_total = item["price"] * item["quantity"]
-            cart_summary += f"{i}. {item['quantity']} {item['unit']} {item['name']} - ₹{item_total}\n"
+            cart_summary += f"{i}. {item['quantity']} {item['unit']} {item['name']} - ₹{item['total']}\n"
         
-        cart_summary += f"\n🎊 Total amount: ₹{total_amount}\n"
+        cart_summary += f"\n🎊 Total amount: ₹{self.cart.total}\n"
         
         # Add encouraging message based on cart size
         if len(self.cart) >= 5:
@@ -245,75 +264,99 @@ IMPORTANT:
     @function_tool
     async def remove_item_from_cart(self, context: RunContext, item_name: str) -> str:
         """Remove an item from the cart with friendly confirmation"""
-        item_name_lower = item_name.lower()
-        for i, cart_item in enumerate(self.cart):
-            if item_name_lower in cart_item["name"].lower():
-                removed_item = self.cart.pop(i)
-                remaining_items = len(self.cart)
-                
-                if remaining_items > 0:
-                    return f"No problem! I've removed {removed_item['name']} from your cart. You still have {remaining_items} wonderful items left! 😊"
-                else:
-                    return f"Removed {removed_item['name']}. Your cart is empty now. What would you like to add? I have so many delicious options!"
+        cart_item = self.cart.find(item_name)
+        if cart_item:
+            removed_item = self.cart.remove(cart_item["id"])
+            await self.hold_stock({removed_item["id"]: 0})
+            remaining_items = len(self.cart)
+            
+            if remaining_items > 0:
+                return f"No problem! I've removed {removed_item['name']} from your cart. You still have {remaining_items} wonderful items left! 😊"
+            else:
+                return f"Removed {removed_item['name']}. Your cart is empty now. What would you like to add? I have so many delicious options!"
         
         return f"I looked everywhere but couldn't find '{item_name}' in your cart. Want to try again or see what's in your cart?"
 
     @function_tool
     async def update_item_quantity(self, context: RunContext, item_name: str, new_quantity: int) -> str:
         """Update quantity of an item in the cart with positive confirmation"""
-        item_name_lower = item_name.lower()
-        for cart_item in self.cart:
-            if item_name_lower in cart_item["name"].lower():
-                if new_quantity <= 0:
-                    return await self.remove_item_from_cart(context, item_name)
-                
-                old_quantity = cart_item["quantity"]
-                cart_item["quantity"] = new_quantity
-                cart_item["total"] = cart_item["price"] * new_quantity
-                
-                if new_quantity > old_quantity:
-                    return f"Excellent! Updated {cart_item['name']} from {old_quantity} to {new_quantity}. Smart shopping! 🛍️"
-                else:
-                    return f"Sure thing! Updated {cart_item['name']} quantity to {new_quantity}. Perfect for your needs! 👍"
+        cart_item = self.cart.find(item_name)
+        if cart_item:
+            if new_quantity <= 0:
+                return await self.remove_item_from_cart(context, item_name)
+            
+            old_quantity = cart_item["quantity"]
+            shortfalls = await self.hold_stock({cart_item["id"]: new_quantity})
+            if shortfalls:
+                return f"Sorry, we can only do {shortfalls[cart_item['id']]} {cart_item['unit']} of {cart_item['name']} right now. Shall I set it to that?"
+            self.cart.set_quantity(cart_item["id"], new_quantity)
+            
+            if new_quantity > old_quantity:
+                return f"Excellent! Updated {cart_item['name']} from {old_quantity} to {new_quantity}. Smart shopping! 🛍️"
+            else:
+                return f"Sure thing! Updated {cart_item['name']} quantity to {new_quantity}. Perfect for your needs! 👍"
         
         return f"I couldn't find '{item_name}' in your cart. Would you like to add it?"
 
+    def _search_page(self, snapshot, query, offset):
+        """Read out one page of ranked results and remember where it ended"""
+        positions, total = snapshot.index.search(query, offset, SEARCH_PAGE_SIZE)
+        if not positions:
+            self.search_cursor = None
+            return "", 0
+
+        response = ""
+        for position in positions:
+            item = snapshot.index.items[position]
+            response += f"• {item['name']} - ₹{item['price']} per {item['unit']} ({snapshot.index.categories[position]})\n"
+
+        remaining = total - offset - len(positions)
+        if remaining > 0:
+            # Later pages come from the same snapshot, even if the catalog reloads meanwhile
+            self.search_cursor = (snapshot, query, offset + len(positions))
+            response += f"\n...and {remaining} more! Want me to show more, or shall I be more specific?"
+        else:
+            self.search_cursor = None
+            response += "\nWhich of these would you like to add to your cart? 😊"
+        return response, total
+
     @function_tool
     async def search_items(self, context: RunContext, query: str) -> str:
         """Search for items in the catalog with helpful suggestions"""
-        query_lower = query.lower()
-        found_items = []
+        # One snapshot for the whole search, even if the catalog reloads meanwhile
+        snapshot = self.catalog_service.snapshot
         
-        for category in self.catalog["categories"]:
-            for item in category["items"]:
-                if (query_lower in item["name"].lower() or 
-                    query_lower in category["name"].lower() or
-                    any(query_lower in tag for tag in item.get("tags", []))):
-                    found_items.append({
-                        "name": item["name"],
-                        "price": item["price"],
-                        "unit": item["unit"],
-                        "category": category["name"]
-                    })
+        results, _ = self._search_page(snapshot, query, 0)
+        if results:
+            return f"I found these wonderful items matching '{query}':\n\n" + results
         
-        if found_items:
-            response = f"I found these wonderful items matching '{query}':\n\n"
-            for item in found_items[:6]:  # Limit to 6 results
-                response += f"• {item['name']} - ₹{item['price']} per {item['unit']} ({item['category']})\n"
-            
-            if len(found_items) > 6:
-                response += f"\n...and {len(found_items) - 6} more! Would you like me to be more specific?"
-            else:
-                response += "\nWhich of these would you like to add to your cart? 😊"
-                
+        # Nothing contains the query, so it may be a speech-to-text near miss
+        close_matches = snapshot.index.fuzzy_matches(query, limit=3)
+        if close_matches:
+            response = f"I couldn't find '{query}' exactly, but did you mean:\n\n"
+            for _, position in close_matches:
+                item = snapshot.index.items[position]
+                response += f"• {item['name']} - ₹{item['price']} per {item['unit']} ({snapshot.index.categories[position]})\n"
+            response += "\nShall I add one of these to your cart? 😊"
             return response
-        else:
-            return f"I searched high and low but couldn't find '{query}'. Try searching by category like 'groceries', 'fruits', or 'snacks'. Or I can show you all categories!"
+        
+        return f"I searched high and low but couldn't find '{query}'. Try searching by category like 'groceries', 'fruits', or 'snacks'. Or I can show you all categories!"
+
+    @function_tool
+    async def show_more_items(self, context: RunContext) -> str:
+        """Continue the last search with the next few matching items"""
+        if not self.search_cursor:
+            return "That's everything I found! Would you like to search for something else? 😊"
+        
+        snapshot, query, offset = self.search_cursor
+        results, _ = self._search_page(snapshot, query, offset)
+        return f"Here are more items matching '{query}':\n\n" + results
 
     @function_tool
     async def show_categories(self, context: RunContext) -> str:
         """Show all available categories with enticing descriptions"""
-        if not self.catalog["categories"]:
+        catalog = self.catalog
+        if not catalog["categories"]:
             return "Our store is getting ready! Categories will be available soon. 🛒"
         
         response = "Here are all our wonderful categories:\n\n"
@@ -324,7 +367,7 @@ IMPORTANT:
             "Prepared Food": "Ready-to-eat delicious meals! 🍕🍛"
         }
         
-        for category in self.catalog["categories"]:
+        for category in catalog["categories"]:
             desc = category_descriptions.get(category["name"], "Amazing products!")
             item_count = len(category["items"])
             response += f"• {category['name']} - {desc} ({item_count} items)\n"
@@ -334,20 +377,28 @@ IMPORTANT:
 
     @function_tool
     async def place_order(self, context: RunContext, customer_name: str = "Valued Customer") -> str:
-        """Place the final order with celebration and save to file"""
+        """Place the final order with celebration and save it"""
         if not self.cart:
             return "Your cart is empty! Let's fill it with some delicious items first. What would you like to add? 🛒"
 
+        # Turn the cart's stock holds into sales, or stop if anything ran out
+        shortfalls = await asyncio.to_thread(
+            self.inventory.commit, self.cart_id, {item["id"]: item["quantity"] for item in self.cart})
+        if shortfalls:
+            short_items = [f"{self.cart.get(item_id)['name']} (only {available} left)"
+                           for item_id, available in shortfalls.items()]
+            return f"Oh no! Some items sold out while you were shopping: {', '.join(short_items)}. Shall I update your cart?"
+
         # Calculate total
-        total_amount = get_cart_total(self.cart)
-        item_count = sum(item["quantity"] for item in self.cart)
+        total_amount = self.cart.total
+        item_count = self.cart.item_count
         
         # Create comprehensive order object
         order_data = {
-            "order_id": f"QB{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            "order_id": order_ids.next_id(),
             "customer_name": customer_name,
             "timestamp": datetime.now().isoformat(),
-            "items": self.cart.copy(),
+            "items": self.cart.to_list(),
             "item_count": item_count,
             "total_amount": total_amount,
             "status": "confirmed",
@@ -355,23 +406,21 @@ IMPORTANT:
             "store": "QuickBasket Express"
         }
         
-        # Save order to file in orders folder
-        filename = save_order(order_data)
+        # Queue the order; it is written to orders/orders.jsonl in the background
+        self.order_sink.submit(order_data)
         
-        if filename:
-            # Celebration message based on order size
-            if item_count >= 8:
-                celebration = "WOW! What a fantastic order! 🎉"
-            elif item_count >= 5:
-                celebration = "Excellent choices! Your order looks amazing! 🌟"
-            else:
-                celebration = "Lovely selection! Your order is perfect! 👍"
-            
-            # Clear cart after successful order
-            order_summary = self.cart.copy()
-            self.cart.clear()
-            
-            return f"""{celebration}
+        # Celebration message based on order size
+        if item_count >= 8:
+            celebration = "WOW! What a fantastic order! 🎉"
+        elif item_count >= 5:
+            celebration = "Excellent choices! Your order looks amazing! 🌟"
+        else:
+            celebration = "Lovely selection! Your order is perfect! 👍"
+        
+        # Clear cart after successful order
+        self.cart.clear()
+        
+        return f"""{celebration}
 
 🎊 ORDER PLACED SUCCESSFULLY! 🎊
 
@@ -380,9 +429,7 @@ Items: {item_count} products
 Total: ₹{total_amount}
 Delivery: {order_data['delivery_estimate']}
 
-Thank you for shopping with QuickBasket! Your order has been saved and will be delivered soon. Shukriya! 💝"""
-        else:
-            return "Oh no! There was a small issue saving your order. Please try again in a moment. I'm really sorry for the inconvenience! 🙏"
+Thank you for shopping with QuickBasket! Your order is confirmed and will be delivered soon. Shukriya! 💝"""
 
     @function_tool
     async def clear_cart(self, context: RunContext) -> str:
@@ -392,18 +439,28 @@ Thank you for shopping with QuickBasket! Your order has been saved and will be d
         
         item_count = len(self.cart)
         self.cart.clear()
+        await self.release_stock()
         return f"Cleared your cart of {item_count} items. No problem at all! Fresh start - what delicious items would you like to add now? 🛒"
 
 def prewarm(proc: JobProcess):
     """Preload models and food catalog"""
     logger.info("Prewarming QuickBasket food ordering agent...")
     proc.userdata["vad"] = silero.VAD.load()
-    # Preload food catalog
-    catalog = load_catalog()
-    if catalog and catalog["categories"]:
+    # Preload food catalog once for every session in this process and
+    # pick up edits to catalog.json without a restart; new items with a
+    # "stock" count start being tracked by the shared inventory
+    inventory = InventoryStore()
+    catalog_service = CatalogService(on_load=inventory.seed)
+    catalog = catalog_service.snapshot.catalog
+    if catalog["categories"]:
         logger.info(f"Loaded catalog with {len(catalog['categories'])} categories during prewarm")
     else:
         logger.warning("Catalog is empty or couldn't be loaded during prewarm")
+    catalog_service.start()
+    proc.userdata["catalog_service"] = catalog_service
+    proc.userdata["inventory"] = inventory
+    # One sink per process, so orders from all of its sessions share writes
+    proc.userdata["order_sink"] = OrderSink()
 
 async def entrypoint(ctx: JobContext):
     ctx.log_context_fields = {
@@ -415,7 +472,11 @@ async def entrypoint(ctx: JobContext):
     
     try:
         # Initialize Food Ordering agent
-        food_agent = FoodOrderingAgent()
+        food_agent = FoodOrderingAgent(
+            catalog_service=ctx.proc.userdata.get("catalog_service"),
+            order_sink=ctx.proc.userdata.get("order_sink"),
+            inventory=ctx.proc.userdata.get("inventory"),
+        )
         logger.info("QuickBasket Food Ordering agent initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize agent: {e}")
@@ -458,6 +519,14 @@ async def entrypoint(ctx: JobContext):
         summary = usage_collector.get_summary()
         logger.info(f"Final usage summary: {summary}")
     ctx.add_shutdown_callback(log_usage)
+    # Write out any orders still queued before the job exits. LiveKit passes
+    # the shutdown reason to callbacks that take an argument, so this one
+    # takes none
+    async def flush_orders():
+        await food_agent.order_sink.aclose()
+    ctx.add_shutdown_callback(flush_orders)
+    # Put back whatever an unfinished cart was holding
+    ctx.add_shutdown_callback(food_agent.release_stock)
 
     try:
         # Start the session
@@ -0,0 +1,343 @@
+"""Offline load generator for the QuickBasket ordering tools
+
+Synthesizes a catalog.json of the requested size and drives thousands of
+scripted shopping sessions concurrently through FoodOrderingAgent's cart
+and ordering tools on one event loop, the way a busy worker would. No
+LiveKit room, credentials or LLM are needed.
+
+Reports per-tool latency percentiles, how long the event loop was blocked
+(anything that would have stalled audio for every room on the worker) and
+order throughput.
+
+    uv run python src/benchmark_sessions.py
+    uv run python src/benchmark_sessions.py --sizes 1000 100000 --sessions 5000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any
+
+# Where agent.py lives; the benchmark runs in a scratch directory
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CATEGORIES = {
+    "Groceries": (
+        ["Bread", "Milk", "Eggs", "Rice", "Dal", "Atta", "Paneer"],
+        ["pack", "liter", "dozen", "kg"],
+    ),
+    "Fruits & Vegetables": (
+        ["Tomatoes", "Onions", "Potatoes", "Bananas", "Apples", "Spinach"],
+        ["kg", "dozen", "bunch"],
+    ),
+    "Snacks & Beverages": (
+        ["Chips", "Biscuits", "Masala Tea", "Cold Coffee", "Namkeen"],
+        ["pack", "bottle"],
+    ),
+    "Prepared Food": (
+        ["Biryani", "Paneer Tikka", "Samosa", "Dosa Batter"],
+        ["plate", "box", "kg"],
+    ),
+}
+ADJECTIVES = [
+    "Fresh",
+    "Organic",
+    "Classic",
+    "Spicy",
+    "Farm",
+    "Premium",
+    "Homestyle",
+    "Daily",
+]
+BRANDS = [
+    "Amul",
+    "Modern Bakery",
+    "Local",
+    "Haldiram",
+    "Tata",
+    "MTR",
+    "Britannia",
+    "Farm Fresh",
+]
+TAGS = [
+    "fresh",
+    "vegan",
+    "healthy",
+    "protein",
+    "dairy",
+    "snack",
+    "organic",
+    "spicy",
+    "breakfast",
+]
+
+# Seconds between event loop lag samples
+LAG_INTERVAL = 0.005
+
+# Stock per synthetic item, high enough that sessions rarely sell out
+SYNTHETIC_STOCK = 100_000
+
+
+class FakeRunContext:
+    """Stands in for livekit's RunContext; the cart tools never touch it"""
+
+    def __init__(self, session_id: int):
+        self.session_id = session_id
+        self.userdata: dict[str, Any] = {}
+
+
+def synthesize_catalog(size: int, seed: int = 7) -> dict[str, Any]:
+    """A catalog.json-shaped dict with `size` items and a few recipes"""
+    rng = random.Random(seed)
+    categories = [{"name": name, "items": []} for name in CATEGORIES]
+    for i in range(size):
+        category = categories[i % len(categories)]
+        nouns, units = CATEGORIES[category["name"]]
+        category["items"].append(
+            {
+                "id": f"item-{i:07d}",
+                "name": f"{rng.choice(ADJECTIVES)} {rng.choice(nouns)} {i}",
+                "price": rng.randrange(10, 900),
+                "unit": rng.choice(units),
+                "brand": rng.choice(BRANDS),
+                "tags": rng.sample(TAGS, 2),
+                "stock": SYNTHETIC_STOCK,
+            }
+        )
+
+    items = [item for category in categories for item in category["items"]]
+    recipes = {
+        recipe: {
+            "servings": 2,
+            "items": [rng.choice(items)["name"] for _ in range(rng.randint(3, 6))],
+        }
+        for recipe in [
+            "sandwich",
+            "pasta",
+            "salad",
+            "breakfast",
+            "curry",
+            "party platter",
+        ]
+    }
+    return {"categories": categories, "recipes": recipes}
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    rank = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+async def monitor_loop_lag(lags: list[float], stop: asyncio.Event) -> None:
+    """Record how late each short sleep wakes up, i.e. time the loop was blocked"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - started - LAG_INTERVAL))
+
+
+async def run_session(
+    agent: Any,
+    context: FakeRunContext,
+    script: list[tuple],
+    latencies: dict[str, list[float]],
+    think_seconds: float,
+    rng: random.Random,
+) -> None:
+    for tool, kwargs in script:
+        # Customers pause between requests; this also interleaves the sessions
+        await asyncio.sleep(rng.uniform(0, think_seconds))
+        begin = time.perf_counter()
+        await getattr(agent, tool)(context, **kwargs)
+        latencies[tool].append((time.perf_counter() - begin) * 1000)
+
+
+def make_script(catalog: dict[str, Any], rng: random.Random) -> list[tuple]:
+    """A typical voice order: a few items, a recipe, a cart check and checkout"""
+    category = rng.choice(catalog["categories"])
+    script = []
+    for _ in range(rng.randint(2, 5)):
+        item = (
+            rng.choice(category["items"])
+            if rng.random() < 0.5
+            else rng.choice(rng.choice(catalog["categories"])["items"])
+        )
+        script.append(
+            (
+                "add_item_to_cart",
+                {"item_name": item["name"], "quantity": rng.randint(1, 3)},
+            )
+        )
+    script.append(
+        (
+            "add_recipe_to_cart",
+            {
+                "recipe_name": rng.choice(list(catalog["recipes"])),
+                "servings": rng.choice([0, 2, 4, 6]),
+            },
+        )
+    )
+    script.append(("view_cart", {}))
+    script.append(
+        ("place_order", {"customer_name": f"Customer {rng.randrange(10_000)}"})
+    )
+    return script
+
+
+async def run_load(size: int, sessions: int, think_seconds: float) -> dict[str, Any]:
+    catalog_file = os.path.abspath("catalog.json")
+    with open(catalog_file, "w") as f:
+        json.dump(synthesize_catalog(size), f)
+
+    from agent import FoodOrderingAgent
+    from catalog_service import CatalogService
+    from inventory import InventoryStore
+    from order_sink import OrderSink
+
+    started = time.perf_counter()
+    inventory = InventoryStore(os.path.abspath("inventory.db"))
+    catalog_service = CatalogService(catalog_file, on_load=inventory.seed)
+    load_seconds = time.perf_counter() - started
+
+    order_sink = OrderSink(os.path.abspath("orders.jsonl"))
+    rng = random.Random(size)
+    latencies: dict[str, list[float]] = {
+        tool: []
+        for tool in [
+            "add_item_to_cart",
+            "add_recipe_to_cart",
+            "view_cart",
+            "place_order",
+        ]
+    }
+    agents = [
+        FoodOrderingAgent(
+            catalog_service=catalog_service, order_sink=order_sink, inventory=inventory
+        )
+        for _ in range(sessions)
+    ]
+
+    lags: list[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(monitor_loop_lag(lags, stop))
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_session(
+                agent,
+                FakeRunContext(i),
+                make_script(catalog_service.snapshot.catalog, rng),
+                latencies,
+                think_seconds,
+                random.Random(i),
+            )
+            for i, agent in enumerate(agents)
+        )
+    )
+    placed_seconds = time.perf_counter() - started
+    await order_sink.aclose()
+    durable_seconds = time.perf_counter() - started
+
+    stop.set()
+    await monitor
+
+    with open("orders.jsonl") as f:
+        written = sum(1 for _ in f)
+
+    return {
+        "size": size,
+        "sessions": sessions,
+        "load_seconds": load_seconds,
+        "orders_written": written,
+        "orders_per_sec": sessions / placed_seconds,
+        "durable_orders_per_sec": written / durable_seconds,
+        "loop_lag_p99_ms": percentile(lags, 0.99) * 1000 if lags else 0.0,
+        "loop_lag_max_ms": max(lags, default=0.0) * 1000,
+        "loop_blocked_ms": sum(lags) * 1000,
+        "tools": {
+            tool: {
+                "p50_ms": statistics.median(samples),
+                "p99_ms": percentile(samples, 0.99),
+                "max_ms": max(samples),
+                "calls": len(samples),
+            }
+            for tool, samples in latencies.items()
+        },
+    }
+
+
+def run_size(size: int, sessions: int, think_seconds: float) -> dict[str, Any]:
+    """Run one load test in a scratch directory"""
+    workdir = tempfile.mkdtemp(prefix=f"session-bench-{size}-")
+    cwd = os.getcwd()
+    try:
+        os.chdir(workdir)
+        return asyncio.run(run_load(size, sessions, think_seconds))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\n=== {report['size']:,} items | {report['sessions']:,} sessions "
+        f"| catalog load {report['load_seconds']:.2f}s ==="
+    )
+    print(f"{'tool':<20}{'calls':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for tool, stats in report["tools"].items():
+        print(
+            f"{tool:<20}{stats['calls']:>8}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats['max_ms']:>10.3f}"
+        )
+    print(
+        f"event loop lag p99 {report['loop_lag_p99_ms']:.2f} ms, max {report['loop_lag_max_ms']:.2f} ms, "
+        f"blocked {report['loop_blocked_ms']:.0f} ms in total"
+    )
+    print(
+        f"orders: {report['orders_per_sec']:.0f}/sec placed, {report['durable_orders_per_sec']:.0f}/sec "
+        f"including the final flush ({report['orders_written']:,} written)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Load test the QuickBasket cart and ordering tools"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 100_000],
+        help="catalog sizes to synthesize",
+    )
+    parser.add_argument(
+        "--sessions", type=int, default=2000, help="concurrent shopping sessions"
+    )
+    parser.add_argument(
+        "--think-ms",
+        type=float,
+        default=20.0,
+        help="longest pause a customer takes between requests",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    # Job processes import agent.py from src
+    sys.path.insert(0, SRC_DIR)
+
+    for size in args.sizes:
+        print_report(run_size(size, args.sessions, args.think_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
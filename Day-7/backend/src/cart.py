@@ -0,0 +1,129 @@
+from collections.abc import Iterable, Iterator
+from typing import Any, Optional
+
+from catalog_index import MAX_NGRAM, ngrams
+
+
+class Cart:
+    """Shopping cart keyed by item id
+
+    Lines keep the order they were first added in, which is the order they
+    are read back to the customer. The total and item count are updated as
+    lines change rather than summed on every read, and line names are
+    indexed by their 1-3 character n-grams so "remove the milk" only
+    checks the lines that could contain "milk".
+    """
+
+    def __init__(self):
+        self.lines: dict[str, dict[str, Any]] = {}
+        self.total = 0
+        self.item_count = 0
+        self._names: dict[str, str] = {}
+        self._added: dict[str, int] = {}
+        self._next_position = 0
+        self._ngrams: dict[str, set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        return iter(self.lines.values())
+
+    def get(self, item_id: str) -> Optional[dict[str, Any]]:
+        return self.lines.get(item_id)
+
+    def add(self, item: dict[str, Any], quantity: int = 1) -> dict[str, Any]:
+        """Add a catalog item, merging into its line if already in the cart"""
+        if quantity <= 0:
+            raise ValueError(f"Can't add {quantity} of {item['id']} to the cart")
+        line = self.lines.get(item["id"])
+        if line is not None:
+            return self.set_quantity(item["id"], line["quantity"] + quantity)
+
+        line = {
+            "id": item["id"],
+            "name": item["name"],
+            "price": item["price"],
+            "quantity": quantity,
+            "unit": item["unit"],
+            "brand": item.get("brand", ""),
+            "total": item["price"] * quantity,
+        }
+        self.lines[item["id"]] = line
+        self.total += line["total"]
+        self.item_count += quantity
+
+        name = item["name"].lower()
+        self._names[item["id"]] = name
+        self._added[item["id"]] = self._next_position
+        self._next_position += 1
+        for size in range(1, MAX_NGRAM + 1):
+            for gram in ngrams(name, size):
+                self._ngrams.setdefault(gram, set()).add(item["id"])
+        return line
+
+    def add_lines(self, lines: Iterable[tuple[dict[str, Any], int]]) -> None:
+        """Merge (item, quantity) pairs, such as a recipe bundle, into the cart"""
+        for item, quantity in lines:
+            self.add(item, quantity)
+
+    def set_quantity(self, item_id: str, quantity: int) -> dict[str, Any]:
+        line = self.lines[item_id]
+        self.total += line["price"] * quantity - line["total"]
+        self.item_count += quantity - line["quantity"]
+        line["quantity"] = quantity
+        line["total"] = line["price"] * quantity
+        return line
+
+    def remove(self, item_id: str) -> dict[str, Any]:
+        line = self.lines.pop(item_id)
+        self.total -= line["total"]
+        self.item_count -= line["quantity"]
+
+        name = self._names.pop(item_id)
+        del self._added[item_id]
+        for size in range(1, MAX_NGRAM + 1):
+            for gram in ngrams(name, size):
+                ids = self._ngrams[gram]
+                ids.discard(item_id)
+                if not ids:
+                    del self._ngrams[gram]
+        return line
+
+    def find(self, name_query: str) -> Optional[dict[str, Any]]:
+        """First line, in cart order, whose name contains the query"""
+        query = name_query.lower()
+        if not query:
+            return next(iter(self.lines.values()), None)
+
+        if len(query) <= MAX_NGRAM:
+            candidates = self._ngrams.get(query, set())
+        else:
+            grams = sorted(
+                ngrams(query, MAX_NGRAM), key=lambda g: len(self._ngrams.get(g, ()))
+            )
+            candidates = set(self._ngrams.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= self._ngrams.get(gram, set())
+
+        # The earliest added line wins, as in a front-to-back scan
+        item_id = min(
+            (i for i in candidates if query in self._names[i]),
+            key=self._added.__getitem__,
+            default=None,
+        )
+        return self.lines[item_id] if item_id is not None else None
+
+    def to_list(self) -> list[dict[str, Any]]:
+        """Copies of the lines, for order records"""
+        return [dict(line) for line in self.lines.values()]
+
+    def clear(self) -> None:
+        self.lines.clear()
+        self._names.clear()
+        self._added.clear()
+        self._ngrams.clear()
+        self.total = 0
+        self.item_count = 0
@@ -0,0 +1,325 @@
+import heapq
+import itertools
+import math
+import re
+from collections import Counter
+from collections.abc import Iterator
+from typing import Any, Optional
+
+# Longest character n-gram kept in the partial match index
+MAX_NGRAM = 3
+
+# Lowest similarity accepted as a typo-tolerant match: the mean, over the
+# query's words, of each one's closest word in the item name. Low enough
+# for "tomatos", high enough that "apple juice" does not become Apples
+MIN_FUZZY_SIMILARITY = 0.6
+
+# Lowest trigram similarity for a name word to stand in for a query word
+# ("bred" for "bread" is 0.55)
+MIN_WORD_SIMILARITY = 0.5
+
+# Catalog words compared in full against each query word, and how many of
+# the closest are kept, so a lookup costs the same at any catalog size
+MAX_FUZZY_CANDIDATES = 32
+MAX_WORD_MATCHES = 4
+
+# Relevance of the ways an item can match a search, added together
+SCORE_EXACT_NAME = 8
+SCORE_NAME_PREFIX = 4
+SCORE_WORD_PREFIX = 3
+SCORE_NAME_CONTAINS = 2
+SCORE_EXACT_TAG = 2
+SCORE_TAG_CONTAINS = 1
+SCORE_CATEGORY = 1
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def ngrams(text: str, size: int) -> set[str]:
+    """All substrings of the given length"""
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+def word_trigrams(text: str) -> set[str]:
+    """Trigrams of each word padded with spaces, so word starts weigh more"""
+    grams: set[str] = set()
+    for word in WORD_PATTERN.findall(text.lower()):
+        grams |= ngrams(f"  {word} ", 3)
+    return grams
+
+
+class CatalogIndex:
+    """Lookup tables built once from catalog.json
+
+    Items keep their catalog order (category by category) as positions, so
+    "first match in the catalog" stays the tie-breaker everywhere. Names and
+    tags are lowercased once, and every 1-3 character n-gram of them points
+    to the positions containing it, which narrows a partial match down to a
+    few candidates instead of walking every item.
+
+    `search` ranks items matching by name, tag or category and pages through
+    them best first, keeping only one page worth of results in a heap.
+
+    For speech-to-text near misses ("amul milks", "tomatos") the distinct
+    words of item names are indexed by padded trigrams, and every word
+    points to the positions whose name contains it. `fuzzy_matches` finds
+    the catalog words close to each query word, then the items whose names
+    contain the best combination of them.
+    """
+
+    def __init__(self, catalog: dict[str, Any]):
+        self.items: list[dict[str, Any]] = []
+        self.categories: list[str] = []
+        # (lowercased category name, first position, end position)
+        self.category_ranges: list[tuple[str, int, int]] = []
+        self.names: list[str] = []
+        self.tags: list[list[str]] = []
+        self.by_id: dict[str, int] = {}
+        self.by_name: dict[str, int] = {}
+        self.by_tag: dict[str, list[int]] = {}
+        self.ngrams: dict[str, set[int]] = {}
+        # Name words: id by text, trigrams and positions per id, and the
+        # word ids of each position's name
+        self.word_ids: dict[str, int] = {}
+        self.word_trigram_sets: list[set[str]] = []
+        self.word_trigrams: dict[str, list[int]] = {}
+        self.word_positions: list[list[int]] = []
+        self.name_words: list[tuple[int, ...]] = []
+
+        for category in catalog.get("categories", []):
+            start = len(self.items)
+            for item in category["items"]:
+                self._add_item(item, category["name"])
+            self.category_ranges.append(
+                (category["name"].lower(), start, len(self.items))
+            )
+
+    def _add_item(self, item: dict[str, Any], category_name: str) -> None:
+        position = len(self.items)
+        name = item["name"].lower()
+        tags = [tag.lower() for tag in item.get("tags", [])]
+
+        self.items.append(item)
+        self.categories.append(category_name)
+        self.names.append(name)
+        self.tags.append(tags)
+        self.by_id.setdefault(item["id"], position)
+        self.by_name.setdefault(name, position)
+
+        for tag in tags:
+            postings = self.by_tag.setdefault(tag, [])
+            if not postings or postings[-1] != position:
+                postings.append(position)
+
+        for text in [name, *tags]:
+            for size in range(1, MAX_NGRAM + 1):
+                for gram in ngrams(text, size):
+                    self.ngrams.setdefault(gram, set()).add(position)
+
+        name_words = []
+        for word in dict.fromkeys(WORD_PATTERN.findall(name)):
+            word_id = self.word_ids.get(word)
+            if word_id is None:
+                word_id = self.word_ids[word] = len(self.word_positions)
+                trigrams = word_trigrams(word)
+                self.word_trigram_sets.append(trigrams)
+                for gram in trigrams:
+                    self.word_trigrams.setdefault(gram, []).append(word_id)
+                self.word_positions.append([])
+            self.word_positions[word_id].append(position)
+            name_words.append(word_id)
+        self.name_words.append(tuple(name_words))
+
+    def _candidates(self, query: str) -> set[int]:
+        """Positions whose name or tags contain every n-gram of the query"""
+        if len(query) <= MAX_NGRAM:
+            return self.ngrams.get(query, set())
+
+        grams = sorted(
+            ngrams(query, MAX_NGRAM), key=lambda g: len(self.ngrams.get(g, ()))
+        )
+        candidates = set(self.ngrams.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self.ngrams.get(gram, set())
+        return candidates
+
+    def _matches(self, query: str, position: int) -> bool:
+        return query in self.names[position] or any(
+            query in tag for tag in self.tags[position]
+        )
+
+    def partial_matches(self, query: str) -> list[int]:
+        """Positions, in catalog order, whose name or a tag contains the query"""
+        query = query.lower()
+        if not query:
+            return list(range(len(self.items)))
+
+        return sorted(p for p in self._candidates(query) if self._matches(query, p))
+
+    def score(self, query: str, position: int, category_hit: bool = False) -> int:
+        """Relevance of an item to a lowercased query; 0 means no match"""
+        name = self.names[position]
+        score = SCORE_CATEGORY if category_hit else 0
+        if name == query:
+            score += SCORE_EXACT_NAME
+        elif name.startswith(query):
+            score += SCORE_NAME_PREFIX
+        elif query in name:
+            words = WORD_PATTERN.findall(name)
+            score += (
+                SCORE_WORD_PREFIX
+                if any(word.startswith(query) for word in words)
+                else SCORE_NAME_CONTAINS
+            )
+
+        tags = self.tags[position]
+        if query in tags:
+            score += SCORE_EXACT_TAG
+        elif any(query in tag for tag in tags):
+            score += SCORE_TAG_CONTAINS
+        return score
+
+    def _scored(self, query: str) -> Iterator[tuple[int, int]]:
+        """(score, position) of every item matching by name, tag or category"""
+        if not query:
+            for position in range(len(self.items)):
+                yield 0, position
+            return
+
+        category_hits = [
+            (start, end)
+            for category, start, end in self.category_ranges
+            if query in category
+        ]
+        candidates = self._candidates(query)
+        for position in candidates:
+            category_hit = any(start <= position < end for start, end in category_hits)
+            score = self.score(query, position, category_hit)
+            if score:
+                yield score, position
+
+        # The rest of a matching category matches on the category alone
+        for start, end in category_hits:
+            for position in range(start, end):
+                if position not in candidates:
+                    yield self.score(query, position, category_hit=True), position
+
+    def search(
+        self, query: str, offset: int = 0, limit: int = 6
+    ) -> tuple[list[int], int]:
+        """One page of matching positions, best first, and the total match count
+
+        Ties keep catalog order. Only `offset + limit` results are kept while
+        scanning, however many items match.
+        """
+        total = 0
+
+        def counted(scored: Iterator[tuple[int, int]]) -> Iterator[tuple[int, int]]:
+            nonlocal total
+            for score, position in scored:
+                total += 1
+                yield -score, position
+
+        best = heapq.nsmallest(offset + limit, counted(self._scored(query.lower())))
+        return [position for _, position in best[offset:]], total
+
+    def _similar_words(self, word: str) -> list[tuple[float, int]]:
+        """Closest (similarity, word id) pairs in the catalog's name words"""
+        grams = word_trigrams(word)
+        if not grams:
+            return []
+
+        # Dice >= s needs at least m = s*|q|/(2-s) shared trigrams, so any
+        # match contains one of the |q|-m+1 rarest query trigrams
+        ordered = sorted(grams, key=lambda g: len(self.word_trigrams.get(g, ())))
+        min_overlap = max(
+            1, math.ceil(MIN_WORD_SIMILARITY * len(ordered) / (2 - MIN_WORD_SIMILARITY))
+        )
+        shared: Counter = Counter()
+        for gram in ordered[: len(ordered) - min_overlap + 1]:
+            shared.update(self.word_trigrams.get(gram, ()))
+
+        matches = []
+        for word_id, _ in shared.most_common(MAX_FUZZY_CANDIDATES):
+            other = self.word_trigram_sets[word_id]
+            similarity = 2 * len(grams & other) / (len(grams) + len(other))
+            if similarity >= MIN_WORD_SIMILARITY:
+                matches.append((similarity, word_id))
+        return heapq.nlargest(MAX_WORD_MATCHES, matches)
+
+    def _positions_with(self, word_ids: list[int]) -> Iterator[int]:
+        """Positions, in catalog order, whose name contains every one of the words"""
+        postings = sorted(word_ids, key=lambda w: len(self.word_positions[w]))
+        others = postings[1:]
+        for position in self.word_positions[postings[0]]:
+            name_words = self.name_words[position]
+            if all(word_id in name_words for word_id in others):
+                yield position
+
+    def fuzzy_matches(
+        self, query: str, limit: int = 1, min_similarity: float = MIN_FUZZY_SIMILARITY
+    ) -> list[tuple[float, int]]:
+        """Best (similarity, position) pairs for names close to the query
+
+        An item's similarity is the mean, over the query's words, of the
+        trigram Dice similarity of the closest word in its name, so extra
+        words in a name ("Fresh Tomatoes") cost nothing while a query word
+        the name lacks ("apple juice") counts as 0. Ties keep catalog order.
+        """
+        query_words = list(dict.fromkeys(WORD_PATTERN.findall(query.lower())))
+        if not query_words:
+            return []
+
+        # Every way of matching each query word to a close name word, or to
+        # nothing, that could still reach min_similarity, best first
+        options = [[*self._similar_words(word), (0.0, None)] for word in query_words]
+        combinations = []
+        for combination in itertools.product(*options):
+            similarity = sum(s for s, _ in combination) / len(query_words)
+            word_ids = [word_id for _, word_id in combination if word_id is not None]
+            if word_ids and similarity >= min_similarity:
+                combinations.append((similarity, word_ids))
+        combinations.sort(key=lambda c: -c[0])
+
+        found: dict[int, float] = {}
+        for similarity, word_ids in combinations:
+            if (
+                len(found) >= limit
+                and similarity < sorted(found.values(), reverse=True)[limit - 1]
+            ):
+                break
+            # Later positions of this combination can't beat its first `limit`
+            new = (p for p in self._positions_with(word_ids) if p not in found)
+            for position in itertools.islice(new, limit):
+                found[position] = similarity
+        best = sorted(found.items(), key=lambda f: (-f[1], f[0]))[:limit]
+        return [(similarity, position) for position, similarity in best]
+
+    def find_item(self, item_name: str, fuzzy: bool = True) -> Optional[dict[str, Any]]:
+        """Exact name match first, then the first partial name or tag match,
+        then, with `fuzzy`, the closest name within typo distance"""
+        item_name_lower = item_name.lower()
+
+        position = self.by_name.get(item_name_lower)
+        if position is not None:
+            return self.items[position]
+
+        if not item_name_lower:
+            return self.items[0] if self.items else None
+
+        # Earliest catalog position wins, as in a front-to-back scan
+        position = min(
+            (
+                p
+                for p in self._candidates(item_name_lower)
+                if self._matches(item_name_lower, p)
+            ),
+            default=None,
+        )
+        if position is not None:
+            return self.items[position]
+
+        close_matches = self.fuzzy_matches(item_name_lower) if fuzzy else []
+        return self.items[close_matches[0][1]] if close_matches else None
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Optional
+
+from catalog_index import CatalogIndex
+from recipes import compile_recipes
+
+logger = logging.getLogger("food-ordering-agent")
+
+# Seconds between catalog.json modification checks
+DEFAULT_POLL_INTERVAL = 2.0
+
+EMPTY_CATALOG = {"categories": [], "recipes": {}}
+
+
+class CatalogSnapshot:
+    """One parsed catalog.json with the index and recipe bundles built from it"""
+
+    def __init__(
+        self, catalog: dict[str, Any], version: Optional[tuple[int, int]] = None
+    ):
+        self.catalog = catalog
+        self.index = CatalogIndex(catalog)
+        self.recipes = compile_recipes(catalog, self.index)
+        self.version = version
+
+
+class CatalogService:
+    """Per-process catalog shared by every session in a worker
+
+    The catalog is parsed and indexed once, then catalog.json is polled
+    by modification time and size. A changed file is parsed and indexed
+    off to the side and swapped in with a single assignment, so a session
+    reading `snapshot` always gets a complete catalog and index pair. A
+    file that fails to parse (for example, one caught halfway through an
+    edit) leaves the current snapshot in place and is retried on the next
+    poll.
+    """
+
+    def __init__(
+        self,
+        catalog_file: str = "catalog.json",
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        on_load: Optional[Callable[[dict[str, Any]], None]] = None,
+    ):
+        self.catalog_file = catalog_file
+        self.poll_interval = poll_interval
+        # Called with every newly loaded catalog, e.g. to track new items' stock
+        self.on_load = on_load
+        self._reload_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+        self.snapshot = CatalogSnapshot(EMPTY_CATALOG)
+        if not self.refresh():
+            logger.error(
+                f"Error loading catalog from {catalog_file}, starting with an empty catalog"
+            )
+
+    def _file_version(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self.catalog_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> bool:
+        """Reload catalog.json if it changed; False if it could not be read"""
+        with self._reload_lock:
+            version = self._file_version()
+            if version is None:
+                return False
+            if version == self.snapshot.version:
+                return True
+
+            try:
+                with open(self.catalog_file) as f:
+                    catalog = json.load(f)
+                snapshot = CatalogSnapshot(catalog, version)
+            except Exception as e:
+                logger.error(f"Error reloading catalog: {e}")
+                return False
+
+            self.snapshot = snapshot
+            if self.on_load:
+                try:
+                    self.on_load(catalog)
+                except Exception as e:
+                    logger.error(f"Error handling reloaded catalog: {e}")
+            item_count = len(snapshot.index.items)
+            logger.info(f"Loaded food catalog with {item_count} items")
+            return True
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.poll_interval):
+            self.refresh()
+
+    def start(self) -> None:
+        """Start polling catalog.json in a background thread"""
+        if self._watcher is None:
+            self._stopped.clear()
+            self._watcher = threading.Thread(
+                target=self._watch, name="catalog-watcher", daemon=True
+            )
+            self._watcher.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
@@ -0,0 +1,256 @@
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+# Seconds a cart keeps stock held without being touched, so abandoned
+# sessions give their items back
+HOLD_SECONDS = 30 * 60
+
+# Seconds a write waits for another process's transaction before failing.
+# Transactions are a few statements long, so a longer wait means something
+# is stuck, and a worker thread shouldn't be tied up waiting on it
+BUSY_TIMEOUT = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stock (
+    item_id TEXT PRIMARY KEY,
+    on_hand INTEGER NOT NULL,
+    available INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS holds (
+    cart_id TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (cart_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS holds_expiry ON holds (expires_at);
+"""
+
+
+def _check_quantities(quantities: dict[str, int]) -> None:
+    bad = {
+        item_id: quantity for item_id, quantity in quantities.items() if quantity < 0
+    }
+    if bad:
+        raise ValueError(f"Negative quantities can't be held: {bad}")
+
+
+class InventoryStore:
+    """Per-item stock shared by every worker process through SQLite
+
+    `on_hand` is what the store physically has; `available` is on_hand
+    minus everything currently held in carts. Putting an item in a cart
+    holds that quantity, and placing the order turns the holds into sales.
+    Every change is one short write transaction that checks and updates
+    `available` together, so concurrent sessions in any number of
+    processes can never hold or sell more than there is. The database runs
+    in WAL mode, so availability reads never wait on those writers.
+
+    Items without a stock row (no "stock" in catalog.json) are not tracked
+    and are always available.
+    """
+
+    def __init__(
+        self,
+        db_file: str = "food_database/inventory.db",
+        hold_seconds: float = HOLD_SECONDS,
+    ):
+        self.db_file = db_file
+        self.hold_seconds = hold_seconds
+        self._local = threading.local()
+        # Carts in this worker take turns on this lock before asking SQLite
+        # for the write lock, so the busy timeout is only spent waiting on
+        # other workers
+        self._write_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # Holds run in asyncio.to_thread workers; each thread gets its own
+        # connection, since a sqlite3 connection can't cross threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(
+                self.db_file, timeout=BUSY_TIMEOUT, isolation_level=None
+            )
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Stock change that applies entirely or not at all
+
+        BEGIN IMMEDIATE locks the database before `available` is read, so no
+        other cart can slip in between checking that there is enough stock
+        and taking it.
+        """
+        db = self._connection()
+        with self._write_lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def seed(self, catalog: dict[str, Any]) -> None:
+        """Start tracking catalog items that have a "stock" count
+
+        Items already tracked keep their current stock, so reloading the
+        catalog never undoes sales.
+        """
+        rows = [
+            (item["id"], item["stock"], item["stock"])
+            for category in catalog.get("categories", [])
+            for item in category["items"]
+            if "stock" in item
+        ]
+        with self._transaction() as db:
+            db.executemany(
+                "INSERT OR IGNORE INTO stock (item_id, on_hand, available) VALUES (?, ?, ?)",
+                rows,
+            )
+
+    def available(self, item_ids: Iterable[str]) -> dict[str, Optional[int]]:
+        """Quantity free to add to a cart, or None for untracked items"""
+        item_ids = list(item_ids)
+        placeholders = ",".join("?" * len(item_ids))
+        rows = self._connection().execute(
+            f"SELECT item_id, available FROM stock WHERE item_id IN ({placeholders})",
+            item_ids,
+        )
+        found = dict(rows.fetchall())
+        return {item_id: found.get(item_id) for item_id in item_ids}
+
+    def _release_expired(self, db: sqlite3.Connection, now: float) -> None:
+        expired = db.execute(
+            "SELECT item_id, SUM(quantity) FROM holds WHERE expires_at < ? GROUP BY item_id",
+            (now,),
+        ).fetchall()
+        if expired:
+            db.executemany(
+                "UPDATE stock SET available = available + ? WHERE item_id = ?",
+                [(quantity, item_id) for item_id, quantity in expired],
+            )
+            db.execute("DELETE FROM holds WHERE expires_at < ?", (now,))
+
+    def _hold(
+        self,
+        db: sqlite3.Connection,
+        cart_id: str,
+        quantities: dict[str, int],
+        now: float,
+    ) -> dict[str, int]:
+        """Set the cart's holds inside an open transaction; returns shortfalls"""
+        shortfalls = {}
+        changes = []
+        for item_id, quantity in quantities.items():
+            row = db.execute(
+                "SELECT available FROM stock WHERE item_id = ?", (item_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            held = db.execute(
+                "SELECT quantity FROM holds WHERE cart_id = ? AND item_id = ?",
+                (cart_id, item_id),
+            ).fetchone()
+            held = held[0] if held else 0
+            if quantity - held > row[0]:
+                # What the cart could have in total
+                shortfalls[item_id] = held + row[0]
+            else:
+                changes.append((item_id, quantity, quantity - held))
+        if shortfalls:
+            return shortfalls
+
+        for item_id, quantity, delta in changes:
+            db.execute(
+                "UPDATE stock SET available = available - ? WHERE item_id = ?",
+                (delta, item_id),
+            )
+            if quantity > 0:
+                db.execute(
+                    "INSERT INTO holds (cart_id, item_id, quantity, expires_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (cart_id, item_id) DO UPDATE SET quantity = excluded.quantity, "
+                    "expires_at = excluded.expires_at",
+                    (cart_id, item_id, quantity, now + self.hold_seconds),
+                )
+            else:
+                db.execute(
+                    "DELETE FROM holds WHERE cart_id = ? AND item_id = ?",
+                    (cart_id, item_id),
+                )
+        # Any change to the cart keeps all of its holds alive
+        db.execute(
+            "UPDATE holds SET expires_at = ? WHERE cart_id = ?",
+            (now + self.hold_seconds, cart_id),
+        )
+        return {}
+
+    def hold(self, cart_id: str, quantities: dict[str, int]) -> dict[str, int]:
+        """Make the cart hold exactly these quantities, all or nothing
+
+        Returns {} on success. Otherwise nothing changes and the result maps
+        each item that ran short to the most the cart could have. A quantity
+        of 0 gives the item's hold back; negative quantities are refused,
+        since they would add stock that does not exist.
+        """
+        _check_quantities(quantities)
+        now = time.time()
+        with self._transaction() as db:
+            self._release_expired(db, now)
+            return self._hold(db, cart_id, quantities, now)
+
+    def commit(self, cart_id: str, quantities: dict[str, int]) -> dict[str, int]:
+        """Sell the cart's quantities and drop its holds, all or nothing
+
+        Holds that expired are taken again from available stock first.
+        Returns shortfalls like `hold`, leaving stock untouched if any.
+        """
+        _check_quantities(quantities)
+        now = time.time()
+        with self._transaction() as db:
+            self._release_expired(db, now)
+            shortfalls = self._hold(db, cart_id, quantities, now)
+            if shortfalls:
+                return shortfalls
+            held = db.execute(
+                "SELECT item_id, quantity FROM holds WHERE cart_id = ?", (cart_id,)
+            ).fetchall()
+            db.executemany(
+                "UPDATE stock SET on_hand = on_hand - ? WHERE item_id = ?",
+                [
+                    (quantity, item_id)
+                    for item_id, quantity in held
+                    if item_id in quantities
+                ],
+            )
+            # Holds for anything no longer in the cart go back on the shelf
+            db.executemany(
+                "UPDATE stock SET available = available + ? WHERE item_id = ?",
+                [
+                    (quantity, item_id)
+                    for item_id, quantity in held
+                    if item_id not in quantities
+                ],
+            )
+            db.execute("DELETE FROM holds WHERE cart_id = ?", (cart_id,))
+            return {}
+
+    def release(self, cart_id: str) -> None:
+        """Give back everything the cart holds"""
+        with self._transaction() as db:
+            held = db.execute(
+                "SELECT item_id, quantity FROM holds WHERE cart_id = ?", (cart_id,)
+            ).fetchall()
+            db.executemany(
+                "UPDATE stock SET available = available + ? WHERE item_id = ?",
+                [(quantity, item_id) for item_id, quantity in held],
+            )
+            db.execute("DELETE FROM holds WHERE cart_id = ?", (cart_id,))
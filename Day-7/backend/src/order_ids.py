@@ -0,0 +1,35 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+
+class OrderIdGenerator:
+    """Order ids unique across sessions and worker processes
+
+    An id is the order time to the second, the worker id and a sequence
+    number counted up within the process, e.g. "QB20251128011316-4821-000017".
+    Any number of orders in the same second stay distinct: the sequence
+    separates orders within a process and the worker id (the process id by
+    default) separates processes. Timestamps never step backwards, so ids
+    from one worker sort in the order they were issued even if the wall
+    clock is adjusted, and the zero-padded sequence keeps them sorting as
+    text.
+    """
+
+    def __init__(self, prefix: str = "QB", worker_id: Optional[str] = None):
+        self.prefix = prefix
+        self.worker_id = worker_id
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._last_time = 0.0
+
+    def next_id(self) -> str:
+        with self._lock:
+            self._sequence += 1
+            self._last_time = max(self._last_time, time.time())
+            stamp = datetime.fromtimestamp(self._last_time).strftime("%Y%m%d%H%M%S")
+            # Looked up per id, as job processes may be forked after import
+            worker_id = self.worker_id or os.getpid()
+            return f"{self.prefix}{stamp}-{worker_id}-{self._sequence:06d}"
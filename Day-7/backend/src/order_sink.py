@@ -0,0 +1,128 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+from typing import Any, Optional
+
+logger = logging.getLogger("food-ordering-agent")
+
+# Most orders written by one append
+MAX_BATCH = 256
+
+# Seconds to wait before retrying a failed write, doubled up to the cap
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 10.0
+
+# Writes tried per batch before its orders are logged and dropped
+MAX_ATTEMPTS = 5
+
+# Seconds `aclose` waits for queued orders to be written
+CLOSE_TIMEOUT = 30.0
+
+
+def append_orders(log_file: str, orders: list[dict[str, Any]]) -> None:
+    """Append orders as JSON lines with a single write and fsync"""
+    data = "".join(json.dumps(order) + "\n" for order in orders).encode("utf-8")
+
+    # Every worker process runs its own sink on the same log. With O_APPEND
+    # the kernel puts each batch after whatever another sink wrote last,
+    # instead of over it
+    fd = os.open(log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class OrderSink:
+    """Writes placed orders in the background
+
+    `submit` only queues the order, so the event loop serving audio never
+    waits on the disk. A background task takes everything queued so far,
+    appends it to the JSON-lines log in one write and fsyncs once for the
+    whole batch, in a worker thread. Failed writes are retried with
+    backoff, up to MAX_ATTEMPTS times; `aclose` waits at most `timeout`
+    seconds for the queue to drain and is registered as a job shutdown
+    callback. Orders that could not be saved either way are logged in
+    full, so they can be recovered from the logs.
+    """
+
+    def __init__(
+        self, log_file: str = "orders/orders.jsonl", max_batch: int = MAX_BATCH
+    ):
+        self.log_file = log_file
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        # The batch being written, so shutdown can report it if it never lands
+        self._batch: list[dict[str, Any]] = []
+
+    def submit(self, order: dict[str, Any]) -> None:
+        """Queue an order; must be called from the running event loop"""
+        if self._writer is None:
+            self._queue = asyncio.Queue()
+            self._writer = asyncio.get_running_loop().create_task(self._write_batches())
+        self._queue.put_nowait(order)
+
+    async def _write_batches(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            self._batch = batch
+
+            delay = RETRY_DELAY
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    await asyncio.to_thread(append_orders, self.log_file, batch)
+                except Exception as e:
+                    if attempt == MAX_ATTEMPTS:
+                        self._drop(batch, f"after {attempt} failed writes: {e}")
+                        break
+                    logger.error(
+                        f"Error saving {len(batch)} order(s), retrying in {delay}s: {e}"
+                    )
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, MAX_RETRY_DELAY)
+                else:
+                    logger.info(f"Saved {len(batch)} order(s) to {self.log_file}")
+                    break
+
+            self._batch = []
+            for _ in batch:
+                self._queue.task_done()
+
+    def _drop(self, orders: list[dict[str, Any]], reason: str) -> None:
+        logger.error(
+            f"Gave up saving {len(orders)} order(s) to {self.log_file} {reason}"
+        )
+        for order in orders:
+            logger.error(f"Unsaved order: {json.dumps(order)}")
+
+    async def flush(self) -> None:
+        """Wait until every submitted order is on disk"""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def aclose(self, *, timeout: float = CLOSE_TIMEOUT) -> None:
+        # `timeout` is keyword-only: LiveKit passes the shutdown reason to
+        # shutdown callbacks with a positional parameter
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Orders still unsaved after waiting {timeout}s at shutdown")
+        if self._writer is not None:
+            self._writer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._writer
+            unsaved = self._batch
+            while not self._queue.empty():
+                unsaved.append(self._queue.get_nowait())
+            if unsaved:
+                self._drop(unsaved, "at shutdown")
+            self._batch = []
+            self._writer = None
+            self._queue = None
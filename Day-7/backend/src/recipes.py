@@ -0,0 +1,100 @@
+import logging
+import math
+from collections.abc import Iterable
+from typing import Any, Optional
+
+from catalog_index import CatalogIndex
+
+logger = logging.getLogger("food-ordering-agent")
+
+# Servings a recipe makes when catalog.json does not say
+DEFAULT_SERVINGS = 2
+
+
+class RecipeBundle:
+    """A recipe with its ingredients already resolved to catalog items
+
+    `lines` pairs each catalog item (id, name, unit price...) with the
+    quantity the recipe needs for `servings` people.
+    """
+
+    def __init__(
+        self, name: str, servings: int, lines: list[tuple[dict[str, Any], int]]
+    ):
+        self.name = name
+        self.servings = servings
+        self.lines = lines
+
+    def scaled(
+        self, servings: Optional[int] = None, exclude: Iterable[str] = ()
+    ) -> list[tuple[dict[str, Any], int]]:
+        """Lines for the requested servings, minus items the customer already has
+
+        Quantities are rounded up so scaling never leaves someone short.
+        An exclusion drops every line whose item name contains it.
+        """
+        excluded = [name.lower() for name in exclude if name.strip()]
+        lines = self.lines
+        if excluded:
+            lines = [
+                (item, quantity)
+                for item, quantity in lines
+                if not any(name in item["name"].lower() for name in excluded)
+            ]
+        if servings and servings != self.servings:
+            lines = [
+                (item, math.ceil(quantity * servings / self.servings))
+                for item, quantity in lines
+            ]
+        return lines
+
+
+def _ingredients(recipe: Any) -> tuple[int, list[Any]]:
+    """Servings and ingredient entries of either recipe layout in catalog.json
+
+    A recipe is a plain list of item names, or an object such as
+    {"servings": 4, "items": ["Tomatoes", {"item": "Onions", "quantity": 2}]}.
+    """
+    if isinstance(recipe, dict):
+        return recipe.get("servings", DEFAULT_SERVINGS), recipe.get("items", [])
+    return DEFAULT_SERVINGS, recipe
+
+
+def compile_recipes(
+    catalog: dict[str, Any], index: CatalogIndex
+) -> dict[str, RecipeBundle]:
+    """Resolve every recipe in the catalog to a bundle, once per catalog load"""
+    bundles: dict[str, RecipeBundle] = {}
+    for name, recipe in catalog.get("recipes", {}).items():
+        servings, entries = _ingredients(recipe)
+        quantities: dict[str, int] = {}
+        items: dict[str, dict[str, Any]] = {}
+        for entry in entries:
+            item_name = entry["item"] if isinstance(entry, dict) else entry
+            quantity = entry.get("quantity", 1) if isinstance(entry, dict) else 1
+            # A typo in catalog.json should be fixed there, not guessed at
+            item = index.find_item(item_name, fuzzy=False)
+            if not item:
+                logger.warning(
+                    f"Recipe '{name}' ingredient '{item_name}' is not in the catalog"
+                )
+                continue
+            items[item["id"]] = item
+            quantities[item["id"]] = quantities.get(item["id"], 0) + quantity
+
+        lines = [(items[item_id], quantity) for item_id, quantity in quantities.items()]
+        bundles[name.lower()] = RecipeBundle(name, servings, lines)
+    return bundles
+
+
+def find_recipe(
+    bundles: dict[str, RecipeBundle], recipe_name: str
+) -> Optional[RecipeBundle]:
+    """Recipe with exactly this name, else the first whose name contains it"""
+    recipe_name_lower = recipe_name.lower()
+    bundle = bundles.get(recipe_name_lower)
+    if bundle is None:
+        bundle = next(
+            (b for key, b in bundles.items() if recipe_name_lower in key), None
+        )
+    return bundle
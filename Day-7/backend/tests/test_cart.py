@@ -0,0 +1,60 @@
+import pytest
+
+from cart import Cart
+
+MILK = {"id": "g3", "name": "Amul Milk", "price": 30, "unit": "liter"}
+BREAD = {
+    "id": "g1",
+    "name": "Whole Wheat Bread",
+    "price": 45,
+    "unit": "pack",
+    "brand": "Harvest",
+}
+MILK_BREAD = {"id": "g9", "name": "Milk Bread", "price": 40, "unit": "pack"}
+
+
+def test_running_total_follows_line_changes() -> None:
+    cart = Cart()
+    cart.add(MILK, 2)
+    cart.add(BREAD)
+    cart.add(MILK)
+
+    assert len(cart) == 2
+    assert cart.get("g3")["quantity"] == 3
+    assert cart.get("g3")["total"] == 90
+    assert (cart.total, cart.item_count) == (135, 4)
+
+    cart.set_quantity("g1", 3)
+    assert (cart.total, cart.item_count) == (225, 6)
+
+    cart.remove("g3")
+    assert (cart.total, cart.item_count) == (135, 3)
+    assert [line["id"] for line in cart] == ["g1"]
+
+    cart.clear()
+    assert (len(cart), cart.total, cart.item_count) == (0, 0, 0)
+
+
+def test_add_refuses_non_positive_quantities() -> None:
+    cart = Cart()
+    cart.add(MILK, 2)
+    for quantity in (0, -5):
+        with pytest.raises(ValueError):
+            cart.add(MILK, quantity)
+    assert (cart.get("g3")["quantity"], cart.total) == (2, 60)
+
+
+def test_find_returns_earliest_line_containing_name() -> None:
+    cart = Cart()
+    cart.add(BREAD)
+    cart.add(MILK_BREAD)
+    cart.add(MILK)
+
+    assert cart.find("BREAD")["id"] == "g1"
+    assert cart.find("milk")["id"] == "g9"
+    assert cart.find("ul")["id"] == "g3"
+    assert cart.find("eggs") is None
+
+    cart.remove("g9")
+    assert cart.find("milk")["id"] == "g3"
+    assert cart.find("milk bread") is None
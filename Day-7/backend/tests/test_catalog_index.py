@@ -0,0 +1,129 @@
+import statistics
+import time
+
+from benchmark_sessions import synthesize_catalog
+from catalog_index import CatalogIndex
+
+CATALOG = {
+    "categories": [
+        {
+            "name": "Groceries",
+            "items": [
+                {
+                    "id": "g1",
+                    "name": "Whole Wheat Bread",
+                    "price": 45,
+                    "unit": "pack",
+                    "tags": ["vegan", "healthy"],
+                },
+                {
+                    "id": "g2",
+                    "name": "Brown Eggs",
+                    "price": 80,
+                    "unit": "dozen",
+                    "tags": ["protein"],
+                },
+                {
+                    "id": "g3",
+                    "name": "Amul Milk",
+                    "price": 30,
+                    "unit": "liter",
+                    "tags": ["dairy"],
+                },
+            ],
+        },
+        {
+            "name": "Fruits & Vegetables",
+            "items": [
+                {
+                    "id": "fv1",
+                    "name": "Bread Fruit",
+                    "price": 90,
+                    "unit": "kg",
+                    "tags": ["fresh"],
+                },
+                {
+                    "id": "fv2",
+                    "name": "Tomatoes",
+                    "price": 40,
+                    "unit": "kg",
+                    "tags": ["fresh", "vegan"],
+                },
+                {
+                    "id": "fv3",
+                    "name": "Apples",
+                    "price": 120,
+                    "unit": "kg",
+                    "tags": ["fruit"],
+                },
+            ],
+        },
+    ],
+    "recipes": {},
+}
+
+
+def test_exact_name_wins_over_earlier_partial_match() -> None:
+    index = CatalogIndex(CATALOG)
+
+    assert index.find_item("bread fruit")["id"] == "fv1"
+    assert index.find_item("BREAD")["id"] == "g1"
+
+
+def test_partial_matches_names_and_tags_in_catalog_order() -> None:
+    index = CatalogIndex(CATALOG)
+
+    assert index.find_item("egg")["id"] == "g2"
+    assert index.find_item("dai")["id"] == "g3"
+    assert index.partial_matches("vegan") == [0, 4]
+    assert index.partial_matches("re") == [0, 3, 4]
+    assert index.find_item("paneer") is None
+
+
+def test_fuzzy_match_tolerates_typos() -> None:
+    index = CatalogIndex(CATALOG)
+
+    assert index.find_item("amul milks")["id"] == "g3"
+    assert index.find_item("tomatos")["id"] == "fv2"
+    assert index.fuzzy_matches("whole weat bred")[0][1] == 0
+    assert index.fuzzy_matches("xyz") == []
+    # Sharing a word is not close enough to stand in for a missing item
+    assert index.find_item("apple juice") is None
+    assert index.find_item("tomatos", fuzzy=False) is None
+
+
+def test_fuzzy_lookups_stay_fast_in_a_large_catalog() -> None:
+    index = CatalogIndex(synthesize_catalog(100_000))
+
+    # Words the name has beyond the query's don't count against it
+    similarity, position = index.fuzzy_matches("tomatos")[0]
+    assert similarity > 0.7 and "Tomatoes" in index.items[position]["name"]
+    assert (
+        "Paneer Tikka"
+        in index.items[index.fuzzy_matches("fresh panner tika")[0][1]]["name"]
+    )
+
+    for query in [
+        "tomatos",
+        "fresh tomatos",
+        "spicy chipps",
+        "masala tee",
+        "apple juice",
+    ]:
+        timings = []
+        for _ in range(20):
+            started = time.perf_counter()
+            index.fuzzy_matches(query, limit=3)
+            timings.append(time.perf_counter() - started)
+        assert statistics.median(timings) < 0.001, query
+
+
+def test_search_ranks_and_pages_matches() -> None:
+    index = CatalogIndex(CATALOG)
+
+    # A name prefix (Bread Fruit) beats a later word (Whole Wheat Bread)
+    assert index.search("bread") == ([3, 0], 2)
+    assert index.search("fresh", limit=1) == ([3], 2)
+    assert index.search("fresh", offset=1, limit=1) == ([4], 2)
+    assert index.search("groceries") == ([0, 1, 2], 3)
+    assert index.search("vegan", offset=5) == ([], 2)
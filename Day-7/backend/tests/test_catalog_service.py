@@ -0,0 +1,48 @@
+import json
+import os
+
+from catalog_service import CatalogService
+
+
+def _write_catalog(path, price: int, mtime_ns: int) -> None:
+    catalog = {
+        "categories": [
+            {
+                "name": "Groceries",
+                "items": [
+                    {"id": "g3", "name": "Amul Milk", "price": price, "unit": "liter"}
+                ],
+            },
+        ],
+        "recipes": {},
+    }
+    path.write_text(json.dumps(catalog))
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_refresh_swaps_in_changed_catalog(tmp_path) -> None:
+    path = tmp_path / "catalog.json"
+    _write_catalog(path, 30, 1_000_000_000)
+    service = CatalogService(str(path))
+    first = service.snapshot
+
+    assert first.index.find_item("milk")["price"] == 30
+    assert service.refresh()
+    assert service.snapshot is first
+
+    _write_catalog(path, 32, 2_000_000_000)
+    assert service.refresh()
+    assert service.snapshot.index.find_item("milk")["price"] == 32
+    assert first.index.find_item("milk")["price"] == 30
+
+
+def test_unreadable_catalog_keeps_current_snapshot(tmp_path) -> None:
+    path = tmp_path / "catalog.json"
+    assert CatalogService(str(path)).snapshot.catalog["categories"] == []
+
+    _write_catalog(path, 30, 1_000_000_000)
+    service = CatalogService(str(path))
+    path.write_text('{"categories": [')
+
+    assert not service.refresh()
+    assert service.snapshot.index.find_item("milk")["price"] == 30
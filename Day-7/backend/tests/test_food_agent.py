@@ -0,0 +1,81 @@
+import asyncio
+import json
+import sqlite3
+import time
+
+import pytest
+
+from agent import FoodOrderingAgent
+from catalog_service import CatalogService
+from inventory import InventoryStore
+from order_sink import OrderSink
+
+CATALOG = {
+    "categories": [
+        {
+            "name": "Groceries",
+            "items": [
+                {
+                    "id": "g1",
+                    "name": "Whole Wheat Bread",
+                    "price": 45,
+                    "unit": "pack",
+                    "stock": 5,
+                },
+                {
+                    "id": "g3",
+                    "name": "Amul Milk",
+                    "price": 30,
+                    "unit": "liter",
+                    "stock": 2,
+                },
+            ],
+        },
+    ],
+    "recipes": {"breakfast": ["Whole Wheat Bread", "Amul Milk"]},
+}
+
+
+@pytest.fixture
+def food_agent(tmp_path) -> FoodOrderingAgent:
+    catalog_file = tmp_path / "catalog.json"
+    catalog_file.write_text(json.dumps(CATALOG))
+    inventory = InventoryStore(str(tmp_path / "inventory.db"))
+    return FoodOrderingAgent(
+        catalog_service=CatalogService(str(catalog_file), on_load=inventory.seed),
+        order_sink=OrderSink(str(tmp_path / "orders.jsonl")),
+        inventory=inventory,
+    )
+
+
+async def test_non_positive_quantities_never_change_stock(food_agent) -> None:
+    for quantity in (0, -100):
+        assert "remove it" in await food_agent.add_item_to_cart(
+            None, "Amul Milk", quantity
+        )
+    assert "How many people" in await food_agent.add_recipe_to_cart(
+        None, "breakfast", -3
+    )
+
+    assert len(food_agent.cart) == 0
+    assert food_agent.inventory.available(["g1", "g3"]) == {"g1": 5, "g3": 2}
+
+    # Only one more liter of milk can be held after adding one
+    await food_agent.add_item_to_cart(None, "Amul Milk", 1)
+    assert "only have 1 more" in await food_agent.add_item_to_cart(None, "Amul Milk", 2)
+
+
+async def test_stock_writes_wait_off_the_event_loop(food_agent, tmp_path) -> None:
+    # Another worker process is in the middle of a write
+    other = sqlite3.connect(str(tmp_path / "inventory.db"), isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    adding = asyncio.create_task(food_agent.add_item_to_cart(None, "Amul Milk", 1))
+
+    started = time.perf_counter()
+    await asyncio.sleep(0.2)
+    assert time.perf_counter() - started < 0.5
+    assert not adding.done()
+
+    other.execute("COMMIT")
+    assert "Added 1 liter" in await adding
+    assert food_agent.inventory.available(["g3"]) == {"g3": 1}
@@ -0,0 +1,73 @@
+import pytest
+
+from inventory import InventoryStore
+
+CATALOG = {
+    "categories": [
+        {
+            "name": "Groceries",
+            "items": [
+                {
+                    "id": "g1",
+                    "name": "Whole Wheat Bread",
+                    "price": 45,
+                    "unit": "pack",
+                    "stock": 5,
+                },
+                {
+                    "id": "g3",
+                    "name": "Amul Milk",
+                    "price": 30,
+                    "unit": "liter",
+                    "stock": 2,
+                },
+                {"id": "g9", "name": "Curry Leaves", "price": 10, "unit": "bunch"},
+            ],
+        },
+    ],
+}
+
+
+def test_holds_never_exceed_stock_and_commit_sells(tmp_path) -> None:
+    inventory = InventoryStore(str(tmp_path / "inventory.db"))
+    inventory.seed(CATALOG)
+
+    assert inventory.hold("cart-a", {"g1": 3, "g9": 100}) == {}
+    assert inventory.available(["g1", "g9"]) == {"g1": 2, "g9": None}
+
+    # All or nothing: milk fits, bread doesn't, so neither is held
+    assert inventory.hold("cart-b", {"g3": 2, "g1": 3}) == {"g1": 2}
+    assert inventory.available(["g3"]) == {"g3": 2}
+
+    assert inventory.hold("cart-a", {"g1": 1}) == {}
+    assert inventory.commit("cart-a", {"g1": 1}) == {}
+    assert inventory.available(["g1"]) == {"g1": 4}
+
+    assert inventory.hold("cart-b", {"g1": 4}) == {}
+    inventory.release("cart-b")
+    assert inventory.available(["g1"]) == {"g1": 4}
+
+    # Reseeding a reloaded catalog keeps stock already sold
+    inventory.seed(CATALOG)
+    assert inventory.available(["g1", "g3"]) == {"g1": 4, "g3": 2}
+
+
+def test_expired_holds_return_to_stock(tmp_path) -> None:
+    inventory = InventoryStore(str(tmp_path / "inventory.db"), hold_seconds=-1)
+    inventory.seed(CATALOG)
+
+    assert inventory.hold("abandoned", {"g3": 2}) == {}
+    assert inventory.hold("cart-a", {"g3": 2}) == {}
+    assert inventory.commit("cart-a", {"g3": 2}) == {}
+    assert inventory.commit("abandoned", {"g3": 2}) == {"g3": 0}
+
+
+def test_negative_quantities_are_refused(tmp_path) -> None:
+    inventory = InventoryStore(str(tmp_path / "inventory.db"))
+    inventory.seed(CATALOG)
+
+    with pytest.raises(ValueError):
+        inventory.hold("cart-a", {"g1": -100})
+    with pytest.raises(ValueError):
+        inventory.commit("cart-a", {"g3": 1, "g1": -1})
+    assert inventory.available(["g1", "g3"]) == {"g1": 5, "g3": 2}
@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from order_ids import OrderIdGenerator
+
+
+def test_ids_are_unique_and_sorted_within_a_second() -> None:
+    generator = OrderIdGenerator(worker_id="w1")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = list(executor.map(lambda _: generator.next_id(), range(2000)))
+
+    assert len(set(ids)) == 2000
+    assert sorted(ids) == sorted(
+        ids, key=lambda order_id: int(order_id.rsplit("-", 1)[1])
+    )
+    assert ids[0].startswith("QB") and "-w1-" in ids[0]
+
+
+def test_workers_never_share_ids() -> None:
+    first = OrderIdGenerator(worker_id="101")
+    second = OrderIdGenerator(worker_id="102")
+
+    assert not {first.next_id() for _ in range(100)} & {
+        second.next_id() for _ in range(100)
+    }
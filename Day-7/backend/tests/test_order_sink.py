@@ -0,0 +1,71 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from livekit.agents import JobContext
+
+import order_sink
+from order_sink import OrderSink
+
+
+async def test_queued_orders_are_written_in_batches(tmp_path) -> None:
+    log_file = tmp_path / "orders.jsonl"
+    sink = OrderSink(str(log_file), max_batch=4)
+
+    for i in range(10):
+        sink.submit({"order_id": f"QB-{i}", "total_amount": 30 * i})
+    assert not log_file.exists()
+
+    await sink.flush()
+    orders = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [order["order_id"] for order in orders] == [f"QB-{i}" for i in range(10)]
+
+    sink.submit({"order_id": "QB-10", "total_amount": 300})
+    await sink.aclose()
+    assert len(log_file.read_text().splitlines()) == 11
+
+
+async def test_aclose_writes_queued_orders_as_a_shutdown_callback(tmp_path) -> None:
+    log_file = tmp_path / "orders.jsonl"
+    sink = OrderSink(str(log_file))
+    ctx = SimpleNamespace(_shutdown_callbacks=[])
+    JobContext.add_shutdown_callback(ctx, sink.aclose)
+
+    sink.submit({"order_id": "QB-1", "total_amount": 30})
+    for callback in ctx._shutdown_callbacks:
+        await callback("room disconnected")
+    assert [
+        json.loads(line)["order_id"] for line in log_file.read_text().splitlines()
+    ] == ["QB-1"]
+
+
+async def test_failed_writes_are_logged_not_retried_forever(
+    tmp_path, monkeypatch, caplog
+) -> None:
+    def fail(log_file, orders):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(order_sink, "append_orders", fail)
+    monkeypatch.setattr(order_sink, "RETRY_DELAY", 0.001)
+    sink = OrderSink(str(tmp_path / "orders.jsonl"))
+
+    sink.submit({"order_id": "QB-1", "total_amount": 30})
+    await asyncio.wait_for(sink.flush(), 1)
+    assert "after 5 failed writes" in caplog.text
+    assert '"order_id": "QB-1"' in caplog.text
+    await sink.aclose()
+
+
+async def test_aclose_gives_up_after_timeout(tmp_path, monkeypatch, caplog) -> None:
+    def fail(log_file, orders):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(order_sink, "append_orders", fail)
+    monkeypatch.setattr(order_sink, "RETRY_DELAY", 60)
+    sink = OrderSink(str(tmp_path / "orders.jsonl"), max_batch=1)
+
+    sink.submit({"order_id": "QB-1", "total_amount": 30})
+    sink.submit({"order_id": "QB-2", "total_amount": 60})
+    await asyncio.wait_for(sink.aclose(timeout=0.05), 1)
+    assert '"order_id": "QB-1"' in caplog.text
+    assert '"order_id": "QB-2"' in caplog.text
@@ -0,0 +1,60 @@
+from catalog_index import CatalogIndex
+from recipes import compile_recipes, find_recipe
+
+CATALOG = {
+    "categories": [
+        {
+            "name": "Groceries",
+            "items": [
+                {"id": "g1", "name": "Whole Wheat Bread", "price": 45, "unit": "pack"},
+                {"id": "g2", "name": "Brown Eggs", "price": 80, "unit": "dozen"},
+                {"id": "fv2", "name": "Tomatoes", "price": 40, "unit": "kg"},
+                {"id": "fv3", "name": "Onions", "price": 35, "unit": "kg"},
+            ],
+        },
+    ],
+    "recipes": {
+        "sandwich": [
+            "Whole Wheat Bread",
+            "Brown Eggs",
+            "Tomatoes",
+            "Cheese Slices",
+            "Tomatos",
+        ],
+        "Curry Base": {
+            "servings": 4,
+            "items": [{"item": "Onions", "quantity": 2}, "Tomatoes", "Tomatoes"],
+        },
+    },
+}
+
+
+def test_recipes_compile_to_resolved_lines(caplog) -> None:
+    bundles = compile_recipes(CATALOG, CatalogIndex(CATALOG))
+
+    sandwich = find_recipe(bundles, "Sandwich")
+    assert [(item["id"], quantity) for item, quantity in sandwich.lines] == [
+        ("g1", 1),
+        ("g2", 1),
+        ("fv2", 1),
+    ]
+    # Misspelled ingredients are reported, not guessed
+    assert "'Tomatos' is not in the catalog" in caplog.text
+    assert find_recipe(bundles, "curry").name == "Curry Base"
+    assert find_recipe(bundles, "biryani") is None
+
+
+def test_scaling_rounds_up_and_skips_pantry_items() -> None:
+    curry = compile_recipes(CATALOG, CatalogIndex(CATALOG))["curry base"]
+
+    assert [(item["id"], quantity) for item, quantity in curry.scaled()] == [
+        ("fv3", 2),
+        ("fv2", 2),
+    ]
+    assert [(item["id"], quantity) for item, quantity in curry.scaled(6)] == [
+        ("fv3", 3),
+        ("fv2", 3),
+    ]
+    assert [
+        (item["id"], quantity) for item, quantity in curry.scaled(6, ["onion", " "])
+    ] == [("fv2", 3)]
@@ -1,9 +1,9 @@
+import asyncio
 import logging
 import os
-import json
-import random
+import threading
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Tuple
 from dotenv import load_dotenv
 from livekit.agents import (
     Agent,
@@ -22,6 +22,12 @@ from livekit.agents import (
 from livekit.plugins import murf, silero, google, deepgram, noise_cancellation
 from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
+from product_index import ProductSearchIndex
+from order_ids import OrderIdGenerator
+from order_log import OrderLog
+from catalog_loader import ColumnarCatalog, iter_json_array, write_json_array, write_json_array_atomic
+from stock_journal import COMPACT_CHECK_INTERVAL, StockJournal, apply_stock_quantity
+
 logger = logging.getLogger("ecommerce-agent")
 load_dotenv(".env.local")
 
@@ -29,21 +35,43 @@ load_dotenv(".env.local")
 os.makedirs("ecommerce_data", exist_ok=True)
 os.makedirs("ecommerce_products", exist_ok=True)
 
+# Shared by every session in this worker process
+order_ids = OrderIdGenerator()
+
 class ProductManager:
-    """Manages product catalog with file-based storage"""
+    """Manages product catalog with file-based storage
+    
+    One instance is loaded per worker process and shared by every session on
+    it. Product dicts are never mutated once published: a stock change swaps
+    in an updated copy, so a session still holding the previous dict keeps
+    reading a consistent snapshot.
+    """
     
     def __init__(self):
         self.products_file = "ecommerce_products/products.json"
-        self.products = self._load_products()
+        self.journal = StockJournal("ecommerce_products/stock_journal.jsonl")
+        # Load under the stock lock so no other worker compacts halfway through
+        with self.journal.locked():
+            self.index = self._load_products()
+        self.products = self.index.products
+        self._stopped = threading.Event()
+        self._compactor: Optional[threading.Thread] = None
     
-    def _load_products(self) -> List[Dict[str, Any]]:
-        """Load products from JSON file or create default catalog"""
+    def _load_products(self) -> ProductSearchIndex:
+        """Stream products from JSON file into a compact indexed catalog, or create default catalog"""
+        # Stock changes since the last snapshot live in the journal
+        stock_levels = dict(self.journal.read_new())
+        
         if os.path.exists(self.products_file):
             try:
-                with open(self.products_file, 'r') as f:
-                    products = json.load(f)
-                logger.info(f"Loaded {len(products)} products from {self.products_file}")
-                return products
+                index = ProductSearchIndex((), store=ColumnarCatalog())
+                # The catalog keeps each product's JSON text as read
+                for product, source in iter_json_array(self.products_file, with_source=True):
+                    if product["id"] in stock_levels:
+                        apply_stock_quantity(product, stock_levels[product["id"]])
+                    index.add_product(product, source)
+                logger.info(f"Loaded {len(index.products)} products from {self.products_file}")
+                return index
             except Exception as e:
                 logger.error(f"Error loading products: {e}")
         
@@ -204,140 +232,244 @@ class ProductManager:
         ]
         
         self._save_products(default_products)
-        return default_products
+        return ProductSearchIndex(default_products, store=ColumnarCatalog())
     
-    def _save_products(self, products: List[Dict[str, Any]]) -> bool:
+    def _save_products(self, products: Iterable[Dict[str, Any]]) -> bool:
         """Save products to JSON file"""
         try:
-            with open(self.products_file, 'w') as f:
-                json.dump(products, f, indent=2, ensure_ascii=False)
-            logger.info(f"Saved {len(products)} products to {self.products_file}")
+            count = write_json_array_atomic(self.products_file, products)
+            logger.info(f"Saved {count} products to {self.products_file}")
             return True
         except Exception as e:
             logger.error(f"Error saving products: {e}")
             return False
     
-    def search_products(self, query: str, category: str = "", max_price: float = 0, 
-                       color: str = "", brand: str = "") -> List[Dict[str, Any]]:
+    def search_products(self, query: str = "", category: str = "", max_price: float = 0,
+                       color: str = "", brand: str = "", limit: int = 0) -> List[Dict[str, Any]]:
         """Advanced product search with multiple filters and relevance scoring"""
-        query = query.lower().strip()
-        results = []
-        
-        for product in self.products:
-            if not product.get("in_stock", True):
-                continue
-            
-            # Apply filters
-            if category and category.strip() and product.get("category", "") != category.lower():
-                continue
-                
-            if max_price and max_price > 0 and product.get("price", 0) > max_price:
-                continue
-                
-            if color and color.strip() and product.get("color", "").lower() != color.lower():
-                continue
-                
-            if brand and brand.strip() and product.get("brand", "").lower() != brand.lower():
-                continue
-            
-            # Calculate relevance score
-            score = 0
-            product_lower = {k: str(v).lower() if isinstance(v, str) else v for k, v in product.items()}
-            
-            # Exact matches in key fields (higher weight)
-            if query in product_lower.get("name", ""):
-                score += 10
-            if query in product_lower.get("brand", ""):
-                score += 8
-            if query in product_lower.get("category", ""):
-                score += 6
-            if query in product_lower.get("subcategory", ""):
-                score += 5
-            
-            # Partial matches and tag matches
-            if any(query in tag for tag in product_lower.get("tags", [])):
-                score += 4
-            if query in product_lower.get("description", ""):
-                score += 3
-            if query in product_lower.get("color", ""):
-                score += 2
-            if query in product_lower.get("material", ""):
-                score += 1
-            
-            # If we have a query but no matches, skip this product
-            if query and score == 0:
-                continue
-                
-            # Add rating bonus
-            score += product.get("rating", 0) * 0.5
-            
-            if score > 0 or not query:  # Include all if no query but filters applied
-                results.append((product, score))
-        
-        # Sort by relevance score (descending) and then by rating
-        results.sort(key=lambda x: (-x[1], -x[0].get("rating", 0)))
-        return [product for product, score in results]
+        products, _ = self.index.search(query, category, max_price, color, brand, limit)
+        return products
+
+    def search_products_ranked(self, query: str = "", category: str = "", max_price: float = 0,
+                               color: str = "", brand: str = "", limit: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+        """Top ranked products together with the total number of matches"""
+        return self.index.search(query, category, max_price, color, brand, limit)
     
     def get_categories(self) -> List[str]:
         """Get all available product categories"""
-        categories = set()
-        for product in self.products:
-            if product.get("in_stock", True):
-                categories.add(product.get("category", ""))
-        return sorted(list(categories))
+        return sorted(self.index.category_counts)
+    
+    def get_category_counts(self) -> Dict[str, int]:
+        """Number of in-stock products in each available category"""
+        return dict(self.index.category_counts)
     
     def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
         """Get product by ID"""
-        return next((p for p in self.products if p["id"] == product_id), None)
+        return self.index.get_product(product_id)
+    
+    def recommend(self, preferences: Dict[str, Any], limit: int = 4) -> List[Dict[str, Any]]:
+        """Recommend in-stock products weighted by the shopper's preferences"""
+        price_range = preferences.get("price_range", {})
+        min_price = price_range.get("min", 0)
+        max_price = price_range.get("max", 0)
+        
+        # Recently browsed categories count more than older ones
+        category_weights: Dict[str, float] = {}
+        for age, category in enumerate(reversed(preferences.get("preferred_categories", []))):
+            category = category.lower()
+            category_weights[category] = category_weights.get(category, 0) + 1 / (age + 1)
+        
+        candidates: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        
+        def consider(product: Dict[str, Any], weight: float) -> None:
+            price = product.get("price", 0)
+            if price < min_price or (max_price and price > max_price):
+                return
+            score = product.get("rating", 0) + 2 * weight
+            if product["id"] not in candidates or score > candidates[product["id"]][0]:
+                candidates[product["id"]] = (score, product)
+        
+        for category, weight in category_weights.items():
+            for product in self.index.top_rated(category, limit):
+                consider(product, weight)
+        
+        # Products matching recent searches, through the search index
+        for query in preferences.get("recent_searches", [])[-3:]:
+            for product in self.search_products(query, limit=2):
+                consider(product, 0.5)
+        
+        if not candidates:
+            for product in self.index.top_rated(limit=limit):
+                consider(product, 0)
+        
+        ranked = sorted(candidates.values(), key=lambda c: -c[0])
+        return [product for _, product in ranked[:limit]]
     
     def update_stock(self, product_id: str, quantity: int) -> bool:
         """Update product stock quantity"""
-        product = self.get_product_by_id(product_id)
-        if product:
-            product["stock_quantity"] = max(0, product.get("stock_quantity", 0) - quantity)
-            if product["stock_quantity"] == 0:
-                product["in_stock"] = False
-            self._save_products(self.products)
+        with self.journal.locked():
+            self._sync_stock()
+            product = self.get_product_by_id(product_id)
+            if not product:
+                return False
+            
+            stock_quantity = max(0, product.get("stock_quantity", 0) - quantity)
+            try:
+                self._commit_stock([(product_id, -quantity, stock_quantity)])
+            except Exception as e:
+                logger.error(f"Error journaling stock for {product_id}: {e}")
+                return False
             return True
-        return False
+    
+    def reserve_stock(self, lines: Dict[str, int]) -> List[str]:
+        """Take stock for every cart line at once, or for none of them
+        
+        Returns the reasons the order cannot be filled, empty on success.
+        """
+        with self.journal.locked():
+            self._sync_stock()
+            
+            problems = []
+            changes = []
+            for product_id, quantity in lines.items():
+                if quantity < 1:
+                    # A negative quantity would put stock back instead of taking it
+                    problems.append(f"{quantity} is not a valid quantity for {product_id}")
+                    continue
+                product = self.get_product_by_id(product_id)
+                if not product:
+                    problems.append(f"{product_id} is no longer in our catalog")
+                    continue
+                available = product.get("stock_quantity", 0) if product.get("in_stock", True) else 0
+                if quantity > available:
+                    problems.append(f"only {available} units of {product['name']} are left")
+                    continue
+                changes.append((product_id, -quantity, available - quantity))
+            
+            if problems:
+                return problems
+            self._commit_stock(changes)
+            return []
+    
+    def _commit_stock(self, changes: List[Tuple[str, int, int]]) -> None:
+        """Journal stock changes in one write, then publish them (stock lock held)"""
+        self.journal.append(changes)
+        for product_id, _, stock_quantity in changes:
+            self._set_stock(self.get_product_by_id(product_id), stock_quantity)
+    
+    def _sync_stock(self) -> None:
+        """Apply stock changes other worker processes made (stock lock held)"""
+        changes = []
+        if self.journal.was_replaced():
+            # Another worker compacted; finish the journal it replaced
+            changes = self.journal.read_replaced()
+            if changes is None:
+                # More than one compaction behind, only the snapshot has every change
+                changes = [(p["id"], p.get("stock_quantity", 0)) for p in iter_json_array(self.products_file)]
+        changes.extend(self.journal.read_new())
+        
+        for product_id, stock_quantity in changes:
+            product = self.get_product_by_id(product_id)
+            if product and product.get("stock_quantity") != stock_quantity:
+                self._set_stock(product, stock_quantity)
+    
+    def _set_stock(self, product: Dict[str, Any], stock_quantity: int) -> None:
+        """Publish a copy of the product with its new stock level"""
+        updated = dict(product)
+        apply_stock_quantity(updated, stock_quantity)
+        self.index.replace_product(updated)
 
-# Load existing orders or create empty list
-def load_orders():
-    orders_file = "ecommerce_data/orders.json"
-    if os.path.exists(orders_file):
-        try:
-            with open(orders_file, 'r') as f:
-                orders = json.load(f)
-            logger.info(f"Loaded {len(orders)} existing orders")
-            return orders
-        except Exception as e:
-            logger.error(f"Error loading orders: {e}")
-    return []
+    def compact(self) -> bool:
+        """Fold journaled stock changes into the products.json snapshot
 
-def save_orders(orders):
-    """Save orders to JSON file"""
-    try:
-        orders_file = "ecommerce_data/orders.json"
-        with open(orders_file, 'w') as f:
-            json.dump(orders, f, indent=2, ensure_ascii=False)
-        logger.info(f"Saved {len(orders)} orders to {orders_file}")
-        return True
-    except Exception as e:
-        logger.error(f"Error saving orders: {e}")
+        The stock lock is only held to copy the catalog and to swap the new
+        files in; the snapshot is written while orders carry on. Returns
+        False if another worker is already compacting or the write failed.
+        """
+        with self.journal.compaction_claim() as claimed:
+            if not claimed:
+                return False
+            with self.journal.locked():
+                self._sync_stock()
+                snapshot_offset = self.journal.offset
+                snapshot = self.products.copy()
+
+            tmp_path = f"{self.products_file}.tmp"
+            try:
+                count = write_json_array(tmp_path, snapshot)
+            except Exception as e:
+                logger.error(f"Error saving products: {e}")
+                return False
+
+            with self.journal.locked():
+                self._sync_stock()
+                os.replace(tmp_path, self.products_file)
+                self.journal.rotate(snapshot_offset)
+            logger.info(f"Compacted stock journal into {count} products in {self.products_file}")
+            return True
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(COMPACT_CHECK_INTERVAL):
+            try:
+                # Catching up regularly keeps this worker within one compaction
+                with self.journal.locked():
+                    self._sync_stock()
+                    due = self.journal.needs_compaction()
+                if due:
+                    self.compact()
+            except Exception as e:
+                logger.error(f"Error compacting stock journal: {e}")
+
+    def start(self) -> None:
+        """Start syncing and compacting the stock journal in a background thread"""
+        if self._compactor is None:
+            self._stopped.clear()
+            self._compactor = threading.Thread(target=self._watch, name="stock-compactor", daemon=True)
+            self._compactor.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+            return True
         return False
 
+def open_order_log() -> OrderLog:
+    """Open the append-only order history, importing the old orders.json once"""
+    return OrderLog(
+        "ecommerce_data/orders.jsonl",
+        "ecommerce_data/orders.idx",
+        legacy_file="ecommerce_data/orders.json",
+    )
+
+def format_order(order: Dict[str, Any]) -> str:
+    """Format an order's ID, status, items and total for the shopper"""
+    response = f"**Order ID:** {order['id']}\n"
+    response += f"**Date:** {datetime.fromisoformat(order['created_at']).strftime('%b %d, %Y at %I:%M %p')}\n"
+    response += f"**Status:** {order['status'].title()}\n"
+    response += f"**Payment Method:** {order.get('payment_method', 'N/A')}\n\n"
+    
+    response += "**Items:**\n"
+    for item in order["items"]:
+        response += f"• {item['product_name']} ({item.get('color', '')}) - Qty: {item['quantity']} - ₹{item['unit_price'] * item['quantity']}\n"
+    
+    response += f"\n**Total:** ₹{order['total']}\n\n"
+    return response
+
 class EcommerceAgent(Agent):
-    def __init__(self):
-        # Initialize product manager
-        self.product_manager = ProductManager()
+    def __init__(self, product_manager: Optional[ProductManager] = None,
+                 order_log: Optional[OrderLog] = None):
+        # Use the worker's shared catalog when given, otherwise load our own
+        self.product_manager = product_manager or ProductManager()
         
-        # Load existing orders
-        self.orders = load_orders()
+        # Order history is read on demand, not parsed up front
+        self.order_log = order_log or open_order_log()
         
         # Shopping session state
         self.session_state = {
             "current_products": [],
-            "cart": [],
+            "cart": {},  # product ID -> quantity
             "last_order": None,
             "conversation_context": "greeting",
             "user_preferences": {
@@ -365,6 +497,7 @@ CONVERSATION FLOW:
 - When user asks to browse, call appropriate search functions
 - Show 2-3 products at a time with clear details including ratings
 - Help user specify which product they want to buy (use product IDs)
+- For several products, add them to the cart and check out once
 - Confirm order details before creating
 - Always be helpful, patient, and clear
 
@@ -389,9 +522,9 @@ RESPONSE RULES:
             if category:
                 self.session_state["user_preferences"]["preferred_categories"].append(category)
             
-            # Search products
-            products = self.product_manager.search_products(
-                query="", category=category, max_price=max_price, color=color, brand=brand
+            # Search products, keeping only the ones we will read out
+            products, total = self.product_manager.search_products_ranked(
+                query="", category=category, max_price=max_price, color=color, brand=brand, limit=4
             )
             
             # Store current products for reference
@@ -409,11 +542,11 @@ RESPONSE RULES:
             
             # Format response
             if category or max_price or color or brand:
-                response = f"Found {len(products)} product(s) matching your criteria:\n\n"
+                response = f"Found {total} product(s) matching your criteria:\n\n"
             else:
-                response = f"Showing {len(products)} available products:\n\n"
+                response = f"Showing {total} available products:\n\n"
             
-            for i, product in enumerate(products[:4], 1):  # Show max 4 products
+            for i, product in enumerate(products, 1):  # Show max 4 products
                 rating = product.get("rating", 0)
                 rating_stars = "⭐" * int(rating) + "☆" * (5 - int(rating))
                 brand_info = f" by {product['brand']}" if product.get('brand') else ""
@@ -423,8 +556,8 @@ RESPONSE RULES:
                 response += f"   {product['description'][:100]}...\n"
                 response += f"   ID: {product['id']} | Color: {product['color'].title()}\n\n"
             
-            if len(products) > 4:
-                response += f"... and {len(products) - 4} more products.\n\n"
+            if total > len(products):
+                response += f"... and {total - len(products)} more products.\n\n"
             
             response += "Would you like to see details of any product or apply different filters?"
             return response
@@ -442,8 +575,8 @@ RESPONSE RULES:
             if len(self.session_state["user_preferences"]["recent_searches"]) > 5:
                 self.session_state["user_preferences"]["recent_searches"].pop(0)
             
-            # Search products
-            products = self.product_manager.search_products(query=query)
+            # Search products, keeping only the ones we will read out
+            products, total = self.product_manager.search_products_ranked(query=query, limit=3)
             
             # Store current products for reference
             self.session_state["current_products"] = products
@@ -451,8 +584,8 @@ RESPONSE RULES:
             if not products:
                 return f"I couldn't find any products matching '{query}'. Would you like to try a different search term or browse by category?"
             
-            response = f"I found {len(products)} product(s) for '{query}':\n\n"
-            for i, product in enumerate(products[:3], 1):
+            response = f"I found {total} product(s) for '{query}':\n\n"
+            for i, product in enumerate(products, 1):
                 rating = product.get("rating", 0)
                 rating_stars = "⭐" * int(rating) + "☆" * (5 - int(rating))
                 brand_info = f" by {product['brand']}" if product.get('brand') else ""
@@ -472,6 +605,8 @@ RESPONSE RULES:
     @function_tool
     async def create_order(self, context: RunContext, product_id: str, quantity: int = 1) -> str:
         """Create an order for a specific product"""
+        if quantity < 1:
+            return "Please order at least one item."
         try:
             # Find the product
             product = self.product_manager.get_product_by_id(product_id)
@@ -485,36 +620,13 @@ RESPONSE RULES:
             if product.get("stock_quantity", 0) < quantity:
                 return f"Sorry, we only have {product.get('stock_quantity', 0)} units of {product['name']} in stock."
             
-            # Calculate total
-            total = product["price"] * quantity
-            
-            # Create order object
-            order = {
-                "id": f"ORD-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{random.randint(1000, 9999)}",
-                "items": [
-                    {
-                        "product_id": product_id,
-                        "product_name": product["name"],
-                        "quantity": quantity,
-                        "unit_price": product["price"],
-                        "currency": product["currency"],
-                        "brand": product.get("brand", ""),
-                        "color": product.get("color", "")
-                    }
-                ],
-                "total": total,
-                "currency": product["currency"],
-                "created_at": datetime.now().isoformat(),
-                "status": "confirmed",
-                "shipping_address": "To be provided",
-                "payment_method": "Voice Order"
-            }
+            # Take the stock first so a concurrent order can't oversell it
+            problems = await asyncio.to_thread(self.product_manager.reserve_stock, {product_id: quantity})
+            if problems:
+                return f"Sorry, {problems[0]}."
             
-            # Update stock and save order
-            self.product_manager.update_stock(product_id, quantity)
-            self.orders.append(order)
-            self.session_state["last_order"] = order
-            save_orders(self.orders)
+            order = await self._record_order({product_id: quantity})
+            total = order["total"]
             
             # Format confirmation message
             response = f"✅ Order confirmed!\n\n"
@@ -532,26 +644,135 @@ RESPONSE RULES:
             logger.error(f"Error in create_order: {e}")
             return "I'm having trouble processing your order right now. Please try again."
 
+    async def _record_order(self, lines: Dict[str, int]) -> Dict[str, Any]:
+        """Write one order for stock already reserved and remember it"""
+        items = []
+        for product_id, quantity in lines.items():
+            product = self.product_manager.get_product_by_id(product_id)
+            items.append({
+                "product_id": product_id,
+                "product_name": product["name"],
+                "quantity": quantity,
+                "unit_price": product["price"],
+                "currency": product["currency"],
+                "brand": product.get("brand", ""),
+                "color": product.get("color", "")
+            })
+        
+        order = {
+            "id": order_ids.next_id(),
+            "items": items,
+            "total": sum(item["unit_price"] * item["quantity"] for item in items),
+            "currency": items[0]["currency"],
+            "created_at": datetime.now().isoformat(),
+            "status": "confirmed",
+            "shipping_address": "To be provided",
+            "payment_method": "Voice Order"
+        }
+        
+        await asyncio.to_thread(self.order_log.append, order)
+        self.session_state["last_order"] = order
+        return order
+
+    @function_tool
+    async def add_to_cart(self, context: RunContext, product_id: str, quantity: int = 1) -> str:
+        """Add a product to the shopping cart"""
+        if quantity < 1:
+            return "Please add at least one item. To take something out of your cart, ask me to remove it."
+        try:
+            product = self.product_manager.get_product_by_id(product_id)
+            
+            if not product:
+                return "I couldn't find that product. Please check the product ID and try again."
+            
+            if not product.get("in_stock", True):
+                return f"Sorry, {product['name']} is currently out of stock."
+            
+            cart = self.session_state["cart"]
+            new_quantity = cart.get(product_id, 0) + quantity
+            if product.get("stock_quantity", 0) < new_quantity:
+                return f"Sorry, we only have {product.get('stock_quantity', 0)} units of {product['name']} in stock."
+            
+            cart[product_id] = new_quantity
+            return f"Added {quantity} x {product['name']} to your cart. You now have {sum(cart.values())} item(s) in your cart. Would you like to keep shopping or check out?"
+            
+        except Exception as e:
+            logger.error(f"Error in add_to_cart: {e}")
+            return "I'm having trouble updating your cart right now. Please try again."
+
+    @function_tool
+    async def remove_from_cart(self, context: RunContext, product_id: str) -> str:
+        """Remove a product from the shopping cart"""
+        cart = self.session_state["cart"]
+        if product_id not in cart:
+            return "That product isn't in your cart."
+        
+        del cart[product_id]
+        product = self.product_manager.get_product_by_id(product_id)
+        name = product["name"] if product else product_id
+        return f"Removed {name} from your cart."
+
+    @function_tool
+    async def view_cart(self, context: RunContext) -> str:
+        """Show the items in the shopping cart and the total"""
+        try:
+            cart = self.session_state["cart"]
+            if not cart:
+                return "Your cart is empty. What would you like to browse?"
+            
+            response = "🛒 **Your Cart:**\n\n"
+            total = 0
+            for product_id, quantity in cart.items():
+                product = self.product_manager.get_product_by_id(product_id)
+                if not product:
+                    continue
+                total += product["price"] * quantity
+                response += f"• {product['name']} - Qty: {quantity} - ₹{product['price'] * quantity}\n"
+            
+            response += f"\n**Total:** ₹{total}\n\n"
+            response += "Would you like to check out now?"
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error in view_cart: {e}")
+            return "I'm having trouble showing your cart right now."
+
+    @function_tool
+    async def checkout(self, context: RunContext) -> str:
+        """Place one order for everything in the shopping cart"""
+        try:
+            cart = self.session_state["cart"]
+            if not cart:
+                return "Your cart is empty. Would you like to browse some products first?"
+            
+            # All lines are reserved together, or none of them
+            problems = await asyncio.to_thread(self.product_manager.reserve_stock, cart)
+            if problems:
+                return f"I couldn't place your order: {'; '.join(problems)}. Would you like to update your cart?"
+            
+            order = await self._record_order(cart)
+            cart.clear()
+            
+            response = "✅ Order confirmed!\n\n"
+            response += format_order(order)
+            response += "Thank you for your purchase! Your order has been processed successfully."
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error in checkout: {e}")
+            return "I'm having trouble processing your order right now. Please try again."
+
     @function_tool
     async def get_last_order(self, context: RunContext) -> str:
         """Get the most recent order details"""
         try:
-            if not self.orders:
-                return "You haven't placed any orders yet. Would you like to browse our products?"
+            last_order = self.session_state.get("last_order") or self.order_log.last_order()
             
-            last_order = self.session_state.get("last_order") or self.orders[-1]
+            if not last_order:
+                return "You haven't placed any orders yet. Would you like to browse our products?"
             
             response = f"📦 **Your Last Order:**\n\n"
-            response += f"**Order ID:** {last_order['id']}\n"
-            response += f"**Date:** {datetime.fromisoformat(last_order['created_at']).strftime('%b %d, %Y at %I:%M %p')}\n"
-            response += f"**Status:** {last_order['status'].title()}\n"
-            response += f"**Payment Method:** {last_order.get('payment_method', 'N/A')}\n\n"
-            
-            response += "**Items:**\n"
-            for item in last_order["items"]:
-                response += f"• {item['product_name']} ({item.get('color', '')}) - Qty: {item['quantity']} - ₹{item['unit_price'] * item['quantity']}\n"
-            
-            response += f"\n**Total:** ₹{last_order['total']}\n\n"
+            response += format_order(last_order)
             response += "Would you like to browse similar products?"
             
             return response
@@ -560,6 +781,24 @@ RESPONSE RULES:
             logger.error(f"Error in get_last_order: {e}")
             return "I'm having trouble retrieving your order details right now."
 
+    @function_tool
+    async def get_order_details(self, context: RunContext, order_id: str) -> str:
+        """Look up a previous order by its order ID"""
+        try:
+            order = self.order_log.get(order_id.strip().upper())
+            
+            if not order:
+                return "I couldn't find an order with that ID. Please check the order ID and try again."
+            
+            response = "📦 **Order Details:**\n\n"
+            response += format_order(order)
+            response += "Is there anything else I can help you with?"
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error in get_order_details: {e}")
+            return "I'm having trouble retrieving that order right now."
+
     @function_tool
     async def get_product_details(self, context: RunContext, product_id: str) -> str:
         """Get detailed information about a specific product"""
@@ -600,13 +839,11 @@ RESPONSE RULES:
     async def browse_categories(self, context: RunContext) -> str:
         """Show all available product categories"""
         try:
-            categories = self.product_manager.get_categories()
+            category_counts = self.product_manager.get_category_counts()
             
             response = "🛍️ **Available Categories:**\n\n"
-            for i, category in enumerate(categories, 1):
-                # Count products in this category
-                category_products = self.product_manager.search_products(category=category)
-                response += f"{i}. **{category.title()}** - {len(category_products)} products available\n"
+            for i, category in enumerate(sorted(category_counts), 1):
+                response += f"{i}. **{category.title()}** - {category_counts[category]} products available\n"
             
             response += "\nWhich category would you like to explore? You can say 'show me mugs' or 'browse clothing'."
             return response
@@ -621,24 +858,13 @@ RESPONSE RULES:
         try:
             preferences = self.session_state["user_preferences"]
             
-            # Get preferred categories or use all
-            preferred_cats = preferences.get("preferred_categories", [])
-            categories_to_search = preferred_cats if preferred_cats else self.product_manager.get_categories()
-            
-            suggestions = []
-            for category in categories_to_search[:2]:  # Limit to 2 categories
-                category_products = self.product_manager.search_products(category=category)
-                # Take top rated products from each category
-                top_products = sorted(category_products, key=lambda x: x.get("rating", 0), reverse=True)[:2]
-                suggestions.extend(top_products)
+            suggestions = self.product_manager.recommend(preferences, limit=4)
             
             if not suggestions:
-                # Fallback to random popular products
-                all_products = [p for p in self.product_manager.products if p.get("in_stock", True)]
-                suggestions = random.sample(all_products, min(4, len(all_products)))
+                return "I don't have any products in stock to recommend right now. Please check back soon!"
             
             response = "🎯 **Recommended For You:**\n\n"
-            for i, product in enumerate(suggestions[:4], 1):
+            for i, product in enumerate(suggestions, 1):
                 rating = product.get("rating", 0)
                 response += f"{i}. **{product['name']}** - ₹{product['price']} | ⭐{rating}\n"
                 response += f"   {product['description'][:80]}...\n"
@@ -655,10 +881,13 @@ def prewarm(proc: JobProcess):
     """Preload models and e-commerce data"""
     logger.info("Prewarming E-commerce agent...")
     proc.userdata["vad"] = silero.VAD.load()
-    # Preload product manager and orders
+    # Load the catalog and order index once; every job on this process shares them
     product_manager = ProductManager()
-    orders = load_orders()
-    logger.info(f"Loaded {len(product_manager.products)} products and {len(orders)} orders during prewarm")
+    product_manager.start()
+    order_log = open_order_log()
+    proc.userdata["product_manager"] = product_manager
+    proc.userdata["order_log"] = order_log
+    logger.info(f"Loaded {len(product_manager.products)} products and {order_log.count()} orders during prewarm")
 
 async def entrypoint(ctx: JobContext):
     ctx.log_context_fields = {
@@ -669,8 +898,11 @@ async def entrypoint(ctx: JobContext):
     logger.info("Starting E-commerce agent session...")
     
     try:
-        # Initialize E-commerce agent
-        ecommerce_agent = EcommerceAgent()
+        # Initialize E-commerce agent on the catalog loaded during prewarm
+        ecommerce_agent = EcommerceAgent(
+            product_manager=ctx.proc.userdata.get("product_manager"),
+            order_log=ctx.proc.userdata.get("order_log"),
+        )
         logger.info("E-commerce agent initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize agent: {e}")
@@ -0,0 +1,284 @@
+"""Offline benchmark for the e-commerce product catalog
+
+Synthesizes catalogs in the ecommerce_products/products.json schema and
+times ProductManager on a representative mix of voice-shopping operations.
+No LiveKit server, credentials or LLM are needed.
+
+    uv run python src/benchmark_catalog.py
+    uv run python src/benchmark_catalog.py --sizes 1000 100000 --ops 2000
+"""
+
+import argparse
+import logging
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable
+
+# Where agent.py lives; benchmark processes chdir into a scratch directory
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CATEGORIES = {
+    "mugs": (["drinkware"], ["Mug", "Tea Cup", "Travel Tumbler"], ["ceramic", "steel"]),
+    "clothing": (
+        ["tops", "outerwear"],
+        ["T-Shirt", "Polo", "Hoodie", "Kurta"],
+        ["cotton", "cotton-polyester", "linen"],
+    ),
+    "stationery": (
+        ["journals", "pens"],
+        ["Journal", "Notebook", "Fountain Pen"],
+        ["leather-paper", "paper", "metal"],
+    ),
+    "bags": (
+        ["laptop-bags", "backpacks"],
+        ["Laptop Bag", "Backpack", "Tote"],
+        ["nylon", "canvas", "leather"],
+    ),
+    "electronics": (
+        ["audio", "chargers"],
+        ["Earbuds", "Headphones", "Power Bank"],
+        ["plastic", "aluminium"],
+    ),
+    "footwear": (
+        ["sneakers", "sandals"],
+        ["Sneakers", "Sandals", "Loafers"],
+        ["mesh", "leather", "rubber"],
+    ),
+    "accessories": (
+        ["wallets", "watches"],
+        ["Wallet", "Watch", "Belt"],
+        ["genuine leather", "steel"],
+    ),
+}
+COLORS = ["black", "blue", "brown", "grey", "red", "white", "green", "beige"]
+ADJECTIVES = [
+    "Classic",
+    "Premium",
+    "Handmade",
+    "Soft",
+    "Professional",
+    "Everyday",
+    "Vintage",
+    "Eco",
+]
+BRANDS = [
+    f"{a} {b}"
+    for a in ["Urban", "Desi", "Artisan", "Comfort", "Street", "Leather"]
+    for b in ["Classic", "Designs", "Pottery", "Wear", "Style", "Craft", "Zone"]
+]
+TAGS = [
+    "coffee",
+    "tea",
+    "cotton",
+    "casual",
+    "premium",
+    "winter",
+    "gift",
+    "travel",
+    "office",
+    "handmade",
+    "durable",
+    "lightweight",
+    "waterproof",
+    "eco-friendly",
+    "festive",
+]
+
+FREE_TEXT_QUERIES = [
+    "mug",
+    "cotton",
+    "blue hoodie",
+    "premium",
+    "leather wallet",
+    "tea",
+    "laptop bag",
+    "eco",
+    "sneakers",
+    "gift",
+    "waterproof backpack",
+    "zzz",
+]
+
+# Stock per synthetic product, high enough that order writes never run out
+SYNTHETIC_STOCK = 10_000_000
+
+
+def synthesize_products(count: int, seed: int = 7) -> Iterator[dict[str, Any]]:
+    """Yield products shaped like ecommerce_products/products.json"""
+    rng = random.Random(seed)
+    categories = list(CATEGORIES)
+    for i in range(count):
+        category = rng.choice(categories)
+        subcategories, nouns, materials = CATEGORIES[category]
+        color = rng.choice(COLORS)
+        noun = rng.choice(nouns)
+        name = f"{rng.choice(ADJECTIVES)} {color.title()} {noun}"
+        yield {
+            "id": f"{category}-{i:07d}",
+            "name": name,
+            "description": f"{name} for everyday use. Carefully made with {rng.choice(materials)} "
+            f"and a {rng.choice(ADJECTIVES).lower()} finish.",
+            "price": rng.randrange(199, 9999),
+            "currency": "INR",
+            "category": category,
+            "subcategory": rng.choice(subcategories),
+            "color": color,
+            "material": rng.choice(materials),
+            "size": rng.choice(["S", "M", "L", "standard"]),
+            "brand": rng.choice(BRANDS),
+            "tags": rng.sample(TAGS, 5),
+            "in_stock": rng.random() > 0.05,
+            "stock_quantity": SYNTHETIC_STOCK,
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "review_count": rng.randrange(0, 500),
+            "images": [f"{category}-{i:07d}-1.jpg"],
+        }
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    rank = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def time_operation(operation: Callable[[int], Any], ops: int) -> dict[str, float]:
+    """Run an operation `ops` times and summarize its latency"""
+    samples = []
+    started = time.perf_counter()
+    for i in range(ops):
+        begin = time.perf_counter()
+        operation(i)
+        samples.append((time.perf_counter() - begin) * 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        "p50_ms": statistics.median(samples),
+        "p99_ms": percentile(samples, 0.99),
+        "ops_per_sec": ops / elapsed if elapsed else float("inf"),
+    }
+
+
+def run_size(size: int, ops: int, order_ops: int) -> dict[str, Any]:
+    """Benchmark one catalog size in a scratch directory"""
+    logging.disable(logging.INFO)
+    workdir = tempfile.mkdtemp(prefix=f"catalog-bench-{size}-")
+    try:
+        os.chdir(workdir)
+        return _benchmark_catalog(size, ops, order_ops)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _benchmark_catalog(size: int, ops: int, order_ops: int) -> dict[str, Any]:
+    os.makedirs("ecommerce_products", exist_ok=True)
+    sys.path.insert(0, SRC_DIR)
+
+    from catalog_loader import write_json_array_atomic
+
+    write_json_array_atomic(
+        "ecommerce_products/products.json", synthesize_products(size)
+    )
+
+    # Imported here so the agent module creates its data folders in workdir
+    from agent import ProductManager
+
+    started = time.perf_counter()
+    manager = ProductManager()
+    load_seconds = time.perf_counter() - started
+
+    rng = random.Random(size)
+    ids = [
+        manager.products.ids[rng.randrange(size)] for _ in range(max(ops, order_ops))
+    ]
+    browse_filters = [
+        {
+            "category": rng.choice(list(CATEGORIES)),
+            "color": rng.choice([*COLORS, ""]),
+            "max_price": rng.choice([0, 1000, 5000]),
+        }
+        for _ in range(ops)
+    ]
+
+    results = {
+        "free_text_search": time_operation(
+            lambda i: manager.search_products_ranked(
+                FREE_TEXT_QUERIES[i % len(FREE_TEXT_QUERIES)], limit=3
+            ),
+            ops,
+        ),
+        "filtered_browse": time_operation(
+            lambda i: manager.search_products_ranked(limit=4, **browse_filters[i]), ops
+        ),
+        "category_counts": time_operation(lambda i: manager.get_category_counts(), ops),
+        "id_lookup": time_operation(lambda i: manager.get_product_by_id(ids[i]), ops),
+        "recommend": time_operation(
+            lambda i: manager.recommend(
+                {"preferred_categories": [browse_filters[i]["category"]]}
+            ),
+            ops,
+        ),
+        "order_write": time_operation(
+            lambda i: manager.reserve_stock({ids[i]: 1}), order_ops
+        ),
+    }
+
+    return {
+        "size": size,
+        "load_seconds": load_seconds,
+        # ru_maxrss is reported in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "operations": results,
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    print(
+        f"\n=== {report['size']:,} products | load {report['load_seconds']:.2f}s "
+        f"| peak RSS {report['peak_rss_mb']:.0f} MB ==="
+    )
+    print(f"{'operation':<18}{'p50 ms':>10}{'p99 ms':>10}{'ops/sec':>12}")
+    for name, stats in report["operations"].items():
+        print(
+            f"{name:<18}{stats['p50_ms']:>10.3f}{stats['p99_ms']:>10.3f}{stats['ops_per_sec']:>12.0f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the e-commerce product catalog"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 100_000, 1_000_000],
+        help="catalog sizes to synthesize",
+    )
+    parser.add_argument(
+        "--ops", type=int, default=1000, help="operations per read benchmark"
+    )
+    parser.add_argument(
+        "--order-ops",
+        type=int,
+        default=200,
+        help="order writes per size (each one fsyncs the stock journal)",
+    )
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        # A fresh process per size keeps peak RSS and imports independent
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            report = executor.submit(run_size, size, args.ops, args.order_ops).result()
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
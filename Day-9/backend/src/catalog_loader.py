@@ -0,0 +1,189 @@
+import json
+import os
+import re
+import sys
+from array import array
+from collections import OrderedDict
+from collections.abc import Iterable, Iterator
+from typing import Any, Optional
+
+# Bytes read from products.json per step while streaming
+READ_CHUNK_SIZE = 1 << 16
+
+# Whitespace and commas between array items
+SEPARATORS = re.compile(r"[\s,]*")
+
+# Fully materialized product dicts kept around for repeat lookups
+MATERIALIZED_CACHE_SIZE = 256
+
+# Fields held in typed columns rather than in each product's encoded blob
+COLUMN_FIELDS = ("id", "price", "rating", "stock_quantity", "in_stock")
+
+
+def iter_json_array(
+    path: str, chunk_size: int = READ_CHUNK_SIZE, with_source: bool = False
+) -> Iterator[Any]:
+    """Yield the objects of a top-level JSON array one at a time
+
+    Only the object being decoded and one read chunk are held in memory, so
+    a catalog never has to exist as a single list of dicts. With
+    `with_source`, each object comes paired with the JSON text it was
+    decoded from.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = f.read(chunk_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError(f"{path} does not contain a JSON array")
+        position = 1
+        at_eof = False
+
+        while True:
+            position = SEPARATORS.match(buffer, position).end()
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            try:
+                if position >= len(buffer):
+                    raise json.JSONDecodeError("Buffer exhausted", buffer, position)
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The next object runs past the buffer, read more and retry
+                if at_eof:
+                    raise
+                chunk = f.read(chunk_size)
+                at_eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield (item, buffer[position:end]) if with_source else item
+            position = end
+
+
+def write_json_array(
+    path: str, items: Iterable[dict[str, Any]], indent: int = 2
+) -> int:
+    """Stream items into a JSON array file and flush it to disk"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for item in items:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(item, indent=indent, ensure_ascii=False))
+            count += 1
+        f.write("\n]")
+        f.flush()
+        os.fsync(f.fileno())
+    return count
+
+
+def write_json_array_atomic(
+    path: str, items: Iterable[dict[str, Any]], indent: int = 2
+) -> int:
+    """Stream items into a JSON array file, replacing the target atomically"""
+    tmp_path = f"{path}.tmp"
+    count = write_json_array(tmp_path, items, indent)
+    os.replace(tmp_path, path)
+    return count
+
+
+def _number(value: float) -> Any:
+    """Give whole numbers back their int type after a float column"""
+    return int(value) if value.is_integer() else value
+
+
+class ColumnarCatalog:
+    """Compact list-like product store
+
+    IDs are interned, price, rating and stock live in typed arrays, and the
+    rest of each product is kept as UTF-8 JSON. A full product dict is only
+    decoded when somebody reads that product, typically the few products
+    read out to the shopper.
+
+    Products streamed from products.json are appended with the JSON text
+    they were decoded from, which is kept as is rather than encoded again;
+    the typed columns take precedence over the same fields in it.
+    """
+
+    def __init__(self, products: Iterable[dict[str, Any]] = ()):
+        self.ids: list[str] = []
+        self.prices = array("d")
+        self.ratings = array("d")
+        self.stock = array("q")
+        self.in_stock = bytearray()
+        self._blobs: list[bytes] = []
+        self._cache: OrderedDict[int, dict[str, Any]] = OrderedDict()
+
+        for product in products:
+            self.append(product)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for position in range(len(self.ids)):
+            yield self._materialize(position)
+
+    def __getitem__(self, position: int) -> dict[str, Any]:
+        if position < 0:
+            position += len(self.ids)
+        if not 0 <= position < len(self.ids):
+            raise IndexError("catalog position out of range")
+        return self._materialize(position)
+
+    def __setitem__(self, position: int, product: dict[str, Any]) -> None:
+        self._store(position, product)
+        self._cache.pop(position, None)
+
+    def copy(self) -> "ColumnarCatalog":
+        """Snapshot of the catalog that later stock changes do not touch
+
+        Only the columns and the list of blobs are copied; the blobs
+        themselves are immutable and shared.
+        """
+        clone = ColumnarCatalog()
+        clone.ids = self.ids[:]
+        clone.prices = self.prices[:]
+        clone.ratings = self.ratings[:]
+        clone.stock = self.stock[:]
+        clone.in_stock = self.in_stock[:]
+        clone._blobs = self._blobs[:]
+        return clone
+
+    def append(self, product: dict[str, Any], source: Optional[str] = None) -> None:
+        self.ids.append(sys.intern(product["id"]))
+        self.prices.append(0)
+        self.ratings.append(0)
+        self.stock.append(0)
+        self.in_stock.append(1)
+        self._blobs.append(b"")
+        self._store(len(self.ids) - 1, product, source)
+
+    def _store(
+        self, position: int, product: dict[str, Any], source: Optional[str] = None
+    ) -> None:
+        self.prices[position] = product.get("price", 0)
+        self.ratings[position] = product.get("rating", 0)
+        self.stock[position] = product.get("stock_quantity", 0)
+        self.in_stock[position] = 1 if product.get("in_stock", True) else 0
+        if source is None:
+            rest = {k: v for k, v in product.items() if k not in COLUMN_FIELDS}
+            source = json.dumps(rest, ensure_ascii=False, separators=(",", ":"))
+        self._blobs[position] = source.encode("utf-8")
+
+    def _materialize(self, position: int) -> dict[str, Any]:
+        product = self._cache.get(position)
+        if product is not None:
+            self._cache.move_to_end(position)
+            return product
+
+        product = {"id": self.ids[position]}
+        product.update(json.loads(self._blobs[position]))
+        product["price"] = _number(self.prices[position])
+        product["rating"] = self.ratings[position]
+        product["stock_quantity"] = self.stock[position]
+        product["in_stock"] = bool(self.in_stock[position])
+
+        self._cache[position] = product
+        if len(self._cache) > MATERIALIZED_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return product
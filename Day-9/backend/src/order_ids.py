@@ -0,0 +1,33 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+
+class OrderIdGenerator:
+    """Collision-free order IDs for every worker sharing the order log
+
+    IDs look like "ORD-20251128-011316-4821-000017": the order time, the
+    worker (its process ID unless given) and a per-process counter. The
+    counter keeps a burst of orders within one second apart, and the worker
+    part keeps processes apart, so OrderLog lookups by ID never hit two
+    orders. The time part never goes backwards within a worker, even when
+    the system clock is set back.
+    """
+
+    def __init__(self, prefix: str = "ORD", worker_id: Optional[str] = None):
+        self.prefix = prefix
+        self.worker_id = worker_id
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self._last_time = 0.0
+
+    def next_id(self) -> str:
+        with self._lock:
+            self._sequence += 1
+            self._last_time = max(self._last_time, time.time())
+            stamp = datetime.fromtimestamp(self._last_time).strftime("%Y%m%d-%H%M%S")
+            # Read on every call, since job processes can fork after import
+            worker_id = self.worker_id or os.getpid()
+            return f"{self.prefix}-{stamp}-{worker_id}-{self._sequence:06d}"
@@ -0,0 +1,195 @@
+import fcntl
+import json
+import logging
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+logger = logging.getLogger("ecommerce-agent")
+
+# Bytes read per step when scanning backwards for the last order
+TAIL_CHUNK_SIZE = 4096
+
+
+class OrderLog:
+    """Append-only JSON-lines order history with a byte offset index
+
+    Each order is one line in the log. The index file maps order IDs to the
+    byte range of their line, so an order can be read with a single seek.
+    Appends never rewrite history, and the last order is read from the tail
+    of the log without parsing anything before it.
+
+    Index lines from concurrent appenders can land out of order, so the
+    index is only trusted up to the first gap; log lines after that are
+    indexed again from the log itself.
+    """
+
+    def __init__(
+        self, log_file: str, index_file: str, legacy_file: Optional[str] = None
+    ):
+        self.log_file = log_file
+        self.index_file = index_file
+        self.lock_file = f"{log_file}.lock"
+        # Written once the legacy orders are in the log
+        self.migrated_file = f"{log_file}.migrated"
+        # order ID -> (start, end) byte offsets, loaded on first lookup
+        self._offsets: Optional[dict[str, tuple[int, int]]] = None
+        # Log bytes known to be fully indexed
+        self._indexed_until = 0
+
+        if (
+            legacy_file
+            and os.path.exists(legacy_file)
+            and not os.path.exists(self.migrated_file)
+        ):
+            self._migrate(legacy_file)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the order log lock across worker processes"""
+        with open(self.lock_file, "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _migrate(self, legacy_file: str) -> None:
+        """Copy orders from the old JSON array file into the log
+
+        Runs under the lock, so workers starting together migrate once.
+        Orders already in the log (from a migration that failed halfway)
+        are skipped, so running it again never duplicates orders. The old
+        file is left where it is; a marker next to the log records that it
+        has been imported.
+        """
+        try:
+            with self._locked():
+                if os.path.exists(self.migrated_file):
+                    return
+                with open(legacy_file) as f:
+                    orders = json.load(f)
+                offsets = self._load_index()
+                missing = [order for order in orders if order["id"] not in offsets]
+                for order in missing:
+                    self.append(order)
+                with open(self.migrated_file, "w") as f:
+                    json.dump({"legacy_file": legacy_file, "orders": len(orders)}, f)
+            logger.info(
+                f"Migrated {len(missing)} orders from {legacy_file} to {self.log_file}"
+            )
+        except Exception as e:
+            logger.error(f"Error migrating orders: {e}")
+
+    def append(self, order: dict[str, Any]) -> None:
+        """Durably append an order to the log and index it"""
+        data = (json.dumps(order, ensure_ascii=False) + "\n").encode("utf-8")
+
+        # O_APPEND makes each single write land whole at the end of the file,
+        # even when several worker processes share the log
+        fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            os.fsync(fd)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        start = end - len(data)
+
+        # The index can always be rebuilt from the log, so it is not fsync'd
+        with open(self.index_file, "a") as f:
+            f.write(f"{order['id']}\t{start}\t{end}\n")
+
+        if self._offsets is not None:
+            self._offsets[order["id"]] = (start, end)
+
+    def _load_index(self) -> dict[str, tuple[int, int]]:
+        """Read the offset index, then index any log lines it is missing"""
+        if self._offsets is not None:
+            return self._offsets
+
+        self._offsets = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file) as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) != 3:
+                        continue
+                    self._offsets[parts[0]] = (int(parts[1]), int(parts[2]))
+
+        # Catch up from the end of the contiguous indexed prefix of the log
+        self._indexed_until = 0
+        for start, end in sorted(self._offsets.values()):
+            if start > self._indexed_until:
+                break
+            self._indexed_until = max(self._indexed_until, end)
+        self._catch_up()
+        return self._offsets
+
+    def _catch_up(self) -> None:
+        """Index log lines appended after the last indexed offset"""
+        if not os.path.exists(self.log_file):
+            return
+
+        with open(self.log_file, "rb") as f:
+            f.seek(self._indexed_until)
+            position = self._indexed_until
+            for line in f:
+                end = position + len(line)
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    order = json.loads(line)
+                    self._offsets[order["id"]] = (position, end)
+                except (json.JSONDecodeError, KeyError):
+                    logger.warning(
+                        f"Skipping unreadable order line at offset {position}"
+                    )
+                position = end
+            self._indexed_until = position
+
+    def get(self, order_id: str) -> Optional[dict[str, Any]]:
+        """Read a single order by ID"""
+        offsets = self._load_index()
+        if order_id not in offsets:
+            # Another worker process may have appended it since we indexed
+            self._catch_up()
+            if order_id not in offsets:
+                return None
+
+        start, end = offsets[order_id]
+        with open(self.log_file, "rb") as f:
+            f.seek(start)
+            return json.loads(f.read(end - start))
+
+    def last_order(self) -> Optional[dict[str, Any]]:
+        """Read the most recent order from the tail of the log"""
+        if not os.path.exists(self.log_file):
+            return None
+
+        with open(self.log_file, "rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            tail = b""
+            while position > 0:
+                step = min(TAIL_CHUNK_SIZE, position)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+
+                lines = tail.split(b"\n")
+                # The first piece may be a partial line unless we hit the start
+                complete = lines if position == 0 else lines[1:]
+                for line in reversed(complete):
+                    if not line.strip():
+                        continue
+                    try:
+                        return json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write from a crash, look further back
+                tail = lines[0]
+        return None
+
+    def count(self) -> int:
+        """Number of orders in the log"""
+        return len(self._load_index())
@@ -0,0 +1,365 @@
+import heapq
+import re
+import sys
+from array import array
+from collections.abc import Iterable, MutableSequence
+from typing import Any, Optional
+
+# Relevance weights used when the query appears inside a product field
+FIELD_WEIGHTS = [
+    ("name", 10),
+    ("brand", 8),
+    ("category", 6),
+    ("subcategory", 5),
+    ("tags", 4),
+    ("description", 3),
+    ("color", 2),
+    ("material", 1),
+]
+
+DESCRIPTION_WEIGHT = dict(FIELD_WEIGHTS)["description"]
+
+# Tags are joined with a separator that never appears in a spoken query
+TAG_SEPARATOR = "\x1f"
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Exact-match attribute filters that get their own set index
+FILTER_FIELDS = ["category", "color", "brand"]
+
+# Short fields whose lowercased values repeat across the catalog
+INTERNED_FIELDS = {"brand", "category", "subcategory", "color", "material"}
+
+# Long fields indexed by word only, without keeping a lowercased copy
+POSTINGS_ONLY_FIELDS = {"description"}
+
+# Upper bound on cached query token expansions before the cache is reset
+MAX_EXPANSION_CACHE = 4096
+
+
+def tokenize(text: str) -> list[str]:
+    """Split lowercased text into word tokens"""
+    return TOKEN_PATTERN.findall(text)
+
+
+class ProductSearchIndex:
+    """In-memory search index over the product catalog
+
+    Field values are lowercased once when a product is added, and every word
+    token points to the catalog positions containing it. A query is first
+    narrowed to candidate positions through the token postings and only those
+    candidates are scored, using the same substring rules and weights as a
+    full catalog scan.
+
+    Postings are arrays of ascending positions. Descriptions only get
+    postings of their own: a one-word query is matched from them, and a
+    longer query is checked against the stored description of the products
+    that have all of its words.
+
+    Products are appended to `store`, a plain list unless a more compact
+    list-like store such as ColumnarCatalog is passed in. Scoring and
+    filtering read the index's own columns, so the store is only read for
+    the products a search returns and for those description checks.
+    """
+
+    def __init__(
+        self,
+        products: Iterable[dict[str, Any]],
+        store: Optional[MutableSequence[dict[str, Any]]] = None,
+    ):
+        self.products: MutableSequence[dict[str, Any]] = (
+            store if store is not None else []
+        )
+        self.fields: dict[str, list[str]] = {
+            field: [] for field, _ in FIELD_WEIGHTS if field not in POSTINGS_ONLY_FIELDS
+        }
+        self.ratings = array("d")
+        self.prices = array("d")
+        self.postings: dict[str, array] = {}
+        self.description_postings: dict[str, array] = {}
+        self.positions: dict[str, int] = {}
+        self.in_stock: set[int] = set()
+        self.attributes: dict[str, dict[str, set[int]]] = {
+            field: {} for field in FILTER_FIELDS
+        }
+        # Live number of in-stock products per category
+        self.category_counts: dict[str, int] = {}
+        # Positions ordered by rating per category, None holding the whole catalog
+        self.by_rating: dict[Optional[str], list[tuple[float, int]]] = {}
+        self._unsorted: set[Optional[str]] = set()
+        self._expansions: dict[str, set[int]] = {}
+        self._description_expansions: dict[str, set[int]] = {}
+
+        for product in products:
+            self.add_product(product)
+
+    def add_product(self, product: dict[str, Any], source: Optional[str] = None) -> int:
+        """Index a new product and return its catalog position
+
+        `source`, the JSON text the product was decoded from, is handed to
+        stores that keep it (see ColumnarCatalog).
+        """
+        position = len(self.products)
+        if source is None:
+            self.products.append(product)
+        else:
+            self.products.append(product, source)
+        self.positions[product["id"]] = position
+        self.ratings.append(product.get("rating", 0))
+        self.prices.append(product.get("price", 0))
+
+        for field, _ in FIELD_WEIGHTS:
+            if field == "tags":
+                value = TAG_SEPARATOR.join(
+                    str(tag).lower() for tag in product.get("tags", [])
+                )
+            else:
+                value = str(product.get(field, "")).lower()
+            if field in POSTINGS_ONLY_FIELDS:
+                for token in tokenize(value):
+                    _post(self.description_postings, token, position)
+                continue
+            if field in INTERNED_FIELDS:
+                value = sys.intern(value)
+            self.fields[field].append(value)
+            for token in tokenize(value):
+                _post(self.postings, token, position)
+            if field in self.attributes:
+                self.attributes[field].setdefault(value, set()).add(position)
+
+        # Rating tables are sorted lazily so a bulk load sorts once
+        for key in (None, self.fields["category"][position]):
+            self.by_rating.setdefault(key, []).append(
+                (-self.ratings[position], position)
+            )
+            self._unsorted.add(key)
+
+        # New vocabulary can change any cached expansion
+        self._expansions.clear()
+        self._description_expansions.clear()
+        self._set_stock_status(position, product)
+        return position
+
+    def get_product(self, product_id: str) -> Optional[dict[str, Any]]:
+        """Look up a product by ID"""
+        position = self.positions.get(product_id)
+        return self.products[position] if position is not None else None
+
+    def replace_product(self, product: dict[str, Any]) -> None:
+        """Swap in a new version of an indexed product whose text is unchanged"""
+        position = self.positions[product["id"]]
+        self.products[position] = product
+
+        rating = product.get("rating", 0)
+        if rating != self.ratings[position]:
+            for key in (None, self.fields["category"][position]):
+                self.by_rating[key].remove((-self.ratings[position], position))
+                self.by_rating[key].append((-rating, position))
+                self._unsorted.add(key)
+            self.ratings[position] = rating
+        self.prices[position] = product.get("price", 0)
+
+        self._set_stock_status(position, product)
+
+    def _set_stock_status(self, position: int, product: dict[str, Any]) -> None:
+        """Move a position in or out of the in-stock set and category counts"""
+        was_in_stock = position in self.in_stock
+        now_in_stock = bool(product.get("in_stock", True))
+        if was_in_stock == now_in_stock:
+            return
+
+        category = self.fields["category"][position]
+        if now_in_stock:
+            self.in_stock.add(position)
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        else:
+            self.in_stock.discard(position)
+            self.category_counts[category] -= 1
+            if not self.category_counts[category]:
+                del self.category_counts[category]
+
+    def top_rated(
+        self, category: Optional[str] = None, limit: int = 4
+    ) -> list[dict[str, Any]]:
+        """Highest rated in-stock products of a category, or of the whole catalog"""
+        key = category.lower() if category is not None else None
+        ranked = self.by_rating.get(key, [])
+        if key in self._unsorted:
+            ranked.sort()
+            self._unsorted.discard(key)
+
+        # Only sold-out products are skipped, so this stops after a few steps
+        results = []
+        for _, position in ranked:
+            if position in self.in_stock:
+                results.append(self.products[position])
+                if len(results) == limit:
+                    break
+        return results
+
+    def _expand_token(self, token: str) -> set[int]:
+        """Positions of products having a word that contains the token"""
+        cached = self._expansions.get(token)
+        if cached is not None:
+            return cached
+        matches = _expand(self.postings, token) | self._expand_description(token)
+        return _remember(self._expansions, token, matches)
+
+    def _expand_description(self, token: str) -> set[int]:
+        """Positions of products whose description has a word containing the token"""
+        cached = self._description_expansions.get(token)
+        if cached is not None:
+            return cached
+        return _remember(
+            self._description_expansions,
+            token,
+            _expand(self.description_postings, token),
+        )
+
+    def _described(self, query: str, candidates: set[int]) -> set[int]:
+        """Candidates whose description has every word of the query"""
+        for token in set(tokenize(query)):
+            candidates = candidates & self._expand_description(token)
+        return candidates
+
+    def _description_contains(self, position: int, query: str) -> bool:
+        """Check a lowercased query against the stored description"""
+        return query in str(self.products[position].get("description", "")).lower()
+
+    def _filtered(self, filters: dict[str, str]) -> set[int]:
+        """In-stock positions whose attributes equal every given filter value"""
+        sets = [self.in_stock]
+        for field, value in filters.items():
+            if value:
+                sets.append(self.attributes[field].get(value, set()))
+
+        if len(sets) == 1:
+            return self.in_stock
+
+        # Intersect starting from the smallest set
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def _candidates(self, query: str, filters: dict[str, str]) -> set[int]:
+        """Filtered positions that can possibly contain the query"""
+        candidates = self._filtered(filters)
+        tokens = tokenize(query)
+        # Longer tokens match fewer words, so intersecting them first stays small
+        for token in sorted(set(tokens), key=len, reverse=True):
+            candidates = candidates & self._expand_token(token)
+            if not candidates:
+                break
+        return candidates
+
+    def score(self, position: int, query: str, in_description: bool = False) -> float:
+        """Relevance of the product at a position for a lowercased query
+
+        Whether the description contains the query is worked out by the
+        caller, as descriptions are only indexed by word.
+        """
+        score = self._field_score(position, query)
+        if in_description or not query:
+            score += DESCRIPTION_WEIGHT
+
+        # If we have a query but no matches, the product is not a result
+        if query and score == 0:
+            return 0
+
+        return score + self.ratings[position] * 0.5
+
+    def _field_score(self, position: int, query: str) -> int:
+        """Summed weights of the fields kept in full that contain the query"""
+        score = 0
+        for field, weight in FIELD_WEIGHTS:
+            if (
+                field not in POSTINGS_ONLY_FIELDS
+                and query in self.fields[field][position]
+            ):
+                score += weight
+        return score
+
+    def search(
+        self,
+        query: str = "",
+        category: str = "",
+        max_price: float = 0,
+        color: str = "",
+        brand: str = "",
+        limit: int = 0,
+    ) -> tuple[list[dict[str, Any]], int]:
+        """Return the best matching products and the total number of matches"""
+        query = query.lower().strip()
+        filters = {
+            "category": category.lower() if category and category.strip() else "",
+            "color": color.lower() if color and color.strip() else "",
+            "brand": brand.lower() if brand and brand.strip() else "",
+        }
+
+        candidates = self._candidates(query, filters)
+        if max_price and max_price > 0:
+            candidates = {
+                position
+                for position in candidates
+                if self.prices[position] <= max_price
+            }
+        described = self._described(query, candidates) if query else set()
+        # A one-word query is in the description exactly when its postings say so
+        one_word = tokenize(query) == [query]
+
+        results = []
+        # Products counted as matching the description before it was checked
+        unchecked: set[int] = set()
+        for position in candidates:
+            in_description = position in described
+            if in_description and not one_word:
+                if self._field_score(position, query):
+                    # Already a match, so the text is only checked if it ranks
+                    unchecked.add(position)
+                else:
+                    in_description = self._description_contains(position, query)
+            score = self.score(position, query, in_description)
+            if score > 0 or not query:  # Include all if no query but filters applied
+                results.append((-score, -self.ratings[position], position))
+
+        # Rank by relevance score, then rating, then catalog order
+        heapq.heapify(results)
+        ranked = []
+        while results and not (limit and limit > 0 and len(ranked) == limit):
+            entry = heapq.heappop(results)
+            position = entry[2]
+            if position in unchecked:
+                unchecked.discard(position)
+                if not self._description_contains(position, query):
+                    heapq.heappush(
+                        results, (-self.score(position, query), entry[1], position)
+                    )
+                    continue
+            ranked.append(entry)
+        return [self.products[position] for _, _, position in ranked], len(
+            ranked
+        ) + len(results)
+
+
+def _post(postings: dict[str, array], token: str, position: int) -> None:
+    """Add a position to a token's postings once, keeping them ascending"""
+    positions = postings.get(token)
+    if positions is None:
+        postings[token] = array("I", (position,))
+    elif positions[-1] != position:
+        positions.append(position)
+
+
+def _expand(postings: dict[str, array], token: str) -> set[int]:
+    """Positions under every word in the postings that contains the token"""
+    matches: set[int] = set()
+    for word, positions in postings.items():
+        if token in word:
+            matches.update(positions)
+    return matches
+
+
+def _remember(cache: dict[str, set[int]], token: str, matches: set[int]) -> set[int]:
+    if len(cache) >= MAX_EXPANSION_CACHE:
+        cache.clear()
+    cache[token] = matches
+    return matches
@@ -0,0 +1,216 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+logger = logging.getLogger("ecommerce-agent")
+
+# Number of journal entries after which the catalog snapshot is rewritten
+COMPACT_AFTER_ENTRIES = 500
+
+# Seconds between a worker's background checks for new entries and compaction
+COMPACT_CHECK_INTERVAL = 5.0
+
+
+class StockJournal:
+    """Append-only journal of stock changes on top of the catalog snapshot
+
+    Every change is one JSON line holding the product ID, the delta and the
+    resulting stock quantity. Replay sets the recorded quantity rather than
+    re-applying the delta, so replaying entries that already made it into
+    the snapshot is harmless.
+
+    Several worker processes can share one journal. Writers hold `locked()`,
+    read what the others appended with `read_new()` and only then check and
+    append their own changes. Compaction swaps in a fresh journal file that
+    starts with a new generation header, which other processes notice
+    through `was_replaced()`. The replaced journal is kept next to it, so a
+    process that had not read all of it yet finishes it with
+    `read_replaced()` instead of reloading the whole snapshot.
+    """
+
+    def __init__(
+        self,
+        journal_file: str,
+        lock_file: Optional[str] = None,
+        compact_after: int = COMPACT_AFTER_ENTRIES,
+    ):
+        self.journal_file = journal_file
+        self.lock_file = lock_file or f"{journal_file}.lock"
+        self.previous_file = f"{journal_file}.prev"
+        self.compact_after = compact_after
+        self.entries = 0
+        # Bytes of the journal already applied, and which journal they came from
+        self.offset = 0
+        self._generation = self._current_generation()
+        self._thread_lock = threading.Lock()
+
+    def _current_generation(self) -> Optional[str]:
+        """Generation written at the top of the journal by the last compaction"""
+        return self._header(self.journal_file).get("generation")
+
+    @staticmethod
+    def _header(path: str) -> dict[str, Any]:
+        """Generation header of a journal file, empty if it has none"""
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.readline())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return header if "generation" in header else {}
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the stock lock across threads and worker processes"""
+        with self._thread_lock, open(self.lock_file, "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    @contextmanager
+    def compaction_claim(self) -> Iterator[bool]:
+        """Let one process compact at a time; yields False if another already is"""
+        with open(f"{self.journal_file}.compact.lock", "a") as lock:
+            try:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def was_replaced(self) -> bool:
+        """Whether another process compacted the journal since we last read it"""
+        return self._current_generation() != self._generation
+
+    def restart(self) -> None:
+        """Start reading the current journal file from the beginning"""
+        self._generation = self._current_generation()
+        self.offset = 0
+        self.entries = 0
+
+    def read_new(self) -> list[tuple[str, int]]:
+        """Product IDs and stock levels appended since the last read"""
+        return self._read_from(self.journal_file)
+
+    def read_replaced(self) -> Optional[list[tuple[str, int]]]:
+        """Finish the journal that compaction replaced, then move to the new one
+
+        Returns None when that journal is gone as well, after more than one
+        compaction since our last read; the snapshot then has to be reloaded.
+        """
+        replaced = (
+            self._header(self.journal_file).get("previous", "") == self._generation
+            and os.path.exists(self.previous_file)
+            and self._header(self.previous_file).get("generation") == self._generation
+        )
+        changes = self._read_from(self.previous_file) if replaced else None
+        self.restart()
+        return changes
+
+    def _read_from(self, path: str) -> list[tuple[str, int]]:
+        if not os.path.exists(path):
+            return []
+
+        changes = []
+        with open(path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written by another process
+                    break
+                self.offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append can leave a torn line behind
+                    logger.warning(f"Skipping incomplete entry in {path}")
+                    continue
+                if "generation" in entry:
+                    continue
+                changes.append((entry["id"], entry["stock_quantity"]))
+                self.entries += 1
+        return changes
+
+    def append(self, changes: list[tuple[str, int, int]]) -> None:
+        """Durably record (product ID, delta, stock quantity) changes in one write"""
+        data = "".join(
+            json.dumps(
+                {"id": product_id, "delta": delta, "stock_quantity": stock_quantity}
+            )
+            + "\n"
+            for product_id, delta, stock_quantity in changes
+        ).encode("utf-8")
+
+        fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size > self.offset:
+                # A crashed writer left a torn line; end it so ours stays readable
+                data = b"\n" + data
+            os.write(fd, data)
+            os.fsync(fd)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+
+        # Callers hold the lock and have read everything before this write
+        self.offset = end
+        self.entries += len(changes)
+
+    def needs_compaction(self) -> bool:
+        """Whether the journal has grown enough to fold into the snapshot"""
+        return self.entries >= self.compact_after
+
+    def rotate(self, snapshot_offset: int) -> None:
+        """Swap in a new journal once the snapshot holds everything before `snapshot_offset`
+
+        Entries appended after that offset, while the snapshot was being
+        written, are carried over. Callers hold the lock and have read the
+        whole journal.
+        """
+        tail = b""
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, "rb") as f:
+                f.seek(snapshot_offset)
+                tail = f.read(self.offset - snapshot_offset)
+
+        generation = uuid.uuid4().hex
+        header = (
+            json.dumps({"generation": generation, "previous": self._generation}) + "\n"
+        ).encode("utf-8")
+        tmp_path = f"{self.journal_file}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header + tail)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Keep the old journal for processes that have not finished reading it
+        if os.path.exists(self.journal_file):
+            previous_tmp = f"{self.previous_file}.tmp"
+            if os.path.exists(previous_tmp):
+                os.remove(previous_tmp)
+            os.link(self.journal_file, previous_tmp)
+            os.replace(previous_tmp, self.previous_file)
+        os.replace(tmp_path, self.journal_file)
+
+        self._generation = generation
+        self.offset = len(header) + len(tail)
+        self.entries = sum(1 for line in tail.splitlines() if line.strip())
+
+
+def apply_stock_quantity(product: dict[str, Any], stock_quantity: int) -> None:
+    """Set a product's stock level and mark it sold out at zero"""
+    product["stock_quantity"] = stock_quantity
+    if stock_quantity == 0:
+        product["in_stock"] = False
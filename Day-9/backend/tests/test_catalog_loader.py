@@ -0,0 +1,71 @@
+import json
+
+from catalog_loader import ColumnarCatalog, iter_json_array, write_json_array_atomic
+
+
+def _products(count: int) -> list:
+    return [
+        {
+            "id": f"mug-{i:03d}",
+            "name": f"Mug {i}",
+            "description": 'Handcrafted ceramic mug, {"quoted"} and ₹ safe.',
+            "price": 800 + i,
+            "category": "mugs",
+            "tags": ["coffee", "tea"],
+            "in_stock": True,
+            "stock_quantity": 10,
+            "rating": 4.5,
+        }
+        for i in range(count)
+    ]
+
+
+def test_iter_json_array_streams_across_chunk_boundaries(tmp_path) -> None:
+    path = tmp_path / "products.json"
+    products = _products(25)
+    path.write_text(
+        json.dumps(products, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+
+    for chunk_size in (5, 64, 1 << 16):
+        assert list(iter_json_array(str(path), chunk_size)) == products
+
+    path.write_text("[]")
+    assert list(iter_json_array(str(path))) == []
+
+
+def test_columnar_catalog_round_trips_products(tmp_path) -> None:
+    products = _products(3)
+    catalog = ColumnarCatalog(products)
+
+    assert len(catalog) == 3
+    assert catalog[1] == products[1]
+    assert isinstance(catalog[1]["price"], int)
+    assert catalog[-1]["id"] == "mug-002"
+
+    catalog[0] = dict(products[0], stock_quantity=0, in_stock=False)
+    assert catalog[0]["in_stock"] is False
+    assert products[0]["in_stock"] is True
+
+    path = str(tmp_path / "products.json")
+    assert write_json_array_atomic(path, catalog) == 3
+    assert list(iter_json_array(path)) == list(catalog)
+
+
+def test_columnar_catalog_keeps_streamed_json_text(tmp_path) -> None:
+    path = tmp_path / "products.json"
+    products = _products(4)
+    path.write_text(
+        json.dumps(products, indent=2, ensure_ascii=False), encoding="utf-8"
+    )
+
+    catalog = ColumnarCatalog()
+    for product, source in iter_json_array(str(path), chunk_size=64, with_source=True):
+        assert json.loads(source) == product
+        if product["id"] == "mug-002":
+            product["stock_quantity"] = 0
+        catalog.append(product, source)
+
+    assert catalog[1] == products[1]
+    # Columns win over the stale stock in the kept text
+    assert catalog[2]["stock_quantity"] == 0
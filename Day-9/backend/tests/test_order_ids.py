@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from order_ids import OrderIdGenerator
+
+
+def test_orders_in_the_same_second_get_distinct_ids() -> None:
+    generator = OrderIdGenerator(worker_id="7")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        ids = list(executor.map(lambda _: generator.next_id(), range(1000)))
+
+    assert len(set(ids)) == 1000
+    assert all(order_id.startswith("ORD-") and "-7-" in order_id for order_id in ids)
+
+
+def test_workers_have_separate_ids() -> None:
+    first, second = OrderIdGenerator(worker_id="101"), OrderIdGenerator(worker_id="102")
+
+    assert not {first.next_id() for _ in range(50)} & {
+        second.next_id() for _ in range(50)
+    }
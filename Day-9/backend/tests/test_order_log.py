@@ -0,0 +1,102 @@
+import json
+
+from order_log import OrderLog
+
+
+def _order(order_id: str, total: int = 800) -> dict:
+    return {
+        "id": order_id,
+        "items": [],
+        "total": total,
+        "currency": "INR",
+        "created_at": "2025-11-30T10:19:35",
+        "status": "confirmed",
+    }
+
+
+def test_append_then_read_by_id_and_last(tmp_path) -> None:
+    log = OrderLog(str(tmp_path / "orders.jsonl"), str(tmp_path / "orders.idx"))
+    assert log.last_order() is None
+
+    for i in range(50):
+        log.append(_order(f"ORD-{i}", total=i))
+
+    assert log.count() == 50
+    assert log.get("ORD-17")["total"] == 17
+    assert log.get("ORD-missing") is None
+    assert log.last_order()["id"] == "ORD-49"
+
+
+def test_index_catches_up_with_other_writers(tmp_path) -> None:
+    log_file, index_file = str(tmp_path / "orders.jsonl"), str(tmp_path / "orders.idx")
+    reader = OrderLog(log_file, index_file)
+    writer = OrderLog(log_file, index_file)
+    writer.append(_order("ORD-1"))
+    assert reader.count() == 1
+
+    writer.append(_order("ORD-2"))
+    (tmp_path / "orders.idx").unlink()
+
+    assert reader.get("ORD-2")["id"] == "ORD-2"
+    assert OrderLog(log_file, index_file).get("ORD-1")["id"] == "ORD-1"
+
+
+def test_last_order_skips_torn_append(tmp_path) -> None:
+    log = OrderLog(str(tmp_path / "orders.jsonl"), str(tmp_path / "orders.idx"))
+    log.append(_order("ORD-1"))
+    with open(log.log_file, "a") as f:
+        f.write('{"id": "ORD-2", "ite')
+
+    assert log.last_order()["id"] == "ORD-1"
+
+
+def test_migrates_legacy_orders_json(tmp_path) -> None:
+    legacy = tmp_path / "orders.json"
+    legacy.write_text(json.dumps([_order("ORD-1"), _order("ORD-2")]))
+
+    log = OrderLog(
+        str(tmp_path / "orders.jsonl"),
+        str(tmp_path / "orders.idx"),
+        legacy_file=str(legacy),
+    )
+
+    assert log.count() == 2
+    assert log.last_order()["id"] == "ORD-2"
+    # The old file stays put and is not imported a second time
+    assert legacy.exists()
+    legacy.write_text(json.dumps([_order("ORD-3")]))
+    assert (
+        OrderLog(
+            str(tmp_path / "orders.jsonl"),
+            str(tmp_path / "orders.idx"),
+            legacy_file=str(legacy),
+        ).count()
+        == 2
+    )
+
+
+def test_catch_up_does_not_skip_orders_indexed_out_of_order(tmp_path) -> None:
+    log_file, index_file = str(tmp_path / "orders.jsonl"), str(tmp_path / "orders.idx")
+    log = OrderLog(log_file, index_file)
+    for i in range(3):
+        log.append(_order(f"ORD-{i}"))
+
+    # A second appender wrote ORD-1's line but has not indexed it yet
+    lines = (tmp_path / "orders.idx").read_text().splitlines()
+    (tmp_path / "orders.idx").write_text(f"{lines[0]}\n{lines[2]}\n")
+
+    assert OrderLog(log_file, index_file).get("ORD-1")["id"] == "ORD-1"
+
+
+def test_migration_resumes_without_duplicates(tmp_path) -> None:
+    legacy = tmp_path / "orders.json"
+    legacy.write_text(json.dumps([_order("ORD-1"), _order("ORD-2")]))
+    log_file, index_file = str(tmp_path / "orders.jsonl"), str(tmp_path / "orders.idx")
+    # An earlier migration appended ORD-1, then died before finishing
+    OrderLog(log_file, index_file).append(_order("ORD-1"))
+
+    log = OrderLog(log_file, index_file, legacy_file=str(legacy))
+    assert OrderLog(log_file, index_file, legacy_file=str(legacy)).count() == 2
+    with open(log_file) as f:
+        assert [json.loads(line)["id"] for line in f] == ["ORD-1", "ORD-2"]
+    assert log.last_order()["id"] == "ORD-2"
@@ -0,0 +1,145 @@
+from product_index import ProductSearchIndex
+
+
+def _product(product_id: str, **fields) -> dict:
+    product = {
+        "id": product_id,
+        "name": "",
+        "description": "",
+        "price": 500,
+        "category": "mugs",
+        "subcategory": "drinkware",
+        "color": "white",
+        "material": "ceramic",
+        "brand": "Artisan Pottery",
+        "tags": [],
+        "in_stock": True,
+        "stock_quantity": 10,
+        "rating": 4.0,
+    }
+    product.update(fields)
+    return product
+
+
+def test_search_ranks_by_field_weight_then_rating() -> None:
+    index = ProductSearchIndex(
+        [
+            _product("a", name="Plain Mug", description="goes with tea", rating=4.9),
+            _product("b", name="Tea Mug", rating=4.1),
+            _product("c", name="Tea Cup", rating=4.5),
+        ]
+    )
+
+    products, total = index.search("tea")
+
+    assert [p["id"] for p in products] == ["c", "b", "a"]
+    assert total == 3
+
+
+def test_search_matches_substrings_inside_words() -> None:
+    index = ProductSearchIndex(
+        [
+            _product("shirt", name="Classic Cotton T-Shirt", category="clothing"),
+            _product("mug", name="Stoneware Coffee Mug"),
+        ]
+    )
+
+    assert [p["id"] for p in index.search("t-shir")[0]] == ["shirt"]
+    assert [p["id"] for p in index.search("offee m")[0]] == ["mug"]
+    assert index.search("zzz") == ([], 0)
+
+
+def test_description_matches_need_the_whole_phrase() -> None:
+    index = ProductSearchIndex(
+        [
+            _product(
+                "a", name="Blue Mug", description="a mug in deep blue", rating=4.9
+            ),
+            _product("b", name="Blue Mug", description="our blue mug", rating=4.1),
+            _product("c", name="Teapot", description="pairs with a blue mug"),
+            _product("d", name="Teapot", description="blue glaze, tall mug"),
+        ]
+    )
+
+    products, total = index.search("blue mug", limit=2)
+
+    assert [p["id"] for p in products] == ["b", "a"]
+    assert total == 3
+    assert [p["id"] for p in index.search("glaze")[0]] == ["d"]
+
+
+def test_search_limit_keeps_total() -> None:
+    index = ProductSearchIndex(
+        [_product(f"mug-{i}", name="Mug", rating=3 + i / 10) for i in range(10)]
+    )
+
+    products, total = index.search("mug", limit=2)
+
+    assert [p["id"] for p in products] == ["mug-9", "mug-8"]
+    assert total == 10
+
+
+def test_filters_intersect_attribute_indexes() -> None:
+    index = ProductSearchIndex(
+        [
+            _product("mug-001", color="white", brand="Artisan Pottery"),
+            _product("mug-002", color="blue", brand="Desi Designs"),
+            _product("tshirt-001", category="clothing", color="black"),
+            _product("mug-003", color="Blue", brand="Desi Designs", in_stock=False),
+        ]
+    )
+
+    assert [p["id"] for p in index.search(category="Mugs", color="blue")[0]] == [
+        "mug-002"
+    ]
+    assert index.search(category="mugs", brand="desi designs")[1] == 1
+    assert index.search(category="bags") == ([], 0)
+    assert index.get_product("mug-003")["color"] == "Blue"
+    assert index.get_product("missing") is None
+
+
+def test_replace_product_keeps_old_version_intact() -> None:
+    original = _product("hoodie-001", name="Black Hoodie", stock_quantity=1)
+    index = ProductSearchIndex([original])
+
+    index.replace_product(dict(original, stock_quantity=0, in_stock=False))
+
+    assert original["in_stock"] is True
+    assert index.get_product("hoodie-001")["stock_quantity"] == 0
+    assert index.search("hoodie") == ([], 0)
+
+
+def test_category_counts_follow_stock_changes() -> None:
+    mug = _product("mug-001")
+    index = ProductSearchIndex(
+        [mug, _product("mug-002"), _product("tshirt-001", category="clothing")]
+    )
+    assert index.category_counts == {"mugs": 2, "clothing": 1}
+
+    index.replace_product(dict(mug, in_stock=False))
+    index.replace_product(dict(mug, in_stock=False))
+    assert index.category_counts == {"mugs": 1, "clothing": 1}
+
+    index.replace_product(dict(index.get_product("tshirt-001"), in_stock=False))
+    assert index.category_counts == {"mugs": 1}
+
+
+def test_top_rated_skips_sold_out_products() -> None:
+    best = _product("mug-001", rating=4.9)
+    index = ProductSearchIndex(
+        [
+            _product("mug-002", rating=4.2),
+            best,
+            _product("mug-003", rating=4.7),
+            _product("tshirt-001", category="clothing", rating=5.0),
+        ]
+    )
+
+    assert [p["id"] for p in index.top_rated("mugs", 2)] == ["mug-001", "mug-003"]
+    assert [p["id"] for p in index.top_rated(limit=2)] == ["tshirt-001", "mug-001"]
+
+    index.replace_product(dict(best, in_stock=False))
+    assert [p["id"] for p in index.top_rated("Mugs", 2)] == ["mug-003", "mug-002"]
+
+    index.replace_product(dict(index.get_product("mug-002"), rating=5.0))
+    assert [p["id"] for p in index.top_rated("mugs", 1)] == ["mug-002"]
@@ -0,0 +1,136 @@
+import asyncio
+import fcntl
+import os
+import time
+
+import pytest
+
+from agent import EcommerceAgent, ProductManager
+from order_log import OrderLog
+
+
+@pytest.fixture
+def product_manager(tmp_path, monkeypatch) -> ProductManager:
+    # ProductManager keeps its catalog and journal under the working directory
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("ecommerce_products")
+    return ProductManager()
+
+
+def _stock(product_manager: ProductManager, product_id: str) -> int:
+    return product_manager.get_product_by_id(product_id)["stock_quantity"]
+
+
+def test_reserve_stock_is_all_or_nothing(product_manager) -> None:
+    hoodies, mugs = (
+        _stock(product_manager, "hoodie-001"),
+        _stock(product_manager, "mug-001"),
+    )
+
+    problems = product_manager.reserve_stock({"mug-001": 2, "hoodie-001": hoodies + 1})
+    assert len(problems) == 1 and "Classic Black Hoodie" in problems[0]
+    assert _stock(product_manager, "mug-001") == mugs
+
+    assert product_manager.reserve_stock({"mug-001": 2, "hoodie-001": hoodies}) == []
+    assert _stock(product_manager, "mug-001") == mugs - 2
+    assert _stock(product_manager, "hoodie-001") == 0
+    # Other workers see the change through the journal
+    assert _stock(ProductManager(), "mug-001") == mugs - 2
+
+
+def test_reserve_stock_rejects_non_positive_quantities(product_manager) -> None:
+    hoodies = _stock(product_manager, "hoodie-001")
+
+    assert product_manager.reserve_stock({"hoodie-001": -100})
+    assert product_manager.reserve_stock({"mug-001": 1, "hoodie-001": 0})
+    assert _stock(product_manager, "hoodie-001") == hoodies
+    assert _stock(ProductManager(), "hoodie-001") == hoodies
+
+
+def test_compaction_runs_off_the_order_path(product_manager, monkeypatch) -> None:
+    product_manager.journal.compact_after = 1
+    other_worker = ProductManager()
+    mugs = _stock(product_manager, "mug-001")
+    with open("ecommerce_products/products.json") as f:
+        snapshot = f.read()
+
+    assert product_manager.reserve_stock({"mug-001": 1}) == []
+    with open("ecommerce_products/products.json") as f:
+        assert f.read() == snapshot
+
+    assert product_manager.compact()
+    assert product_manager.reserve_stock({"mug-001": 1}) == []
+    assert ProductManager().get_product_by_id("mug-001")["stock_quantity"] == mugs - 2
+
+    # Other workers catch up from the journals rather than the new snapshot
+    def reread(*args, **kwargs):
+        raise AssertionError("products.json re-read")
+
+    monkeypatch.setattr("agent.iter_json_array", reread)
+    assert other_worker.reserve_stock({"mug-001": 1}) == []
+    assert _stock(other_worker, "mug-001") == mugs - 3
+
+
+async def test_checkout_places_one_order_for_the_cart(
+    product_manager, tmp_path
+) -> None:
+    order_log = OrderLog(str(tmp_path / "orders.jsonl"), str(tmp_path / "orders.idx"))
+    agent = EcommerceAgent(product_manager=product_manager, order_log=order_log)
+    mugs = _stock(product_manager, "mug-001")
+
+    assert "at least one" in await agent.add_to_cart(None, "mug-001", -3)
+    assert agent.session_state["cart"] == {}
+    await agent.add_to_cart(None, "mug-001", 2)
+    await agent.add_to_cart(None, "notebook-001", 1)
+
+    assert "Order confirmed" in await agent.checkout(None)
+    order = order_log.last_order()
+    assert [(item["product_id"], item["quantity"]) for item in order["items"]] == [
+        ("mug-001", 2),
+        ("notebook-001", 1),
+    ]
+    assert order["total"] == sum(
+        item["unit_price"] * item["quantity"] for item in order["items"]
+    )
+    assert _stock(product_manager, "mug-001") == mugs - 2
+    assert agent.session_state["cart"] == {}
+
+
+async def test_checkout_keeps_the_cart_when_stock_runs_out(
+    product_manager, tmp_path
+) -> None:
+    order_log = OrderLog(str(tmp_path / "orders.jsonl"), str(tmp_path / "orders.idx"))
+    agent = EcommerceAgent(product_manager=product_manager, order_log=order_log)
+    await agent.add_to_cart(None, "mug-001", 1)
+    await agent.add_to_cart(None, "hoodie-001", 2)
+    # Another customer buys the hoodies first
+    product_manager.reserve_stock(
+        {"hoodie-001": _stock(product_manager, "hoodie-001") - 1}
+    )
+    mugs = _stock(product_manager, "mug-001")
+
+    assert "couldn't place your order" in await agent.checkout(None)
+    assert agent.session_state["cart"] == {"mug-001": 1, "hoodie-001": 2}
+    assert _stock(product_manager, "mug-001") == mugs
+    assert order_log.last_order() is None
+
+
+async def test_checkout_waits_for_stock_off_the_event_loop(
+    product_manager, tmp_path
+) -> None:
+    order_log = OrderLog(str(tmp_path / "orders.jsonl"), str(tmp_path / "orders.idx"))
+    agent = EcommerceAgent(product_manager=product_manager, order_log=order_log)
+    await agent.add_to_cart(None, "mug-001", 1)
+
+    # Another worker process holds the stock lock
+    with open(product_manager.journal.lock_file, "a") as lock:
+        fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        checking_out = asyncio.create_task(agent.checkout(None))
+
+        started = time.perf_counter()
+        await asyncio.sleep(0.2)
+        assert time.perf_counter() - started < 0.5
+        assert not checking_out.done()
+        fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    assert "Order confirmed" in await checking_out
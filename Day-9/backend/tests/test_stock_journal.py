@@ -0,0 +1,62 @@
+from stock_journal import StockJournal
+
+
+def test_replay_restores_latest_stock_levels(tmp_path) -> None:
+    journal_file = str(tmp_path / "stock_journal.jsonl")
+    journal = StockJournal(journal_file)
+    journal.append([("mug-001", -2, 43), ("hoodie-001", -15, 0)])
+    journal.append([("mug-001", -1, 42)])
+
+    # Simulate a crash that tore the last append
+    with open(journal_file, "a") as f:
+        f.write('{"id": "mug-001", "del')
+
+    replayed = StockJournal(journal_file)
+
+    assert replayed.read_new() == [("mug-001", 43), ("hoodie-001", 0), ("mug-001", 42)]
+
+    # The next writer terminates the torn line instead of merging into it
+    with replayed.locked():
+        replayed.append([("mug-001", -1, 41)])
+    assert StockJournal(journal_file).read_new()[-1] == ("mug-001", 41)
+
+
+def test_readers_see_other_writers_and_compaction(tmp_path) -> None:
+    journal_file = str(tmp_path / "stock_journal.jsonl")
+    reader = StockJournal(journal_file)
+    writer = StockJournal(journal_file, compact_after=2)
+
+    writer.append([("mug-001", -1, 44)])
+    assert reader.read_new() == [("mug-001", 44)]
+    assert not writer.needs_compaction()
+
+    writer.append([("mug-001", -1, 43)])
+    assert writer.needs_compaction()
+    writer.rotate(writer.offset)
+
+    assert writer.entries == 0
+    assert reader.was_replaced()
+    # The reader finishes the replaced journal instead of reloading the snapshot
+    assert reader.read_replaced() == [("mug-001", 43)]
+    assert not reader.was_replaced()
+    assert reader.read_new() == []
+
+
+def test_rotation_keeps_entries_written_during_the_snapshot(tmp_path) -> None:
+    journal_file = str(tmp_path / "stock_journal.jsonl")
+    writer = StockJournal(journal_file)
+    writer.append([("mug-001", -1, 44)])
+    snapshot_offset = writer.offset
+    writer.append([("hoodie-001", -2, 13)])
+    writer.rotate(snapshot_offset)
+
+    assert writer.entries == 1
+    assert StockJournal(journal_file).read_new() == [("hoodie-001", 13)]
+
+    # A reader that missed two compactions has to fall back to the snapshot
+    reader = StockJournal(journal_file)
+    writer.rotate(writer.offset)
+    writer.rotate(writer.offset)
+    assert reader.was_replaced()
+    assert reader.read_replaced() is None
+    assert not reader.was_replaced()